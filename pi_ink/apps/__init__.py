@@ -1,8 +1,40 @@
+from pi_ink.registry import Registry, lazy_attributes
+
 from .iapp import IApp
-from .pictureframe import PictureFrame
-from .spotipi import SpotiPi
 
-__all__ = ["IApp", "SpotiPi", "PictureFrame"]
+# apps are imported on first use, so running one app doesn't import the dependencies of the others
+__getattr__ = lazy_attributes(
+    __name__,
+    {
+        "SpotiPi": ".spotipi",
+        "PictureFrame": ".pictureframe",
+        "MultiPanel": ".multi_panel",
+        "PanelSpec": ".multi_panel",
+        "ThinClient": ".thin_client",
+    },
+)
+
+app_registry = Registry(
+    "pi_ink.apps",
+    builtins={
+        "spotipi": "pi_ink.apps.spotipi:SpotiPi",
+        "pictureframe": "pi_ink.apps.pictureframe:PictureFrame",
+        "multipanel": "pi_ink.apps.multi_panel:MultiPanel",
+        "frameserver": "pi_ink.server.frame_server:FrameServer",
+        "thinclient": "pi_ink.apps.thin_client:ThinClient",
+    },
+)
+
+__all__ = [
+    "IApp",
+    "SpotiPi",
+    "PictureFrame",
+    "MultiPanel",
+    "PanelSpec",
+    "ThinClient",
+    "app_registry",
+    "app_factory",
+]
 
 
 def app_factory(app_name: str, **kwargs) -> IApp:
@@ -10,16 +42,11 @@ def app_factory(app_name: str, **kwargs) -> IApp:
     Factory method for creating an app.
 
     Args:
-        app_name (str): name of the app to create
+        app_name (str): name of the app to create, a built-in app or one installed under the "pi_ink.apps" entry point
+            group
         **kwargs: keyword arguments to pass to the app
 
     Returns:
         IApp: the app instance
     """
-    app_name_copy = app_name.lower()
-    if app_name_copy == "spotipi":
-        return SpotiPi(**kwargs)
-    elif app_name_copy == "pictureframe":
-        return PictureFrame(**kwargs)
-    else:
-        raise ValueError(f"invalid app name: {app_name_copy}")
+    return app_registry.create(app_name, **kwargs)
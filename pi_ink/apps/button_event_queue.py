@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ButtonEvent:
+    name: str
+    pin: int
+    timestamp: float  # time.time() of the press as seen by the gpio thread
+
+
+class ButtonEventQueue:
+    """
+    Thread-safe queue of button presses.
+
+    Producers (e.g. RPi.GPIO callback threads) call put(), the app's main loop drains the queue with drain(). Presses
+    of the same button arriving within the debounce window are dropped here, so all debouncing happens in one place.
+    """
+
+    _events: Deque[ButtonEvent]
+    _debounce: float
+    _last_press: Dict[str, float]
+    _cond: threading.Condition
+    _interrupted: bool = False
+
+    def __init__(self, debounce: float = 0.05):
+        """
+        Args:
+            debounce (float, optional): minimum time in seconds between two presses of the same button. Defaults to 0.05.
+        """
+        self._events = deque()
+        self._debounce = debounce
+        self._last_press = {}
+        self._cond = threading.Condition()
+
+    def put(self, name: str, pin: int, timestamp: Optional[float] = None) -> bool:
+        """
+        Enqueues a button press.
+
+        Args:
+            name (str): name of the button
+            pin (int): gpio pin of the button
+            timestamp (float, optional): time of the press. Defaults to now.
+
+        Returns:
+            bool: False if the press was dropped by the debounce filter
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        with self._cond:
+            last = self._last_press.get(name)
+            if last is not None and timestamp - last < self._debounce:
+                logger.debug(f"debounced press of button {name}")
+                return False
+
+            self._last_press[name] = timestamp
+            self._events.append(ButtonEvent(name=name, pin=pin, timestamp=timestamp))
+            self._cond.notify_all()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until at least one event is queued or the timeout expires, without consuming any events.
+
+        Args:
+            timeout (float, optional): maximum time to wait in seconds. Defaults to None (wait forever).
+
+        Returns:
+            bool: True if an event is available
+        """
+        with self._cond:
+            available = self._cond.wait_for(
+                lambda: len(self._events) > 0 or self._interrupted, timeout=timeout
+            )
+            self._interrupted = False
+            return available and len(self._events) > 0
+
+    def interrupt(self) -> None:
+        """
+        Wakes up a thread blocked in wait(), e.g. when the app is asked to stop.
+        """
+        with self._cond:
+            self._interrupted = True
+            self._cond.notify_all()
+
+    def drain(self) -> List[ButtonEvent]:
+        """
+        Removes and returns every queued event in press order.
+
+        Returns:
+            List[ButtonEvent]: queued events, empty if there are none
+        """
+        with self._cond:
+            events = list(self._events)
+            self._events.clear()
+        return events
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._events)
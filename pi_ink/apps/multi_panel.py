@@ -0,0 +1,186 @@
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from pi_ink.apps import app_factory
+from pi_ink.apps.iapp import IApp
+from pi_ink.art import CachingArtSource, HttpArtSource, IArtSource
+from pi_ink.displays import IDisplay, display_registry
+from pi_ink.displays.refresh_gate import GatedDisplay, RefreshGate
+from pi_ink.renderers import IRenderer, renderer_registry
+from pi_ink.snapshot import SnapshotStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class PanelSpec:
+    name: str  # unique, also the name the panel's snapshot is kept under
+    app: str  # name of the app shown on the panel, e.g. spotipi or pictureframe
+    display: str = "inky"  # name of the display in the display registry
+    display_kwargs: Dict[str, Any] = field(default_factory=dict)
+    app_kwargs: Dict[str, Any] = field(default_factory=dict)
+    saturation: float = None  # overrides the saturation run() is called with
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "PanelSpec":
+        return cls(
+            name=d["name"],
+            app=d["app"],
+            display=d.get("display", "inky"),
+            display_kwargs=dict(d.get("display_kwargs") or {}),
+            app_kwargs=dict(d.get("app_kwargs") or {}),
+            saturation=d.get("saturation"),
+        )
+
+    @classmethod
+    def parse(cls, spec: str) -> "PanelSpec":
+        """
+        Parses a panel given on the command line as name=app[:display], e.g. kitchen=spotipi:inky.
+        """
+        name, sep, rest = spec.partition("=")
+        if sep == "" or name == "" or rest == "":
+            raise ValueError(f"invalid panel {spec}, expected name=app[:display]")
+        app, _, display = rest.partition(":")
+        return cls(name=name, app=app, display=display or "inky")
+
+
+class MultiPanel(IApp):
+    """
+    Drives several panels from one process, each running its own app on its own schedule, e.g. now playing on one
+    panel and a slideshow on another.
+
+    The panels share the album art cache, one renderer per panel resolution and the snapshot store, and the Spotify
+    client is a process wide singleton already. Panel refreshes go through a shared RefreshGate, so they're staggered
+    instead of all blocking at once.
+
+    Apps that own hardware, e.g. the buttons of PictureFrame, should only run on one panel, or be given their own
+    backend in the panel's app_kwargs.
+    """
+
+    _panels: List[PanelSpec]
+    _renderer: str
+    _art_source: IArtSource
+    _snapshot_store: SnapshotStore = None
+    _gate: RefreshGate
+    _apps: Dict[str, IApp]
+    _displays: Dict[str, IDisplay]
+    _renderers: Dict[Tuple[int, int], IRenderer]
+    _stop: threading.Event
+
+    def __init__(self, **kwargs):
+        """
+        Keyword Args:
+            panels (List[PanelSpec]): panels to drive, with unique names
+            displays (Dict[str, IDisplay], optional): displays to use instead of creating them, by panel name.
+                Defaults to None.
+            renderer (str, optional): name of the renderer in the renderer registry, e.g. process. Defaults to image.
+            art_source (IArtSource, optional): album art source shared by the panels. Defaults to a CachingArtSource
+                of HttpArtSource.
+            snapshot_store (SnapshotStore, optional): store the panels warm start from, each under its name.
+                Defaults to None, always starting cold.
+            refresh_gate (RefreshGate, optional): gate staggering the panel refreshes. Defaults to one refresh at a
+                time.
+        """
+        self._panels = list(kwargs["panels"])
+        names = [panel.name for panel in self._panels]
+        if len(set(names)) != len(names):
+            raise ValueError(f"panel names must be unique: {names}")
+
+        self._displays = dict(kwargs.get("displays") or {})
+        self._renderer = kwargs.get("renderer", "image")
+        self._art_source = kwargs.get("art_source") or CachingArtSource(HttpArtSource())
+        self._snapshot_store = kwargs.get("snapshot_store")
+        self._gate = kwargs.get("refresh_gate") or RefreshGate()
+        self._apps = {}
+        self._renderers = {}
+        self._stop = threading.Event()
+
+    def __renderer_for(self, resolution: Tuple[int, int]) -> IRenderer:
+        # panels of the same resolution share a renderer, and with it its retained scene
+        resolution = tuple(resolution)
+        if resolution not in self._renderers:
+            kwargs = {"resolution": resolution}
+            if self._renderer == "image":
+                kwargs["art_source"] = self._art_source
+            self._renderers[resolution] = renderer_registry.create(
+                self._renderer, **kwargs
+            )
+        return self._renderers[resolution]
+
+    def __create_app(self, panel: PanelSpec) -> IApp:
+        display = self._displays.get(panel.name)
+        if display is None:
+            display = display_registry.create(panel.display, **panel.display_kwargs)
+            self._displays[panel.name] = display
+
+        app_kwargs = {
+            "display": GatedDisplay(display, self._gate),
+            "img_renderer": self.__renderer_for(display.resolution),
+            "snapshot_store": self._snapshot_store,
+            "snapshot_name": panel.name,
+        }
+        app_kwargs.update(panel.app_kwargs)
+        return app_factory(panel.app, **app_kwargs)
+
+    def stop(self) -> None:
+        """
+        Asks the apps of all panels to stop, run() returns once they did.
+        """
+        self._stop.set()
+        for app in list(self._apps.values()):
+            stop = getattr(app, "stop", None)
+            if stop is not None:
+                stop()
+
+    def run(self, **kwargs):
+        """
+        Keyword Args:
+            saturation (float, optional): saturation of the displays, unless a panel overrides it. Defaults to 0.5.
+            dynamic_saturation (bool, optional): whether to enable dynamic saturation. Defaults to False.
+            profiler (CycleProfiler, optional): not supported, profiles are of one app's cycles at a time.
+        """
+        if kwargs.get("profiler") is not None:
+            logger.warning("profiling isn't supported with several panels, ignoring it")
+
+        for panel in self._panels:
+            if self._stop.is_set():
+                return
+            self._apps[panel.name] = self.__create_app(panel)
+            logger.info(
+                f"created panel {panel.name}",
+                extra={"app": panel.app, "display": panel.display},
+            )
+
+        def run_panel(panel: PanelSpec, app: IApp):
+            run_kwargs = {
+                "saturation": kwargs.get("saturation", 0.5),
+                "dynamic_saturation": kwargs.get("dynamic_saturation", False),
+            }
+            if panel.saturation is not None:
+                run_kwargs["saturation"] = panel.saturation
+            try:
+                app.run(**run_kwargs)
+            except Exception:
+                # the other panels keep running
+                logger.exception(f"panel {panel.name} failed")
+            else:
+                logger.info(f"panel {panel.name} stopped")
+
+        threads = [
+            threading.Thread(
+                target=run_panel,
+                args=(panel, self._apps[panel.name]),
+                name=f"pi-ink-panel-{panel.name}",
+                daemon=True,
+            )
+            for panel in self._panels
+        ]
+        for thread in threads:
+            thread.start()
+
+        # joined with a timeout, so KeyboardInterrupt reaches the main thread
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1.0)
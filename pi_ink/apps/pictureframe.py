@@ -1,20 +1,32 @@
 import logging
 import random
+import threading
 import time
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
 from PIL import Image
-from RPi import GPIO
 
+from pi_ink.apps.button_event_queue import ButtonEvent, ButtonEventQueue
 from pi_ink.apps.iapp import IApp
-from pi_ink.displays import EDisplayResponse, InkyImpressionDisplay
-from pi_ink.renderers import ImageRenderer
+from pi_ink.displays import EDisplayResponse, IDisplay, display_registry
+from pi_ink.gpio import IGpio, RPiGpio
+from pi_ink.profiling import profile_cycle
+from pi_ink.renderers import renderer_registry
+from pi_ink.snapshot import Snapshot, SnapshotStore, render_digest
+
+if TYPE_CHECKING:
+    from pi_ink.phash import PhotoHashIndex
+    from pi_ink.renderers import ImageRenderer
 
 logger = logging.getLogger(__name__)
 
+_DEDUP_ATTEMPTS = 20  # random pictures drawn at most to find one that isn't a near-duplicate of the recent ones
+
 
 class PictureFrame(IApp):
+    SNAPSHOT_NAME = "pictureframe"
+
     _btns: List[int] = [
         5,
         6,
@@ -25,7 +37,7 @@ class PictureFrame(IApp):
     _pic_dir: Path
     _all_pic_fps: List[Path]
     _cur_pic_fp: Path = None
-    _cur_pic_img: Path = None
+    _cur_pic_img: Image = None
     _history: List[Path] = []
     _history_cursor: int = 0
     _history_limit: int = 1000
@@ -33,42 +45,29 @@ class PictureFrame(IApp):
     _t1: float = 0.0
     _do_update: bool = True
     _timer_paused: bool = False
-    _display_busy: bool = False
+    _btn_debounce: float = 0.1  # in seconds, between presses of the same button
+    _events: ButtonEventQueue
+    _gpio: IGpio
+    _display: IDisplay = None
+    _img_renderer: "ImageRenderer" = None
+    _change_picture_interval: float = 60 * 3  # in seconds
+    _snapshot_store: SnapshotStore = None
+    _snapshot_name: str
+    _shown_digest: Optional[str] = None  # render digest of the frame on the display
+    _restored_frame: Image = None  # frame of the snapshot, shown without rendering
+    _photo_index: "PhotoHashIndex" = None
+    # pictures shown last a new random picture mustn't nearly duplicate
+    _dedup_window: int = 20
+    # bits the hashes of near-duplicate pictures differ in at most
+    _dedup_distance: int = 6
+    _stop: threading.Event
 
-    def btn_busy_ignore(fn):
-        """
-        Decorator that ignores button presses if the display is busy.
-        """
-
-        def wrapper(self, *args, **kwargs):
-            if self._display_busy:
-                logger.info("display busy, ignoring button press")
-                return
-            fn(self, *args, **kwargs)
-
-        return wrapper
-
-    @btn_busy_ignore
-    def __handle_btn_a(self):
-        logger.info("btn a -> requesting next picture")
-        self._cur_pic_fp, self._cur_pic_img = self.__next_picture()
-        self._do_update = True
-        self.__reset_timer()
-
-    @btn_busy_ignore
-    def __handle_btn_b(self):
-        logger.info("btn b -> requesting prev picture")
-        self._cur_pic_fp, self._cur_pic_img = self.__prev_picture()
-        self._do_update = True
-        self.__reset_timer()
-
-    @btn_busy_ignore
     def __handle_btn_c(self):
         logger.info("btn c -> clearing history")
         self._history = [self._cur_pic_fp]
         self._history_cursor = 0
+        self.__save_snapshot()
 
-    @btn_busy_ignore
     def __handle_btn_d(self):
         logger.info("btn d -> toggle timer")
         self._timer_paused = not self._timer_paused
@@ -77,45 +76,124 @@ class PictureFrame(IApp):
         else:
             logger.info("timer unpaused")
             self.__reset_timer()
-
-    _btn_fns = {
-        "A": __handle_btn_a,
-        "B": __handle_btn_b,
-        "C": __handle_btn_c,
-        "D": __handle_btn_d,
-    }
+        self.__save_snapshot()
 
     def __btn_callback(self, pin):
+        # called from the gpio thread, only enqueue the press, the main loop handles it
         btn_name = self._btn_names[self._btns.index(pin)]
-        self._btn_fns[btn_name](self)
+        self._events.put(btn_name, pin)
+
+    def __handle_events(self, events: List[ButtonEvent]) -> None:
+        """
+        Handles button events drained from the event queue, in press order.
+
+        Consecutive next (A) and previous (B) presses are coalesced into a single skip, so five quick presses of A
+        result in one "skip 5" navigation and one render.
+
+        Args:
+            events (List[ButtonEvent]): events to handle
+        """
+        skip = 0
+        for evt in events:
+            if evt.name == "A":
+                skip += 1
+            elif evt.name == "B":
+                skip -= 1
+            else:
+                # flush pending navigation so c & d act on the picture the user navigated to
+                self.__skip(skip)
+                skip = 0
+                if evt.name == "C":
+                    self.__handle_btn_c()
+                elif evt.name == "D":
+                    self.__handle_btn_d()
+
+        self.__skip(skip)
+
+    def __skip(self, steps: int) -> None:
+        """
+        Moves the current picture forwards (positive steps) or backwards (negative steps) through the history,
+        only loading the picture that is landed on.
+
+        Args:
+            steps (int): number of pictures to skip
+        """
+        if steps == 0:
+            return
+
+        logger.info(
+            f"btn {'a' if steps > 0 else 'b'} -> requesting picture, skip {steps}"
+        )
+        for _ in range(abs(steps)):
+            self._cur_pic_fp = (
+                self.__next_picture() if steps > 0 else self.__prev_picture()
+            )
+        self._cur_pic_img = Image.open(self._cur_pic_fp)
+        self._restored_frame = None
+        self._do_update = True
+        self.__reset_timer()
 
     def __init__(self, **kwargs):
-        GPIO.setmode(GPIO.BCM)  # setups RPI.GPIO to use the BCM pin numbering scheme
+        """
+        Keyword Args:
+            gpio (IGpio, optional): gpio backend for the buttons. Defaults to RPiGpio.
+            display (IDisplay, optional): display to draw on. Defaults to InkyImpressionDisplay, created in run().
+            img_renderer (ImageRenderer, optional): renderer for the pictures. Defaults to ImageRenderer, created in run().
+            pic_dir (Path, optional): directory of pictures to show. Defaults to the photos directory of pi_ink.
+            change_picture_interval (float, optional): seconds between automatic picture changes. Defaults to 180.
+            snapshot_store (SnapshotStore, optional): store to warm start from and snapshot each shown frame to.
+                Defaults to None, always starting cold.
+            snapshot_name (str, optional): name the snapshot is kept under, e.g. one per panel. Defaults to
+                SNAPSHOT_NAME.
+            photo_index (PhotoHashIndex, optional): perceptual hashes of the pictures, random pictures that nearly
+                duplicate a recently shown one are skipped. Updated in the background by run(). Defaults to None,
+                not skipping any.
+            dedup_window (int, optional): number of recently shown pictures checked for near-duplicates. Defaults
+                to 20.
+            dedup_distance (int, optional): bits the hashes of near-duplicates differ in at most. Defaults to 6.
+        """
+        self._history = []
+        self._events = ButtonEventQueue(debounce=self._btn_debounce)
+        self._stop = threading.Event()
+        self._display = kwargs.get("display")
+        self._img_renderer = kwargs.get("img_renderer")
+        self._snapshot_store = kwargs.get("snapshot_store")
+        self._snapshot_name = kwargs.get("snapshot_name", self.SNAPSHOT_NAME)
+        self._photo_index = kwargs.get("photo_index")
+        self._dedup_window = kwargs.get("dedup_window", self._dedup_window)
+        self._dedup_distance = kwargs.get("dedup_distance", self._dedup_distance)
+        self._change_picture_interval = kwargs.get(
+            "change_picture_interval", self._change_picture_interval
+        )
 
-        # btns connect to ground, set them as inputs with pull-up resistors
-        GPIO.setup(self._btns, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        self._gpio = kwargs.get("gpio")
+        if self._gpio is None:
+            self._gpio = RPiGpio()
+        self._gpio.setup_buttons(self._btns)
 
-        # setup callbacks for each button
+        # setup callbacks for each button, debouncing is handled by the event queue so only filter contact glitches here
         for btn, btn_name in zip(self._btns, self._btn_names):
-            GPIO.add_event_detect(
-                btn, GPIO.FALLING, callback=self.__btn_callback, bouncetime=250
-            )
+            self._gpio.add_press_callback(btn, self.__btn_callback, bouncetime=20)
             logger.info(f"added callback for button {btn_name} on pin {btn}")
 
         # create path relative to this file and one level up
-        self._pic_dir = Path(__file__).parent.parent / "photos"
+        self._pic_dir = Path(
+            kwargs.get("pic_dir", Path(__file__).parent.parent / "photos")
+        )
         self._all_pic_fps = [
             fp
             for fp in self._pic_dir.iterdir()
             if fp.is_file() and fp.suffix in [".JPG", ".jpg", ".png"]
         ]
 
-    def __next_picture(self) -> (Path, Image):
+    def __next_picture(self) -> Path:
         # check if cursor is at the end of the history
         if len(self._history) == 0 or self._history_cursor == len(self._history) - 1:
             logger.info("getting random picture")
-            # get a random picture
-            fp, img = self.__get_random_picture()
+            # get a random picture, unlike the ones shown before it
+            fp = self.__get_random_picture(
+                self._history[max(0, len(self._history) - self._dedup_window) :]
+            )
             self._history.append(fp)
 
             # if this is the first picture in the history, set the cursor to 0
@@ -131,7 +209,7 @@ class PictureFrame(IApp):
             if len(self._history) > self._history_limit:
                 self._history.pop(0)
 
-            return fp, img
+            return fp
 
         # otherwise, get the next picture in the history
         logger.info(
@@ -144,11 +222,9 @@ class PictureFrame(IApp):
             },
         )
         self._history_cursor += 1
-        fp = self._history[self._history_cursor]
-        img = Image.open(fp)
-        return fp, img
+        return self._history[self._history_cursor]
 
-    def __prev_picture(self) -> (Path, Image):
+    def __prev_picture(self) -> Path:
         # check if cursor is at the beginning of the history
         if len(self._history) == 0 or self._history_cursor == 0:
             logger.info("getting random picture")
@@ -160,10 +236,10 @@ class PictureFrame(IApp):
             if (len(self._history) + 1) > self._history_limit:
                 self._history.pop(0)
 
-            # get a random picture
-            fp, img = self.__get_random_picture()
+            # get a random picture, unlike the ones shown after it
+            fp = self.__get_random_picture(self._history[: self._dedup_window])
             self._history.insert(0, fp)
-            return fp, img
+            return fp
 
         # otherwise, get the previous picture in the history
         logger.info(
@@ -176,11 +252,9 @@ class PictureFrame(IApp):
             },
         )
         self._history_cursor -= 1
-        fp = self._history[self._history_cursor]
-        img = Image.open(fp)
-        return fp, img
+        return self._history[self._history_cursor]
 
-    def __get_random_picture(self) -> (Path, Image):
+    def __get_random_picture(self, recent: List[Path]) -> Path:
         fp = random.choice(self._all_pic_fps)
 
         if self._cur_pic_fp is not None:
@@ -212,19 +286,161 @@ class PictureFrame(IApp):
                         f"attempted {new_attempt} times to get a picture that is not in the history"
                     )
 
-        img = Image.open(fp)
-        return fp, img
+        return self.__skip_near_duplicates(fp, recent)
+
+    def __skip_near_duplicates(self, fp: Path, recent: List[Path]) -> Path:
+        """
+        Draws random pictures until one isn't a near-duplicate of the recent pictures, e.g. another shot of a burst
+        that was just shown.
+
+        Args:
+            fp (Path): the random picture drawn
+            recent (List[Path]): pictures shown next to where the picture goes in the history
+
+        Returns:
+            Path: the first picture that isn't a near-duplicate, fp if none is found
+        """
+        index = self._photo_index
+        if index is None or len(recent) == 0:
+            return fp
+
+        candidate = fp
+        for _ in range(_DEDUP_ATTEMPTS):
+            if not index.is_near_duplicate(candidate, recent, self._dedup_distance):
+                return candidate
+            logger.debug(
+                f"skipping {candidate.name}, it nearly duplicates a recent picture"
+            )
+            candidate = random.choice(self._all_pic_fps)
+        logger.info(
+            f"no picture found that isn't a near-duplicate of the last {len(recent)} in {_DEDUP_ATTEMPTS} attempts"
+        )
+        return fp
 
     def __reset_timer(self):
         self._t0 = time.time()
         self._t1 = self._t0
 
+    @staticmethod
+    def __picture_digest(fp: Path, saturation: float, dynamic_saturation: bool) -> str:
+        stat = fp.stat()
+        return render_digest(
+            str(fp), stat.st_mtime_ns, stat.st_size, saturation, dynamic_saturation
+        )
+
+    def __state(self) -> Dict[str, Any]:
+        return {
+            "current": str(self._cur_pic_fp),
+            "history": [str(fp) for fp in self._history],
+            "history_cursor": self._history_cursor,
+            "timer_elapsed": self._t1 - self._t0,
+            "timer_paused": self._timer_paused,
+        }
+
+    def __save_snapshot(self, frame: Image = None) -> None:
+        if self._snapshot_store is None or self._shown_digest is None:
+            return
+        self._snapshot_store.save(
+            self._snapshot_name, self._shown_digest, self.__state(), frame
+        )
+
+    def __restore(
+        self,
+        snapshot: Snapshot,
+        retains_frame: bool,
+        saturation: float,
+        dynamic_saturation: bool,
+    ) -> None:
+        """
+        Restores the picture, history and timer from a snapshot, and skips the first refresh if the panel still shows
+        the snapshot's frame.
+        """
+        state = snapshot.state
+        try:
+            cur_pic_fp = Path(state["current"])
+            history = [Path(fp) for fp in state["history"]]
+            cursor = state["history_cursor"]
+            elapsed = state["timer_elapsed"]
+            timer_paused = state["timer_paused"]
+        except (KeyError, TypeError) as e:
+            logger.warning(f"ignoring invalid snapshot: {e}")
+            return
+
+        if not cur_pic_fp.is_file():
+            logger.info(f"snapshot picture {cur_pic_fp} is gone, starting fresh")
+            return
+
+        # pictures may have been removed while the app wasn't running
+        kept = [i for i, fp in enumerate(history) if fp.is_file()]
+        self._history = [history[i] for i in kept]
+        if 0 <= cursor < len(history) and history[cursor] == cur_pic_fp:
+            self._history_cursor = kept.index(cursor)
+        else:
+            self._history.append(cur_pic_fp)
+            self._history_cursor = len(self._history) - 1
+
+        self._cur_pic_fp = cur_pic_fp
+        self._cur_pic_img = Image.open(cur_pic_fp)
+        self._timer_paused = timer_paused
+        self._t1 = time.time()
+        self._t0 = self._t1 - elapsed
+
+        digest = self.__picture_digest(cur_pic_fp, saturation, dynamic_saturation)
+        if snapshot.digest != digest:
+            logger.info("snapshot was rendered from other inputs, re-rendering")
+        elif retains_frame:
+            logger.info("panel still shows the snapshot frame, skipping refresh")
+            self._shown_digest = digest
+            self._do_update = False
+        else:
+            self._restored_frame = snapshot.frame()
+        logger.info(f"restored picture {cur_pic_fp.name} from snapshot")
+
+    def stop(self) -> None:
+        """
+        Asks run() to return, from any thread, once the current iteration finishes.
+        """
+        self._stop.set()
+        self._events.interrupt()
+
     def run(self, **kwargs):
-        img_renderer = ImageRenderer()
-        display = InkyImpressionDisplay()
-        change_picture_interval = 60 * 3  # in seconds
+        """
+        Keyword Args:
+            saturation (float, optional): saturation of the display. Defaults to 0.5.
+            dynamic_saturation (bool, optional): whether to enable dynamic saturation. Defaults to False.
+            profiler (CycleProfiler, optional): profiles the render/display cycles. Defaults to None.
+        """
+        display = self._display
+        if display is None:
+            display = display_registry.create("inky")
+        img_renderer = self._img_renderer
+        if img_renderer is None:
+            img_renderer = renderer_registry.create(
+                "image", resolution=display.resolution
+            )
+        change_picture_interval = self._change_picture_interval
+        profiler = kwargs.get("profiler")
+        sat = kwargs.get("saturation", 0.5)
+        dynamic_saturation = kwargs.get("dynamic_saturation", False)
+
+        if self._photo_index is not None:
+            # pictures are drawn while the library is hashed, those not hashed yet aren't checked for duplicates
+            threading.Thread(
+                target=self._photo_index.update,
+                args=(self._all_pic_fps,),
+                name="pictureframe-photo-index",
+                daemon=True,
+            ).start()
+
+        if self._snapshot_store is not None:
+            snapshot = self._snapshot_store.load(self._snapshot_name)
+            if snapshot is not None:
+                self.__restore(snapshot, display.retains_frame, sat, dynamic_saturation)
+
+        while not self._stop.is_set():
+            # handle button presses queued by the gpio thread since the last iteration
+            self.__handle_events(self._events.drain())
 
-        while True:
             if not self._timer_paused:
                 self._t1 = time.time()
 
@@ -234,10 +450,17 @@ class PictureFrame(IApp):
                 # not necessary but will ensure we don't get stuck in a loop continually trying to update the display
 
                 logger.info("changing picture")
-                self._cur_pic_fp, self._cur_pic_img = self.__next_picture()
+                self._cur_pic_fp = self.__next_picture()
+                self._cur_pic_img = Image.open(self._cur_pic_fp)
+                self._restored_frame = None
                 self.__reset_timer()
 
             if not self._do_update:
+                # sleep until a button is pressed or the timer is due
+                timeout = None
+                if not self._timer_paused:
+                    timeout = max(0.0, change_picture_interval - (self._t1 - self._t0))
+                self._events.wait(timeout=timeout)
                 continue
 
             logger.info(
@@ -249,27 +472,34 @@ class PictureFrame(IApp):
                 },
             )
 
-            self._display_busy = True
-            frame = img_renderer.render_picture_frame(self._cur_pic_img)
-            sat = kwargs.get("saturation", 0.5)
-            dynamic_saturation = kwargs.get("dynamic_saturation", False)
-            logger.info(
-                f"displaying frame [saturation={sat}, dynamic_saturation={dynamic_saturation}]"
-            )
-            display.set_frame(
-                frame, saturation=sat, dynamic_saturation=dynamic_saturation
-            )
-            res = display.display_frame()
+            with profile_cycle(profiler):
+                if self._restored_frame is not None:
+                    logger.info("displaying the snapshot frame")
+                    frame = self._restored_frame
+                else:
+                    frame = img_renderer.render_picture_frame(self._cur_pic_img)
+                logger.info(
+                    f"displaying frame [saturation={sat}, dynamic_saturation={dynamic_saturation}]"
+                )
+                display.set_frame(
+                    frame, saturation=sat, dynamic_saturation=dynamic_saturation
+                )
+                res = display.display_frame()
 
             if res.response == EDisplayResponse.ERROR:
                 logger.error(f"error displaying frame: {res.value}")
                 break
 
             if res.response == EDisplayResponse.NOT_READY:
+                # presses made while waiting are handled on the next iteration, before the frame is re-rendered
                 logger.info(f"display not ready, waiting {res.value}s")
-                time.sleep(res.value)
+                self._events.wait(timeout=res.value)
                 continue
 
             self._do_update = False
-            self._display_busy = False
             self.__reset_timer()  # reset timer
+            self._restored_frame = None
+            self._shown_digest = self.__picture_digest(
+                self._cur_pic_fp, sat, dynamic_saturation
+            )
+            self.__save_snapshot(frame)
@@ -1,56 +1,260 @@
 import logging
-import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Optional, Tuple
 
 from pi_ink.apps.iapp import IApp
-from pi_ink.displays import EDisplayResponse, InkyImpressionDisplay
-from pi_ink.renderers import ImageRenderer
+from pi_ink.art import CachingArtSource, HttpArtSource
+from pi_ink.clock import IClock, SystemClock
+from pi_ink.displays import EDisplayResponse, IDisplay, display_registry
+from pi_ink.profiling import profile_cycle
+from pi_ink.renderers import renderer_registry
+from pi_ink.resilience import CircuitOpenError
+from pi_ink.snapshot import SnapshotStore, render_digest
 from pi_ink.spotify import Spotify
+from pi_ink.spotify.models import Track
+
+if TYPE_CHECKING:
+    from pi_ink.renderers import ImageRenderer
 
 logger = logging.getLogger(__name__)
 
 
 class SpotiPi(IApp):
+    SNAPSHOT_NAME = "spotipi"
+
+    _spotify: Spotify = None
+    _display: IDisplay = None
+    _img_renderer: "ImageRenderer" = None
+    _clock: IClock
+    _spotify_poll_interval: float = 15  # in seconds
+    _mosaic_after: float = 15 * 60  # in seconds
+    _mosaic_tracks: int = 50
+    _snapshot_store: SnapshotStore = None
+    _snapshot_name: str
+    _stop: threading.Event
+
+    def __init__(self, **kwargs):
+        """
+        Keyword Args:
+            spotify (Spotify, optional): spotify client, or a stand-in with the same methods. Defaults to Spotify.instance().
+            display (IDisplay, optional): display to draw on. Defaults to InkyImpressionDisplay, created in run().
+            img_renderer (ImageRenderer, optional): renderer for the frames. Defaults to ImageRenderer with cached art.
+            clock (IClock, optional): clock used for polling and waiting. Defaults to SystemClock.
+            spotify_poll_interval (float, optional): seconds between spotify polls. Defaults to 15.
+            mosaic_after (float, optional): seconds without plays after which a mosaic of the last played albums is
+                shown instead of the last played track. Defaults to 15 minutes.
+            mosaic_tracks (int, optional): last played tracks the mosaic is of. Defaults to 50.
+            snapshot_store (SnapshotStore, optional): store to warm start from and snapshot each shown frame to.
+                Defaults to None, always starting cold.
+            snapshot_name (str, optional): name the snapshot is kept under, e.g. one per panel. Defaults to
+                SNAPSHOT_NAME.
+        """
+        self._spotify = kwargs.get("spotify")
+        self._display = kwargs.get("display")
+        self._img_renderer = kwargs.get("img_renderer")
+        self._clock = kwargs.get("clock") or SystemClock()
+        self._spotify_poll_interval = kwargs.get(
+            "spotify_poll_interval", self._spotify_poll_interval
+        )
+        self._mosaic_after = kwargs.get("mosaic_after", self._mosaic_after)
+        self._mosaic_tracks = kwargs.get("mosaic_tracks", self._mosaic_tracks)
+        self._snapshot_store = kwargs.get("snapshot_store")
+        self._snapshot_name = kwargs.get("snapshot_name", self.SNAPSHOT_NAME)
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """
+        Asks run() to return once the current iteration finishes.
+        """
+        self._stop.set()
+
+    def __get_spotify(self):
+        if self._spotify is None:
+            self._spotify = Spotify.instance()
+        return self._spotify
+
+    def __poll(self) -> Tuple[Track, bool]:
+        # the track to show, and whether nothing has been played for mosaic_after
+        spotify = self.__get_spotify()
+        track = spotify.get_currently_playing()
+        if track is not None:
+            return track, False
+
+        track = spotify.get_last_played(limit=1)[0]
+        # played_at of the last played tracks is in UTC
+        now = datetime.fromtimestamp(self._clock.time(), timezone.utc).replace(
+            tzinfo=None
+        )
+        return track, (now - track.played_at).total_seconds() >= self._mosaic_after
+
+    def __retry_delay(self, e: Exception) -> float:
+        # while a circuit is open nothing is attempted before it lets a probe through
+        if isinstance(e, CircuitOpenError):
+            return max(self._spotify_poll_interval, e.retry_in)
+        return self._spotify_poll_interval
+
+    def __wait_for_track(self) -> Optional[Tuple[Track, bool]]:
+        while not self._stop.is_set():
+            try:
+                return self.__poll()
+            except Exception as e:
+                delay = self.__retry_delay(e)
+                logger.error(f"spotify poll failed, retrying in {delay:.0f}s: {e}")
+                self._clock.sleep(delay)
+        return None
+
     def run(self, **kwargs):
-        spotify = Spotify.instance()
-        img_renderer = ImageRenderer()
-        display = InkyImpressionDisplay()
-        spotify_poll_interval = 15  # in seconds
-        t0 = time.time()
-        do_update = True
-
-        def get_track():
-            inner_track = spotify.get_currently_playing()
-            if inner_track is None:
-                inner_track = spotify.get_last_played(limit=1)[0]
-            return inner_track
-
-        track = get_track()
-        new_track = track
-
-        while True:
-            t1 = time.time()
-            if t1 - t0 >= spotify_poll_interval:
+        """
+        Keyword Args:
+            saturation (float, optional): saturation of the display. Defaults to 0.5.
+            dynamic_saturation (bool, optional): whether to enable dynamic saturation. Defaults to False.
+            profiler (CycleProfiler, optional): profiles the render/display cycles. Defaults to None.
+        """
+        display = self._display
+        if display is None:
+            display = display_registry.create("inky")
+        img_renderer = self._img_renderer
+        if img_renderer is None:
+            # frames are laid out for the panel they're shown on
+            img_renderer = renderer_registry.create(
+                "image",
+                art_source=CachingArtSource(HttpArtSource()),
+                resolution=display.resolution,
+            )
+        clock = self._clock
+        profiler = kwargs.get("profiler")
+        sat = kwargs.get("saturation", 0.5)
+        dynamic_saturation = kwargs.get("dynamic_saturation", False)
+        spotify_poll_interval = self._spotify_poll_interval
+        store = self._snapshot_store
+
+        def digest_of(t: Track, idle: bool) -> str:
+            return render_digest(
+                idle,
+                t.title,
+                t.album,
+                t.artist,
+                t.album_cover_url_300px,
+                t.album_cover_url_640px,
+                t.is_loved,
+                sat,
+                dynamic_saturation,
+            )
+
+        snapshot = store.load(self._snapshot_name) if store is not None else None
+        restored_frame = None  # frame of the snapshot, shown without rendering
+        first_poll: Future = None
+        track = None
+        idle = False  # whether the frame shown is the mosaic
+        if snapshot is not None:
+            try:
+                track = Track.from_dict(snapshot.state["track"])
+                idle = snapshot.state.get("idle", False)
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"ignoring snapshot with an invalid track: {e}")
+
+        if track is not None:
+            new_track, new_idle = track, idle
+            do_update = True
+            if snapshot.digest != digest_of(track, idle):
+                logger.info("snapshot was rendered with other settings, re-rendering")
+            elif display.retains_frame:
+                logger.info("panel still shows the snapshot frame, skipping refresh")
+                do_update = False
+            else:
+                restored_frame = snapshot.frame()
+
+            # spotify auth & the first poll happen in the background, the restored frame doesn't wait on the network
+            executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="spotipi-first-poll"
+            )
+            first_poll = executor.submit(self.__poll)
+            executor.shutdown(wait=False)
+        else:
+            # nothing to show until spotify answers
+            polled = self.__wait_for_track()
+            if polled is None:
+                return
+            track, idle = polled
+            new_track, new_idle = polled
+            do_update = True
+        t0 = clock.time()
+
+        while not self._stop.is_set():
+            t1 = clock.time()
+            if first_poll is not None:
+                if first_poll.done():
+                    try:
+                        new_track, new_idle = first_poll.result()
+                    except Exception as e:
+                        logger.error(f"first spotify poll failed, retrying later: {e}")
+                    first_poll = None
+                    t0 = clock.time()
+            elif t1 - t0 >= spotify_poll_interval:
                 logger.info(f"polling spotify & updating frame")
-                new_track = get_track()
-                t0 = time.time()  # not setting to t1 since render_frame takes time
+                try:
+                    new_track, new_idle = self.__poll()
+                    t0 = clock.time()  # not setting to t1 since render_frame takes time
+                except Exception as e:
+                    # the panel keeps showing the last frame, polls resume once spotify is back
+                    delay = self.__retry_delay(e)
+                    logger.error(
+                        f"spotify poll failed, keeping the current frame and retrying in {delay:.0f}s: {e}"
+                    )
+                    t0 = clock.time() + delay - spotify_poll_interval
 
-            if new_track is not None and new_track.title.lower() != track.title.lower():
+            # any change of what the frame is rendered from, e.g. only the loved flag, reaches the renderer, which
+            # redraws only the layers that changed, and so does playback turning idle or resuming
+            if new_track is not None and digest_of(new_track, new_idle) != digest_of(
+                track, idle
+            ):
                 do_update = True
+                restored_frame = None
 
             if not do_update:
+                # sleep until the next poll is due instead of spinning
+                timeout = spotify_poll_interval - (clock.time() - t0)
+                if first_poll is not None:
+                    wait_futures([first_poll], timeout=timeout)
+                else:
+                    clock.sleep(timeout)
                 continue
 
             logger.info(f"new track detected, updating frame")
-            frame = img_renderer.render_frame_from_track(new_track)
-            sat = kwargs.get("saturation", 0.5)
-            dynamic_saturation = kwargs.get("dynamic_saturation", False)
-            logger.info(
-                f"displaying frame [saturation={sat}, dynamic_saturation={dynamic_saturation}]"
-            )
-            display.set_frame(
-                frame, saturation=sat, dynamic_saturation=dynamic_saturation
-            )
-            res = display.display_frame()
+            try:
+                with profile_cycle(profiler):
+                    if restored_frame is not None:
+                        logger.info("displaying the snapshot frame")
+                        frame = restored_frame
+                    elif new_idle:
+                        # nothing played lately, a mosaic of the albums played before, shown until playback resumes
+                        logger.info("playback is idle, rendering the mosaic")
+                        frame = img_renderer.render_mosaic(
+                            self.__get_spotify().get_last_played(
+                                limit=self._mosaic_tracks, with_loved=False
+                            )
+                        )
+                    else:
+                        frame = img_renderer.render_frame_from_track(new_track)
+                    logger.info(
+                        f"displaying frame [saturation={sat}, dynamic_saturation={dynamic_saturation}]"
+                    )
+                    display.set_frame(
+                        frame, saturation=sat, dynamic_saturation=dynamic_saturation
+                    )
+                    res = display.display_frame()
+            except Exception as e:
+                # e.g. the album art can't be downloaded: the panel keeps showing the last frame, the update is
+                # retried after the next poll
+                delay = self.__retry_delay(e)
+                logger.error(
+                    f"failed to render frame, keeping the current one and retrying in {delay:.0f}s: {e}"
+                )
+                clock.sleep(delay)
+                continue
 
             if res.response == EDisplayResponse.ERROR:
                 logger.error(f"error displaying frame: {res.value}")
@@ -58,9 +262,17 @@ class SpotiPi(IApp):
 
             if res.response == EDisplayResponse.NOT_READY:
                 logger.info(f"display not ready, waiting {res.value}s")
-                time.sleep(res.value)
+                clock.sleep(res.value)
                 continue
 
             do_update = False
-            track = new_track
+            track, idle = new_track, new_idle
             new_track = None
+            restored_frame = None
+            if store is not None:
+                store.save(
+                    self._snapshot_name,
+                    digest_of(track, idle),
+                    {"track": track.to_dict(), "idle": idle},
+                    frame,
+                )
@@ -0,0 +1,77 @@
+import logging
+import threading
+
+from pi_ink.apps.iapp import IApp
+from pi_ink.clock import IClock, SystemClock
+from pi_ink.displays import EDisplayResponse, IDisplay, display_registry
+from pi_ink.profiling import profile_cycle
+from pi_ink.server.frame_client import FrameClient, FrameClientDisplay
+
+logger = logging.getLogger(__name__)
+
+
+class ThinClient(IApp):
+    """
+    Shows the frames a FrameServer renders for this panel, for boards too slow to render frames themselves. Nothing
+    is rendered or quantized here: the display is wrapped in a FrameClientDisplay, frames are downloaded packed and
+    handed to the display as is, and polls of an unchanged frame are answered with an empty 304.
+    """
+
+    _client: FrameClient
+    _display: IDisplay = None
+    _clock: IClock
+    _poll_interval: float = 15  # in seconds
+    _stop: threading.Event
+
+    def __init__(self, **kwargs):
+        """
+        Keyword Args:
+            url (str): url of the panel's frame on the server, e.g. http://192.168.1.2:8750/frames/kitchen
+            display (IDisplay, optional): display to draw on. Defaults to InkyImpressionDisplay, created in run().
+            clock (IClock, optional): clock used for polling and waiting. Defaults to SystemClock.
+            poll_interval (float, optional): seconds between polls of the server. Defaults to 15.
+            session (requests.Session, optional): session to download with. Defaults to a new session.
+        """
+        self._client = FrameClient(kwargs["url"], session=kwargs.get("session"))
+        self._display = kwargs.get("display")
+        self._clock = kwargs.get("clock") or SystemClock()
+        self._poll_interval = kwargs.get("poll_interval", self._poll_interval)
+        self._stop = threading.Event()
+
+    def stop(self) -> None:
+        """
+        Asks run() to return once the current iteration finishes.
+        """
+        self._stop.set()
+
+    def run(self, **kwargs):
+        """
+        Keyword Args:
+            profiler (CycleProfiler, optional): profiles the display cycles. Defaults to None.
+        """
+        display = self._display
+        if display is None:
+            display = display_registry.create("inky")
+        profiler = kwargs.get("profiler")
+        clock = self._clock
+
+        display = FrameClientDisplay(display, self._client, self._poll_interval)
+        while not self._stop.is_set():
+            if not display.fetch():
+                clock.sleep(self._poll_interval)
+                continue
+
+            logger.info("new frame downloaded, updating display")
+            with profile_cycle(profiler):
+                res = display.display_frame()
+
+            if res.response == EDisplayResponse.ERROR:
+                logger.error(f"error displaying frame: {res.value}")
+                break
+
+            if res.response == EDisplayResponse.NOT_READY:
+                logger.info(f"display not ready, waiting {res.value}s")
+                clock.sleep(res.value)
+                continue
+
+            clock.sleep(self._poll_interval)
@@ -0,0 +1,16 @@
+from .caching_art_source import ArtCacheStats, CachingArtSource
+from .cover_theme import CoverTheme, CoverThemeCache, extract_theme
+from .file_art_source import FileArtSource
+from .http_art_source import HttpArtSource
+from .iart_source import IArtSource
+
+__all__ = [
+    "IArtSource",
+    "HttpArtSource",
+    "FileArtSource",
+    "CachingArtSource",
+    "ArtCacheStats",
+    "CoverTheme",
+    "CoverThemeCache",
+    "extract_theme",
+]
@@ -0,0 +1,78 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from PIL import Image
+
+from .iart_source import IArtSource, fit_cover
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ArtCacheStats:
+    hits: int
+    misses: int
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total > 0 else 0.0
+
+
+class CachingArtSource(IArtSource):
+    """
+    Keeps the most recently used album covers in memory, so consecutive tracks of the same album don't download the
+    same art again. Covers are kept per size they're requested at, a size not cached yet is resized from the cached
+    original.
+    """
+
+    _source: IArtSource
+    _max_items: int
+    _cache: "OrderedDict[Tuple[str, Optional[Tuple[int, int]]], Image]"
+    _lock: threading.Lock
+    _hits: int = 0
+    _misses: int = 0
+
+    def __init__(self, source: IArtSource, max_items: int = 32):
+        """
+        Args:
+            source (IArtSource): art source to load covers from on a cache miss
+            max_items (int, optional): number of covers to keep, every size counts. Defaults to 32.
+        """
+        self._source = source
+        self._max_items = max_items
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_cover(self, url: str, size: Tuple[int, int] = None) -> Image:
+        key = (url, None if size is None else tuple(size))
+        with self._lock:
+            if key in self._cache:
+                self._hits += 1
+                self._cache.move_to_end(key)
+                return self._cache[key]
+            self._misses += 1
+            original = self._cache.get((url, None)) if size is not None else None
+
+        logger.debug(f"album cover cache miss for {url} at {size}")
+        if original is None:
+            original = self._source.get_cover(url)
+            self.__put((url, None), original)
+        # covers are kept at every size they're drawn at, so frames don't resize them again
+        img = fit_cover(original, size)
+        self.__put(key, img)
+        return img
+
+    def __put(self, key: Tuple[str, Optional[Tuple[int, int]]], img: Image) -> None:
+        with self._lock:
+            self._cache[key] = img
+            self._cache.move_to_end(key)
+            while len(self._cache) > self._max_items:
+                self._cache.popitem(last=False)
+
+    def stats(self) -> ArtCacheStats:
+        with self._lock:
+            return ArtCacheStats(hits=self._hits, misses=self._misses)
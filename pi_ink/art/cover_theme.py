@@ -0,0 +1,232 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from PIL import Image
+
+from .caching_art_source import ArtCacheStats
+from .iart_source import IArtSource
+
+logger = logging.getLogger(__name__)
+
+RGB = Tuple[int, int, int]
+
+_SAMPLE_SIZE = 48  # covers are clustered at this size, 2304 pixels
+_MIN_CHROMA = 48  # max - min of the channels below which a colour counts as grey
+_SEED = 0  # same cover, same clusters, same frame
+
+
+@dataclass(frozen=True)
+class CoverTheme:
+    # dominant colours and the share of the cover they cover, largest first
+    colors: Tuple[Tuple[RGB, float], ...]
+    # palette colour of the most prominent vivid colour, None for grey covers
+    accent: Optional[RGB]
+    mean: RGB  # average colour of the cover
+
+
+def _chroma(colors: np.ndarray) -> np.ndarray:
+    return colors.max(axis=-1) - colors.min(axis=-1)
+
+
+def relative_luminance(color: RGB) -> float:
+    """
+    WCAG relative luminance of an sRGB colour, 0 for black and 1 for white.
+    """
+    # called per frame on single colours, plain floats beat numpy here
+    r, g, b = (
+        c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
+        for c in (v / 255.0 for v in color)
+    )
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+
+def contrast_ratio(a: RGB, b: RGB) -> float:
+    """
+    WCAG contrast ratio of two colours, from 1 for the same colour to 21 for black on white.
+    """
+    la, lb = sorted([relative_luminance(a), relative_luminance(b)], reverse=True)
+    return (la + 0.05) / (lb + 0.05)
+
+
+def dominant_colors(
+    img: Image.Image, k: int = 5, iterations: int = 10
+) -> Tuple[Tuple[RGB, float], ...]:
+    """
+    Dominant colours of an image, by k-means clustering its pixels downsampled to 48x48.
+
+    Args:
+        img (Image.Image): image, e.g. album cover art
+        k (int, optional): number of colours. Defaults to 5.
+        iterations (int, optional): k-means iterations at most, it usually converges in a few. Defaults to 10.
+
+    Returns:
+        Tuple[Tuple[RGB, float], ...]: the colours and the share of the pixels closest to them, largest first
+    """
+    sample = img.convert("RGB")
+    if max(sample.size) > _SAMPLE_SIZE:
+        sample = sample.resize((_SAMPLE_SIZE, _SAMPLE_SIZE), Image.BOX)
+    pixels = np.asarray(sample, dtype=np.float32).reshape(-1, 3)
+    k = min(k, len(pixels))
+
+    # k-means++ seeding, picking pixels far from the centroids so far
+    rng = np.random.default_rng(_SEED)
+    centroids = np.empty((k, 3), dtype=np.float32)
+    centroids[0] = pixels[rng.integers(len(pixels))]
+    nearest = ((pixels - centroids[0]) ** 2).sum(axis=1)
+    for i in range(1, k):
+        total = nearest.sum()
+        if total == 0:
+            # fewer distinct colours than clusters
+            centroids = centroids[:i]
+            break
+        centroids[i] = pixels[rng.choice(len(pixels), p=nearest / total)]
+        nearest = np.minimum(nearest, ((pixels - centroids[i]) ** 2).sum(axis=1))
+
+    labels = None
+    for _ in range(iterations):
+        distances = ((pixels[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        new_labels = distances.argmin(axis=1)
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        counts = np.bincount(labels, minlength=len(centroids))
+        sums = np.stack(
+            [
+                np.bincount(labels, weights=pixels[:, c], minlength=len(centroids))
+                for c in range(3)
+            ],
+            axis=1,
+        )
+        filled = counts > 0
+        centroids[filled] = sums[filled] / counts[filled, None]
+
+    counts = np.bincount(labels, minlength=len(centroids))
+    order = np.argsort(-counts, kind="stable")
+    return tuple(
+        (
+            tuple(int(round(c)) for c in centroids[i]),
+            float(counts[i] / len(pixels)),
+        )
+        for i in order
+        if counts[i] > 0
+    )
+
+
+def snap_to_palette(color: RGB, palette: Sequence[RGB]) -> RGB:
+    """
+    The vivid palette colour closest in hue to a colour, ignoring the greys of the palette (black, white). The colours
+    are compared at full brightness, a dark red is snapped to the panel's red rather than to black.
+
+    Args:
+        color (RGB): colour to snap
+        palette (Sequence[RGB]): colours of the panel, e.g. Palette.inky_impression().colors
+
+    Returns:
+        RGB: the palette colour, the colour itself if the palette has no vivid colours
+    """
+    candidates = np.asarray(
+        [c for c in palette if _chroma(np.asarray(c)) >= _MIN_CHROMA], dtype=np.float64
+    )
+    if len(candidates) == 0:
+        return tuple(color)
+
+    def normalized(colors: np.ndarray) -> np.ndarray:
+        return colors / np.maximum(colors.max(axis=-1, keepdims=True), 1.0)
+
+    distances = (
+        (normalized(candidates) - normalized(np.asarray(color, dtype=np.float64))) ** 2
+    ).sum(axis=1)
+    return tuple(int(c) for c in candidates[distances.argmin()])
+
+
+def extract_theme(img: Image.Image, palette: Sequence[RGB]) -> CoverTheme:
+    """
+    Theme colours of album cover art: its dominant colours, and the palette colour of the most prominent vivid one as
+    accent.
+
+    Args:
+        img (Image.Image): album cover art
+        palette (Sequence[RGB]): colours of the panel the accent is snapped to
+
+    Returns:
+        CoverTheme: the theme
+    """
+    colors = dominant_colors(img)
+    weights = np.asarray([share for _, share in colors])
+    rgb = np.asarray([color for color, _ in colors], dtype=np.float64)
+    mean = tuple(int(round(c)) for c in weights @ rgb)
+
+    # the largest cluster that isn't grey, more vivid ones win over slightly larger dull ones
+    chroma = _chroma(rgb)
+    scores = np.where(chroma >= _MIN_CHROMA, weights * chroma, 0.0)
+    accent = None
+    if scores.max() > 0:
+        accent = snap_to_palette(colors[int(scores.argmax())][0], palette)
+    return CoverTheme(colors=colors, accent=accent, mean=mean)
+
+
+class CoverThemeCache:
+    """
+    Keeps the theme of the most recently shown album covers, so a cover is only clustered the first time its album
+    is shown. The covers are loaded from the art source at the size they're drawn at, with a CachingArtSource they're
+    the covers cached for the frame anyway.
+    """
+
+    _art_source: IArtSource
+    _palette: Tuple[RGB, ...]
+    _max_items: int
+    _cache: "OrderedDict[str, CoverTheme]"
+    _lock: threading.Lock
+    _hits: int = 0
+    _misses: int = 0
+
+    def __init__(
+        self, art_source: IArtSource, palette: Sequence[RGB], max_items: int = 256
+    ):
+        """
+        Args:
+            art_source (IArtSource): art source to load covers from on a cache miss
+            palette (Sequence[RGB]): colours of the panel the accents are snapped to
+            max_items (int, optional): number of themes to keep, they're tiny. Defaults to 256.
+        """
+        self._art_source = art_source
+        self._palette = tuple(tuple(c) for c in palette)
+        self._max_items = max_items
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_theme(self, url: str, size: Tuple[int, int] = None) -> CoverTheme:
+        """
+        Gets the theme of the album cover art at the given url.
+
+        Args:
+            url (str): url of the album cover art
+            size (Tuple[int, int], optional): size to load the art at on a cache miss, the size it's drawn at shares
+                the art source's cache. Defaults to None, the size of the art at the url.
+
+        Returns:
+            CoverTheme: the theme
+        """
+        with self._lock:
+            if url in self._cache:
+                self._hits += 1
+                self._cache.move_to_end(url)
+                return self._cache[url]
+            self._misses += 1
+
+        logger.debug(f"cover theme cache miss for {url}")
+        theme = extract_theme(self._art_source.get_cover(url, size), self._palette)
+        with self._lock:
+            self._cache[url] = theme
+            self._cache.move_to_end(url)
+            while len(self._cache) > self._max_items:
+                self._cache.popitem(last=False)
+        return theme
+
+    def stats(self) -> ArtCacheStats:
+        with self._lock:
+            return ArtCacheStats(hits=self._hits, misses=self._misses)
@@ -0,0 +1,29 @@
+from pathlib import Path
+from typing import Dict, Tuple
+
+from PIL import Image
+
+from .iart_source import IArtSource, fit_cover
+
+
+class FileArtSource(IArtSource):
+    """
+    Art source that serves album covers from local files, e.g. for benchmarks and simulations without network access.
+    """
+
+    _files: Dict[str, Path]
+
+    def __init__(self, files: Dict[str, str]):
+        """
+        Args:
+            files (Dict[str, str]): mapping of album cover url to the local file to serve for it
+        """
+        self._files = {url: Path(fp) for url, fp in files.items()}
+
+    def get_cover(self, url: str, size: Tuple[int, int] = None) -> Image:
+        if url not in self._files:
+            raise FileNotFoundError(f"no local file for album cover {url}")
+
+        img = Image.open(self._files[url])
+        img.load()
+        return fit_cover(img, size)
@@ -0,0 +1,53 @@
+import logging
+from io import BytesIO
+from typing import Tuple
+
+import requests
+from PIL import Image
+
+from pi_ink.resilience import CircuitBreaker, is_outage
+
+from .iart_source import IArtSource, fit_cover
+
+logger = logging.getLogger(__name__)
+
+
+class HttpArtSource(IArtSource):
+    _session: requests.Session
+    _timeout: Tuple[float, float]
+    _breaker: CircuitBreaker
+
+    def __init__(
+        self,
+        session: requests.Session = None,
+        timeout: Tuple[float, float] = (5, 15),
+        breaker: CircuitBreaker = None,
+    ):
+        """
+        Args:
+            session (requests.Session, optional): session to download with, reusing its connections. Defaults to a new session.
+            timeout (Tuple[float, float], optional): connect and read timeouts in seconds. Defaults to (5, 15).
+            breaker (CircuitBreaker, optional): circuit the downloads go through, failing fast while the CDN or the
+                network is down. Defaults to a CircuitBreaker opened by connection errors, timeouts and 5xx responses.
+        """
+        self._session = session if session is not None else requests.Session()
+        self._timeout = timeout
+        self._breaker = (
+            breaker
+            if breaker is not None
+            else CircuitBreaker("art", is_failure=is_outage)
+        )
+
+    def __download(self, url: str) -> bytes:
+        resp = self._session.get(url, allow_redirects=True, timeout=self._timeout)
+        resp.raise_for_status()
+        return resp.content
+
+    def get_cover(self, url: str, size: Tuple[int, int] = None) -> Image:
+        logger.info(f"downloading album cover from {url}")
+        content = self._breaker.call(self.__download, url)
+
+        # decode straight from memory instead of going through a temporary file
+        img = Image.open(BytesIO(content))
+        img.load()
+        return fit_cover(img, size)
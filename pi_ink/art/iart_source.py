@@ -0,0 +1,37 @@
+from abc import ABC
+from typing import Optional, Tuple
+
+from PIL import Image
+
+
+def fit_cover(img: Image, size: Optional[Tuple[int, int]]) -> Image:
+    """
+    Resizes album cover art to the size it's drawn at, covers already at that size are returned as is.
+
+    Args:
+        img (Image): album cover art
+        size (Tuple[int, int], optional): width and height to resize to, None keeps the size of the art.
+
+    Returns:
+        Image: album cover art of the given size
+    """
+    if size is None or img.size == tuple(size):
+        return img
+    return img.resize(size, Image.LANCZOS)
+
+
+class IArtSource(ABC):
+    def get_cover(self, url: str, size: Tuple[int, int] = None) -> Image:
+        """
+        Gets the album cover art at the given url.
+
+        Args:
+            url (str): url of the album cover art
+            size (Tuple[int, int], optional):
+                width and height the art is drawn at, the art is resized to it. Defaults to None, the size of the art
+                at the url.
+
+        Returns:
+            Image: album cover art
+        """
+        raise NotImplementedError("get_cover() not implemented")
@@ -0,0 +1,3 @@
+from .stats import percentile, summarize
+
+__all__ = ["percentile", "summarize"]
@@ -0,0 +1,72 @@
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List
+
+from pi_ink.art import FileArtSource
+from pi_ink.spotify.models import Track
+
+FIXTURES_DIR = Path(__file__).parent
+ALBUMS = ["cover_a", "cover_b"]
+PHOTOS = ["photo_landscape", "photo_portrait", "photo_small"]
+
+
+def cover_url(album: str, size: int) -> str:
+    """
+    Returns the fake url a fixture album cover is served under by fixture_art_source().
+    """
+    return f"fixture://{album}_{size}.jpg"
+
+
+def fixture_art_source() -> FileArtSource:
+    """
+    Returns an art source serving the bundled fixture album covers, so renders need no network.
+    """
+    files: Dict[str, str] = {}
+    for album in ALBUMS:
+        for size in [300, 640]:
+            files[cover_url(album, size)] = str(FIXTURES_DIR / f"{album}_{size}.jpg")
+    return FileArtSource(files)
+
+
+def fixture_tracks() -> List[Track]:
+    """
+    Returns tracks using the fixture album covers, covering loved/unloved tracks and short/long titles.
+    """
+    played_at = datetime(2024, 1, 1, 12, 0, 0)
+    return [
+        Track(
+            title="Short Title",
+            album="Album A",
+            album_cover_url_300px=cover_url("cover_a", 300),
+            album_cover_url_640px=cover_url("cover_a", 640),
+            artist="Artist A",
+            played_at=played_at,
+            is_loved=True,
+        ),
+        Track(
+            title="A Considerably Longer Track Title That Needs Scaling Down",
+            album="An Album Name That Is Also Quite Long, Deluxe Edition",
+            album_cover_url_300px=cover_url("cover_b", 300),
+            album_cover_url_640px=cover_url("cover_b", 640),
+            artist="Artist B (feat. Artist C, Artist D)",
+            played_at=played_at,
+            is_loved=False,
+        ),
+    ]
+
+
+def fixture_photo_paths() -> List[Path]:
+    """
+    Returns the paths of the bundled fixture photos (landscape, portrait and smaller than the display).
+    """
+    return [FIXTURES_DIR / f"{photo}.jpg" for photo in PHOTOS]
+
+
+def fixture_renderer():
+    """
+    Returns an ImageRenderer rendering with the fixture album covers. A module level function, so it can be used as
+    the renderer_factory of a ProcessRenderer.
+    """
+    from pi_ink.renderers.image_renderer import ImageRenderer
+
+    return ImageRenderer(art_source=fixture_art_source())
@@ -0,0 +1,143 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+import click
+import requests
+
+from pi_ink.bench.fixtures import fixture_art_source, fixture_tracks
+from pi_ink.bench.replay import PlaybackState, ReplaySpotify
+from pi_ink.bench.stats import summarize
+from pi_ink.clock import SystemClock
+from pi_ink.server import FrameClient, FrameServer, ServedPanel
+
+logger = logging.getLogger(__name__)
+
+
+def _timeline(duration: float, change_every: float, offset: int) -> List[PlaybackState]:
+    # the fixture tracks taking turns, each panel starting on a different one
+    tracks = fixture_tracks()
+    timeline = []
+    at = 0.0
+    i = offset
+    while at <= duration + change_every:
+        timeline.append(PlaybackState(at, tracks[i % len(tracks)]))
+        at += change_every
+        i += 1
+    return timeline
+
+
+def run_load_test(
+    panels: int = 4,
+    clients: int = 32,
+    duration: float = 10.0,
+    change_every: float = 2.0,
+    client_poll: float = 0.0,
+) -> Dict[str, Any]:
+    """
+    Serves frames of the fixture tracks from a FrameServer on localhost, changing every change_every seconds, while
+    clients poll them concurrently.
+
+    Args:
+        panels (int, optional): panels served. Defaults to 4.
+        clients (int, optional): clients, spread over the panels. Defaults to 32.
+        duration (float, optional): seconds the clients poll for. Defaults to 10.
+        change_every (float, optional): seconds between track changes. Defaults to 2.
+        client_poll (float, optional): seconds between the polls of a client, 0 polls back to back. Defaults to 0.
+
+    Returns:
+        Dict[str, Any]: requests per second, share of 304s, latency of full and not modified responses in ms and the
+            number of distinct frames downloaded
+    """
+    clock = SystemClock()
+    start = clock.time()
+    served = [
+        ServedPanel(
+            name=f"panel{i}",
+            poll_interval=min(change_every / 4, 1.0),
+            spotify=ReplaySpotify(_timeline(duration, change_every, i), clock, start),
+        )
+        for i in range(panels)
+    ]
+    server = FrameServer(panels=served, port=0, art_source=fixture_art_source())
+    server_thread = threading.Thread(target=server.run, name="frame-server")
+    server_thread.start()
+    while any(frame is None for frame in server.frames().values()):
+        time.sleep(0.05)
+
+    lock = threading.Lock()
+    latencies = {"frame": [], "not_modified": []}
+    etags = set()
+
+    def poll(i: int):
+        client = FrameClient(
+            f"http://127.0.0.1:{server.port}/frames/panel{i % panels}",
+            session=requests.Session(),
+        )
+        own = {"frame": [], "not_modified": []}
+        own_etags = set()
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            frame = client.fetch()
+            own["frame" if frame is not None else "not_modified"].append(
+                (time.perf_counter() - t0) * 1000
+            )
+            if frame is not None:
+                own_etags.add(client.etag)
+            if client_poll > 0:
+                time.sleep(client_poll)
+        with lock:
+            for key, values in own.items():
+                latencies[key].extend(values)
+            etags.update(own_etags)
+
+    threads = [
+        threading.Thread(target=poll, args=(i,), name=f"client-{i}")
+        for i in range(clients)
+    ]
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - t0
+
+    server.stop()
+    server_thread.join()
+
+    total = len(latencies["frame"]) + len(latencies["not_modified"])
+    return {
+        "panels": panels,
+        "clients": clients,
+        "requests": total,
+        "requests_per_second": total / elapsed,
+        "not_modified_share": len(latencies["not_modified"]) / total,
+        "frame_ms": summarize(latencies["frame"]),
+        "not_modified_ms": summarize(latencies["not_modified"]),
+        "distinct_frames": len(etags),
+    }
+
+
+@click.command(name="frame-server")
+@click.option("--panels", default=4, help="panels served")
+@click.option("--clients", default=32, help="clients polling, spread over the panels")
+@click.option("--duration", default=10.0, help="seconds the clients poll for")
+@click.option("--change-every", default=2.0, help="seconds between track changes")
+@click.option(
+    "--client-poll",
+    default=0.0,
+    help="seconds between the polls of a client, 0 polls back to back",
+)
+def main(
+    panels: int, clients: int, duration: float, change_every: float, client_poll: float
+):
+    logging.basicConfig(level=logging.WARNING)
+    report = run_load_test(panels, clients, duration, change_every, client_poll)
+    click.echo(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import json
+import logging
+import statistics
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, List, Tuple
+
+import click
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TARGETS = (
+    "pi_ink.cmd.spotipi",
+    "pi_ink.apps",
+    "pi_ink.displays",
+    "pi_ink.renderers",
+    "pi_ink.apps.spotipi",
+    "pi_ink.apps.pictureframe",
+)
+
+# third party packages that are slow to import or optional, reported when a target pulls them in
+HEAVY_PACKAGES = (
+    "inky",
+    "tkinter",
+    "RPi",
+    "spotipy",
+    "requests",
+    "PIL",
+    "numpy",
+    "vyper",
+)
+
+
+@dataclass(frozen=True)
+class ImportTiming:
+    module: str
+    self_us: int
+    cumulative_us: int
+
+
+def parse_importtime(stderr: str) -> List[ImportTiming]:
+    """
+    Parses the output of python -X importtime.
+
+    Args:
+        stderr (str): stderr of the interpreter
+
+    Returns:
+        List[ImportTiming]: one timing per imported module, in import order
+    """
+    timings = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:") :].split("|")
+        timings.append(
+            ImportTiming(
+                module=module.strip(),
+                self_us=int(self_us),
+                cumulative_us=int(cumulative_us),
+            )
+        )
+    return timings
+
+
+def time_import(target: str) -> Tuple[List[ImportTiming], str]:
+    """
+    Imports the target in a fresh interpreter with -X importtime.
+
+    Returns:
+        Tuple[List[ImportTiming], str]: the timings, and the error if the import failed (else "")
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        capture_output=True,
+        text=True,
+    )
+    error = ""
+    if proc.returncode != 0:
+        error = proc.stderr.strip().splitlines()[-1]
+    return parse_importtime(proc.stderr), error
+
+
+def measure_target(target: str, repeat: int = 5, top: int = 10) -> Dict[str, Any]:
+    """
+    Measures the cold-start import time of a module.
+
+    Args:
+        target (str): module to import
+        repeat (int, optional): number of fresh interpreters to import in. Defaults to 5.
+        top (int, optional): number of slowest imports (by self time) to report. Defaults to 10.
+
+    Returns:
+        Dict[str, Any]: median/min cumulative import time in ms, heavy packages imported and the slowest imports
+    """
+    runs = []
+    timings: List[ImportTiming] = []
+    for _ in range(repeat):
+        timings, error = time_import(target)
+        if error:
+            return {"target": target, "error": error}
+        runs.append(next(t.cumulative_us for t in timings if t.module == target))
+
+    imported = {t.module.split(".")[0] for t in timings}
+    return {
+        "target": target,
+        "median_ms": statistics.median(runs) / 1000,
+        "min_ms": min(runs) / 1000,
+        "modules": len(timings),
+        "heavy_imports": [p for p in HEAVY_PACKAGES if p in imported],
+        "slowest": [
+            {"module": t.module, "self_ms": t.self_us / 1000}
+            for t in sorted(timings, key=lambda t: t.self_us, reverse=True)[:top]
+        ],
+    }
+
+
+@click.command(name="importtime")
+@click.argument("targets", nargs=-1)
+@click.option("--repeat", "-n", default=5, help="fresh interpreters per target")
+@click.option("--top", default=10, help="slowest imports to list per target")
+def main(targets: Tuple[str, ...], repeat: int, top: int):
+    report = [measure_target(t, repeat, top) for t in targets or DEFAULT_TARGETS]
+    click.echo(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
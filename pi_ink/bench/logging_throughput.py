@@ -0,0 +1,154 @@
+import io
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+import click
+
+from pi_ink.bench.stats import summarize
+from pi_ink.log import JsonFormatter, LogFilter, setup_logging
+
+logger = logging.getLogger(__name__)
+
+TEXT_FORMAT = "%(asctime)s | %(name)60s | %(funcName)60s() | %(levelname)8s | %(message)s | extra=%(extra)s"
+
+
+class _SlowStream(io.StringIO):
+    """
+    Stream that takes a fixed time per write, like a serial console or a busy journald.
+    """
+
+    _write_latency: float
+    lines: int = 0
+
+    def __init__(self, write_latency: float):
+        super().__init__()
+        self._write_latency = write_latency
+
+    def write(self, s: str) -> int:
+        time.sleep(self._write_latency)
+        self.lines += 1
+        return len(s)
+
+
+class _LegacyLogFilter(logging.Filter):
+    """
+    The filter the cli used before the queue pipeline, building a throwaway LogRecord per call to find the extra keys.
+    """
+
+    def filter(self, record):
+        base_keys = logging.LogRecord(
+            "", logging.DEBUG, "", 0, "", None, None, ""
+        ).__dict__.keys()
+        extra_keys = [key for key in record.__dict__.keys() if key not in base_keys]
+        record.extra = {key: record.__dict__[key] for key in extra_keys}
+        return True
+
+
+def _setup(pipeline: str, fmt: str, stream: _SlowStream):
+    """
+    Sets up the root logger for one of the benchmarked pipelines.
+
+    Returns:
+        a function that blocks until every record has been written
+    """
+    if pipeline == "queue":
+        listener = setup_logging(
+            logging.INFO, fmt=TEXT_FORMAT, json_logs=fmt == "json", stream=stream
+        )
+        return listener.stop
+
+    handler = logging.StreamHandler(stream=stream)
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.addFilter(_LegacyLogFilter() if pipeline == "legacy" else LogFilter())
+        handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    root = logging.getLogger()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+    root.addHandler(handler)
+    root.setLevel(logging.INFO)
+    return lambda: None
+
+
+def run_logging_benchmark(
+    pipeline: str,
+    fmt: str = "text",
+    threads: int = 2,
+    records: int = 2000,
+    write_latency: float = 0.0002,
+) -> Dict[str, Any]:
+    """
+    Logs from several threads (like the render and gpio threads) and measures how long each logging call blocks its
+    caller and how long it takes until every record is written.
+
+    Args:
+        pipeline (str): "legacy" (synchronous, old filter), "sync" (synchronous, new filter) or "queue"
+        fmt (str, optional): "text" or "json". Defaults to "text".
+        threads (int, optional): number of logging threads. Defaults to 2.
+        records (int, optional): records logged per thread. Defaults to 2000.
+        write_latency (float, optional): seconds the output stream takes per write. Defaults to 0.0002.
+
+    Returns:
+        Dict[str, Any]: caller latency in microseconds, records per second and records written
+    """
+    stream = _SlowStream(write_latency)
+    flush = _setup(pipeline, fmt, stream)
+    bench_logger = logging.getLogger("pi_ink.bench.logging")
+    latencies: List[List[float]] = [[] for _ in range(threads)]
+
+    def log(idx: int):
+        samples = latencies[idx]
+        for i in range(records):
+            t0 = time.perf_counter()
+            bench_logger.info(
+                "rendered frame %d", i, extra={"worker": idx, "cursor": i % 7}
+            )
+            samples.append((time.perf_counter() - t0) * 1e6)
+
+    workers = [threading.Thread(target=log, args=(i,)) for i in range(threads)]
+    t0 = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    logged = time.perf_counter() - t0
+    flush()
+    written = time.perf_counter() - t0
+
+    return {
+        "pipeline": pipeline,
+        "format": fmt,
+        "caller_latency_us": summarize([s for samples in latencies for s in samples]),
+        "callers_done_seconds": logged,
+        "records_per_second": threads * records / written,
+        "records_written": stream.lines,
+    }
+
+
+@click.command(name="logging-throughput")
+@click.option("--threads", default=2, help="number of logging threads")
+@click.option("--records", default=2000, help="records logged per thread")
+@click.option(
+    "--write-latency", default=0.0002, help="seconds the output takes per write"
+)
+def main(threads: int, records: int, write_latency: float):
+    report = [
+        run_logging_benchmark(pipeline, fmt, threads, records, write_latency)
+        for pipeline, fmt in [
+            ("legacy", "text"),
+            ("sync", "text"),
+            ("sync", "json"),
+            ("queue", "text"),
+            ("queue", "json"),
+        ]
+    ]
+    click.echo(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict
+
+import click
+from PIL import Image
+
+from pi_ink.bench.pictureframe_latency import make_photos
+from pi_ink.bench.stats import summarize
+from pi_ink.phash import PhotoHashIndex
+
+logger = logging.getLogger(__name__)
+
+
+def run_build_benchmark(count: int = 200, workers: int = None) -> Dict[str, Any]:
+    """
+    Hashes a synthetic library, with a rescaled copy of every tenth photo, on one core and on a process pool, then
+    updates it again unchanged and with one photo modified.
+
+    Args:
+        count (int, optional): number of photos. Defaults to 200.
+        workers (int, optional): processes of the pool. Defaults to the number of cores.
+
+    Returns:
+        Dict[str, Any]: seconds of each update and the near-duplicates found
+    """
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        pic_dir = Path(tmp) / "photos"
+        pic_dir.mkdir()
+        make_photos(pic_dir, count, size=(2048, 1536))
+        for fp in sorted(pic_dir.iterdir())[::10]:
+            with Image.open(fp) as img:
+                img.resize((1024, 768)).save(
+                    fp.with_name(f"copy_{fp.name}"), quality=70
+                )
+        fps = sorted(pic_dir.iterdir())
+
+        serial = PhotoHashIndex(workers=1)
+        report["serial_s"] = serial.update(fps).seconds
+
+        index = PhotoHashIndex(Path(tmp) / "photo-hashes.json", workers=workers)
+        report["pool_s"] = index.update(fps).seconds
+
+        reloaded = PhotoHashIndex(Path(tmp) / "photo-hashes.json", workers=workers)
+        report["unchanged_s"] = reloaded.update(fps).seconds
+        os.utime(fps[0])
+        report["one_modified_s"] = reloaded.update(fps).seconds
+
+        report["photos"] = len(fps)
+        report["near_duplicates"] = sum(
+            1
+            for fp in fps
+            if fp.name.startswith("copy_") and len(index.near(fp, 6)) > 0
+        )
+    return report
+
+
+def run_lookup_benchmark(
+    library: int = 100_000,
+    window: int = 20,
+    distance: int = 6,
+    queries: int = 2000,
+) -> Dict[str, Any]:
+    """
+    Times the sampler's near-duplicate check and library-wide lookups on an index of synthetic hashes, a tenth of them
+    bursts of near-identical shots.
+
+    Args:
+        library (int, optional): number of photos. Defaults to 100k.
+        window (int, optional): recently shown photos the sampler checks against. Defaults to 20.
+        distance (int, optional): bits near-duplicates differ in at most. Defaults to 6.
+        queries (int, optional): timed calls of each. Defaults to 2000.
+
+    Returns:
+        Dict[str, Any]: latency in ms of the window check and of the lookup
+    """
+    rnd = random.Random(0)
+    entries = {}
+    while len(entries) < library:
+        h = rnd.getrandbits(64)
+        # one in ten photos starts a burst of up to 5 shots a few bits apart
+        shots = rnd.randint(2, 5) if rnd.random() < 0.1 else 1
+        for _ in range(shots):
+            for bit in rnd.sample(range(64), rnd.randint(0, 3)):
+                h ^= 1 << bit
+            entries[f"/photos/{len(entries):06d}.jpg"] = (0, 0, h)
+
+    index = PhotoHashIndex()
+    index._PhotoHashIndex__set_entries(entries)
+    fps = [Path(path) for path in entries]
+    t0 = time.perf_counter()
+    index.near(fps[0], distance)
+    report = {"lookup_build_ms": (time.perf_counter() - t0) * 1000}
+
+    window_ms, near_ms, found = [], [], 0
+    for _ in range(queries):
+        fp = rnd.choice(fps)
+        recent = rnd.sample(fps, window)
+        t0 = time.perf_counter()
+        index.is_near_duplicate(fp, recent, distance)
+        window_ms.append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        found += len(index.near(fp, distance))
+        near_ms.append((time.perf_counter() - t0) * 1000)
+
+    report["window_check_ms"] = summarize(window_ms)
+    report["near_ms"] = summarize(near_ms)
+    report["near_duplicates_per_photo"] = found / queries
+    return report
+
+
+@click.command(name="photo-index")
+@click.option("--photos", default=200, help="photos of the synthetic library hashed")
+@click.option(
+    "--workers", default=None, type=int, help="processes photos are hashed with"
+)
+@click.option(
+    "--library", default=100_000, help="photos of the synthetic index queried"
+)
+@click.option(
+    "--window", default=20, help="recently shown photos checked for near-duplicates"
+)
+@click.option("--distance", default=6, help="bits near-duplicates differ in at most")
+def main(photos: int, workers: int, library: int, window: int, distance: int):
+    logging.basicConfig(level=logging.WARNING)
+    report = {
+        "build": run_build_benchmark(photos, workers),
+        "lookup": run_lookup_benchmark(library, window, distance),
+    }
+    click.echo(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
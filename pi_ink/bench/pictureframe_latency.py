@@ -0,0 +1,195 @@
+import json
+import logging
+import random
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import click
+from PIL import Image, ImageDraw
+
+from pi_ink.apps.pictureframe import PictureFrame
+from pi_ink.bench.stats import summarize
+from pi_ink.displays import FrameRecord, PanelModel, RecordingMockDisplay
+from pi_ink.gpio import ScriptedPress, SimulatedGpio
+from pi_ink.renderers import ImageRenderer
+
+logger = logging.getLogger(__name__)
+
+
+class _TimedRenderer(ImageRenderer):
+    """
+    ImageRenderer that records when each picture frame render starts, and stamps it on the frame for the display to
+    record.
+    """
+
+    render_starts: List[float]
+
+    def __init__(self):
+        super().__init__()
+        self.render_starts = []
+
+    def render_picture_frame(self, picture: Image) -> Any:
+        start = time.time()
+        self.render_starts.append(start)
+        frame = super().render_picture_frame(picture)
+        frame.info["rendered_at"] = start
+        return frame
+
+
+def make_photos(pic_dir: Path, count: int = 20, size=(1024, 768)) -> None:
+    """
+    Writes synthetic photos into pic_dir, so the benchmark needs no photo library.
+
+    Args:
+        pic_dir (Path): directory to write the photos into
+        count (int, optional): number of photos. Defaults to 20.
+        size (tuple, optional): size of each photo. Defaults to (1024, 768).
+    """
+    rnd = random.Random(0)
+    for i in range(count):
+        img = Image.new("RGB", size, tuple(rnd.randrange(256) for _ in range(3)))
+        draw = ImageDraw.Draw(img)
+        for _ in range(30):
+            x0, y0 = rnd.randrange(size[0]), rnd.randrange(size[1])
+            draw.ellipse(
+                (x0, y0, x0 + rnd.randrange(50, 300), y0 + rnd.randrange(50, 300)),
+                fill=tuple(rnd.randrange(256) for _ in range(3)),
+            )
+        img.save(pic_dir / f"photo_{i:03d}.jpg", quality=85)
+
+
+def burst_script(
+    pin: int, bursts: int = 10, burst_size: int = 5, press_gap=0.12, burst_gap=2.0
+) -> List[ScriptedPress]:
+    """
+    Builds a script of bursts of quick presses of one button.
+
+    Returns:
+        List[ScriptedPress]: scripted presses
+    """
+    script = []
+    for b in range(bursts):
+        for p in range(burst_size):
+            script.append(ScriptedPress(at=b * burst_gap + p * press_gap, pin=pin))
+    return script
+
+
+def run_latency_benchmark(
+    script: List[ScriptedPress],
+    pic_dir: Optional[Path] = None,
+    show_time: float = 0.0,
+    timeout: float = 120.0,
+) -> Dict[str, Any]:
+    """
+    Runs PictureFrame against a simulated gpio backend and a recording display, and measures, for every press, the
+    time until the first frame rendered after the press is ready.
+
+    Args:
+        script (List[ScriptedPress]): presses to replay
+        pic_dir (Path, optional): directory of pictures. Defaults to a directory of synthetic photos.
+        show_time (float, optional): time in seconds the mock panel blocks for on each refresh. Defaults to 0.
+        timeout (float, optional): maximum time in seconds to wait for the frames after the last press. Defaults to 120.
+
+    Returns:
+        Dict[str, Any]: latency summary in milliseconds, press and frame counts
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if pic_dir is None:
+            pic_dir = Path(temp_dir)
+            make_photos(pic_dir)
+
+        gpio = SimulatedGpio(script)
+        display = RecordingMockDisplay(
+            panel=PanelModel(refresh_time=show_time, blocking=True)
+        )
+        renderer = _TimedRenderer()
+        app = PictureFrame(
+            gpio=gpio,
+            display=display,
+            img_renderer=renderer,
+            pic_dir=pic_dir,
+            change_picture_interval=10**9,  # only buttons change the picture
+        )
+        app_thread = threading.Thread(target=app.run, name="pictureframe")
+        app_thread.start()
+
+        # wait for the initial frame before pressing anything
+        while display.frame_count() == 0:
+            time.sleep(0.01)
+
+        gpio.start()
+        gpio.done.wait()
+
+        def shown_after(press_ts: float) -> Optional[FrameRecord]:
+            # a render the panel wasn't ready for isn't recorded, frames are matched by when their render started
+            return next(
+                (
+                    record
+                    for record in list(display.records)
+                    if record.rendered_at is not None and record.rendered_at >= press_ts
+                ),
+                None,
+            )
+
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            # the frame rendered after the last press must also be shown
+            if all(shown_after(ts) is not None for _, ts in gpio.presses):
+                break
+            time.sleep(0.01)
+
+        app.stop()
+        app_thread.join()
+        gpio.cleanup()
+
+    latencies = []
+    unserved = 0
+    for _, press_ts in gpio.presses:
+        frame = shown_after(press_ts)
+        if frame is None:
+            unserved += 1
+            continue
+        latencies.append((frame.ready_at - press_ts) * 1000)
+
+    return {
+        "presses": len(gpio.presses),
+        "frames": len(display.records) - 1,  # excluding the initial frame
+        "unserved_presses": unserved,
+        "press_to_frame_ready_ms": summarize(latencies),
+    }
+
+
+@click.command(name="pictureframe-latency")
+@click.option("--bursts", default=10, help="number of bursts of presses")
+@click.option("--burst-size", default=5, help="presses per burst")
+@click.option("--press-gap", default=0.12, help="seconds between presses in a burst")
+@click.option("--burst-gap", default=2.0, help="seconds between bursts")
+@click.option(
+    "--show-time", default=0.0, help="seconds the mock panel blocks per refresh"
+)
+@click.option("--pic-dir", default=None, help="directory of pictures to use")
+def main(
+    bursts: int,
+    burst_size: int,
+    press_gap: float,
+    burst_gap: float,
+    show_time: float,
+    pic_dir: str,
+):
+    logging.basicConfig(level=logging.WARNING)
+    script = burst_script(
+        PictureFrame._btns[0], bursts, burst_size, press_gap, burst_gap
+    )
+    report = run_latency_benchmark(
+        script,
+        pic_dir=Path(pic_dir) if pic_dir is not None else None,
+        show_time=show_time,
+    )
+    click.echo(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
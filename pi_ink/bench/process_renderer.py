@@ -0,0 +1,95 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List
+
+import click
+
+from pi_ink.bench.fixtures import fixture_renderer, fixture_tracks
+from pi_ink.bench.stats import summarize
+from pi_ink.renderers import IRenderer, ProcessRenderer
+
+logger = logging.getLogger(__name__)
+
+
+class _InputProbe:
+    """
+    Stands in for the gpio callback thread: wakes up every interval, like a button press would, and records how late
+    it got to run. Lateness grows when the renderer holds the GIL.
+    """
+
+    _interval: float
+    _stop: threading.Event
+    _thread: threading.Thread
+    lateness: List[float]
+
+    def __init__(self, interval: float = 0.005):
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.__run, name="input-probe")
+        self.lateness = []
+
+    def __run(self):
+        due = time.perf_counter() + self._interval
+        while not self._stop.is_set():
+            time.sleep(max(0.0, due - time.perf_counter()))
+            self.lateness.append((time.perf_counter() - due) * 1000)
+            due = time.perf_counter() + self._interval
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+def run_render_benchmark(renderer: IRenderer, frames: int = 50) -> Dict[str, Any]:
+    """
+    Renders frames back to back, like a burst of track changes, while probing input latency.
+
+    Args:
+        renderer (IRenderer): renderer to benchmark
+        frames (int, optional): number of frames to render. Defaults to 50.
+
+    Returns:
+        Dict[str, Any]: frames per second, render latency and input lateness in ms
+    """
+    tracks = fixture_tracks()
+    renderer.render_frame_from_track(tracks[0])  # warm up, starts the worker
+
+    latencies = []
+    with _InputProbe() as probe:
+        t0 = time.perf_counter()
+        for i in range(frames):
+            t1 = time.perf_counter()
+            renderer.render_frame_from_track(tracks[i % len(tracks)])
+            latencies.append((time.perf_counter() - t1) * 1000)
+        elapsed = time.perf_counter() - t0
+
+    return {
+        "frames_per_second": frames / elapsed,
+        "render_ms": summarize(latencies),
+        "input_lateness_ms": summarize(probe.lateness),
+    }
+
+
+@click.command(name="process-renderer")
+@click.option("--frames", "-n", default=50, help="frames to render per mode")
+def main(frames: int):
+    process_renderer = ProcessRenderer(renderer_factory=fixture_renderer)
+    try:
+        report = {
+            "in_process": run_render_benchmark(fixture_renderer(), frames),
+            "process": run_render_benchmark(process_renderer, frames),
+        }
+    finally:
+        process_renderer.close()
+    click.echo(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
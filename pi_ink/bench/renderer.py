@@ -0,0 +1,319 @@
+import json
+import logging
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+import click
+from PIL import Image
+
+from pi_ink.art import extract_theme
+from pi_ink.bench.fixtures import (fixture_art_source, fixture_photo_paths,
+                                   fixture_tracks)
+from pi_ink.bench.stats import summarize
+from pi_ink.displays.packed_frame import Palette
+from pi_ink.renderers import ImageRenderer
+from pi_ink.renderers.scene import Scene, SceneNode
+from pi_ink.spotify.models import Track
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = Path(__file__).parent / "baselines" / "renderer.json"
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    setup: Callable[[int], Any]  # called with the iteration number, not timed
+    run: Callable[[Any], Any]  # called with the result of setup, timed
+
+
+def renderer_stages(renderer: ImageRenderer) -> List[Stage]:
+    """
+    Builds the benchmarked stages of the renderer, using the bundled fixtures only.
+
+    Args:
+        renderer (ImageRenderer): renderer to benchmark, should load art from the fixtures
+
+    Returns:
+        List[Stage]: stages to benchmark
+    """
+    tracks = fixture_tracks()
+    photos = []
+    for fp in fixture_photo_paths():
+        photo = Image.open(fp)
+        photo.load()
+        photos.append(photo)
+
+    # the private layers of the renderer
+    render_bg = renderer._ImageRenderer__render_bg
+    render_heart_layer = renderer._ImageRenderer__render_heart_layer
+    layout_info = renderer._ImageRenderer__layout_info
+    render_text_layer = renderer._ImageRenderer__render_text_layer
+    scene_layers = renderer._ImageRenderer__scene_layers
+
+    def track_for(i: int):
+        return tracks[i % len(tracks)]
+
+    art_source = fixture_art_source()
+    palette = Palette.inky_impression().colors
+
+    def cover_for(i: int):
+        # the theme is extracted once per album, time the extraction not the cache
+        size = renderer._layout.cover_size
+        return art_source.get_cover(track_for(i).album_cover_url_300px, (size, size))
+
+    def uncached_heart(_: int):
+        # the heart is rendered once per renderer, time the rendering not the cache
+        renderer._heart_layer = None
+
+    def text_layers(track):
+        layers = layout_info(
+            track,
+            left_margin=renderer._layout.text_left,
+            text_anchor_y=renderer._layout.text_top,
+        )
+        return [render_text_layer(layer) for layer in layers]
+
+    def scene_for(i: int):
+        nodes = [
+            SceneNode(name, fingerprint, render())
+            for name, fingerprint, render in scene_layers(track_for(i))
+        ]
+        return Scene(renderer._layout.size), nodes
+
+    def after(change: Callable[[Track], Track]):
+        # renders a track, then times rendering it again with a change
+        def setup(i: int):
+            track = track_for(i)
+            renderer.render_frame_from_track(track)
+            return change(track)
+
+        return setup
+
+    return [
+        Stage("bg_layer", track_for, render_bg),
+        Stage("heart_layer", uncached_heart, lambda _: render_heart_layer()),
+        Stage("text_layers", track_for, text_layers),
+        Stage("cover_theme", cover_for, lambda img: extract_theme(img, palette)),
+        Stage("composite", scene_for, lambda args: args[0].update(args[1])),
+        Stage(
+            "rerender_title",
+            after(lambda t: replace(t, title=t.title + " (Live)")),
+            renderer.render_frame_from_track,
+        ),
+        Stage(
+            "rerender_is_loved",
+            after(lambda t: replace(t, is_loved=not t.is_loved)),
+            renderer.render_frame_from_track,
+        ),
+        Stage(
+            "render_frame_from_track",
+            track_for,
+            renderer.render_frame_from_track,
+        ),
+        Stage(
+            "render_picture_frame",
+            lambda i: photos[i % len(photos)],
+            renderer.render_picture_frame,
+        ),
+    ]
+
+
+def measure_stage(stage: Stage, iterations: int, warmup: int = 2) -> Dict[str, Any]:
+    """
+    Times a stage and measures its allocations.
+
+    Python heap allocations are measured with tracemalloc, PIL allocates image memory outside of the Python heap, so
+    the number of images PIL allocates per call is reported alongside it.
+
+    Args:
+        stage (Stage): stage to measure
+        iterations (int): number of timed calls
+        warmup (int, optional): number of untimed calls made first. Defaults to 2.
+
+    Returns:
+        Dict[str, Any]: mean/p95 time in ms, python heap peak in KiB and PIL images allocated per call
+    """
+    for i in range(warmup):
+        stage.run(stage.setup(i))
+
+    times = []
+    for i in range(iterations):
+        args = stage.setup(i)
+        t0 = time.perf_counter()
+        stage.run(args)
+        times.append((time.perf_counter() - t0) * 1000)
+
+    # measure allocations separately, tracing slows the calls down
+    mem_iterations = min(iterations, 5)
+    py_peak = 0
+    pil_new = 0
+    for i in range(mem_iterations):
+        args = stage.setup(i)
+        Image.core.reset_stats()
+        tracemalloc.start()
+        stage.run(args)
+        py_peak = max(py_peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        pil_new += Image.core.get_stats()["new_count"]
+
+    summary = summarize(times)
+    return {
+        "iterations": iterations,
+        "mean_ms": summary["mean"],
+        "p95_ms": summary["p95"],
+        "py_peak_kib": py_peak / 1024,
+        "pil_images_per_call": pil_new / mem_iterations,
+    }
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+) -> List[str]:
+    """
+    Compares results to a baseline.
+
+    Args:
+        results (Dict[str, Dict[str, Any]]): results of measure_stage() per stage
+        baseline (Dict[str, Dict[str, Any]]): previously saved results
+        tolerance (float): allowed relative slow down, e.g. 0.15 for 15%
+
+    Returns:
+        List[str]: description of each regression, empty if there are none
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        for key in ["mean_ms", "p95_ms", "py_peak_kib"]:
+            base = baseline[name].get(key)
+            if base is not None and result[key] > base * (1 + tolerance):
+                regressions.append(
+                    f"{name}.{key}: {result[key]:.2f} > {base:.2f} (+{(result[key] / base - 1) * 100:.1f}%)"
+                )
+    return regressions
+
+
+def baseline_changes(
+    results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]]
+) -> List[str]:
+    """
+    Describes how results differ from a baseline, stage by stage, for the commit re-recording it.
+
+    Args:
+        results (Dict[str, Dict[str, Any]]): results of measure_stage() per stage
+        baseline (Dict[str, Dict[str, Any]]): previously saved results
+
+    Returns:
+        List[str]: one line per new, changed or removed stage
+    """
+    changes = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            changes.append(
+                f"{name}: new, mean {result['mean_ms']:.2f}ms, py peak {result['py_peak_kib']:.1f}KiB"
+            )
+            continue
+        moved = []
+        for key in ["mean_ms", "p95_ms", "py_peak_kib", "pil_images_per_call"]:
+            base = baseline[name].get(key)
+            if base is not None and base != result[key]:
+                change = f"{(result[key] / base - 1) * 100:+.1f}%" if base else "new"
+                moved.append(f"{key} {base:.2f} -> {result[key]:.2f} ({change})")
+        if len(moved) > 0:
+            changes.append(f"{name}: " + ", ".join(moved))
+    for name in sorted(set(baseline) - set(results)):
+        changes.append(f"{name}: not measured")
+    return changes
+
+
+@click.command(name="bench-renderer")
+@click.option("--iterations", "-n", default=30, help="timed calls per stage")
+@click.option("--stage", "stages", multiple=True, help="only run the given stage(s)")
+@click.option(
+    "--baseline",
+    default=str(DEFAULT_BASELINE),
+    help="baseline json to compare against",
+)
+@click.option(
+    "--save-baseline",
+    default=False,
+    is_flag=True,
+    help="overwrite the baseline and print how each stage moved, commit it on its own with those changes",
+)
+@click.option(
+    "--tolerance", default=0.15, help="allowed relative slow down before failing"
+)
+@click.option(
+    "--layer-workers",
+    default=None,
+    type=int,
+    help="threads a frame's layers are rendered with, 1 renders them sequentially",
+)
+@click.option(
+    "--resolution",
+    default=(600, 448),
+    type=(int, int),
+    help="width and height of the frames, the baseline is of 600x448 frames",
+)
+def main(
+    iterations: int,
+    stages: List[str],
+    baseline: str,
+    save_baseline: bool,
+    tolerance: float,
+    layer_workers: int,
+    resolution: Tuple[int, int],
+):
+    logging.basicConfig(level=logging.WARNING)
+    renderer = ImageRenderer(
+        art_source=fixture_art_source(),
+        layer_workers=layer_workers,
+        resolution=resolution,
+    )
+
+    results = {}
+    for stage in renderer_stages(renderer):
+        if len(stages) > 0 and stage.name not in stages:
+            continue
+        results[stage.name] = measure_stage(stage, iterations)
+        r = results[stage.name]
+        click.echo(
+            f"{stage.name:32s} mean {r['mean_ms']:8.2f}ms  p95 {r['p95_ms']:8.2f}ms  "
+            f"py peak {r['py_peak_kib']:9.1f}KiB  pil images/call {r['pil_images_per_call']:5.1f}"
+        )
+
+    baseline_fp = Path(baseline)
+    if save_baseline:
+        if baseline_fp.exists():
+            for change in baseline_changes(
+                results, json.loads(baseline_fp.read_text())
+            ):
+                click.echo(f"BASELINE {change}")
+        baseline_fp.parent.mkdir(parents=True, exist_ok=True)
+        baseline_fp.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+        click.echo(f"saved baseline to {baseline_fp}")
+        return
+
+    if not baseline_fp.exists():
+        click.echo(f"no baseline at {baseline_fp}, run with --save-baseline")
+        return
+
+    regressions = compare_to_baseline(
+        results, json.loads(baseline_fp.read_text()), tolerance
+    )
+    for regression in regressions:
+        click.echo(f"REGRESSION {regression}")
+    if len(regressions) > 0:
+        sys.exit(1)
+    click.echo("no regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+import bisect
+import json
+import logging
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import click
+from PIL import Image
+
+from pi_ink.apps.spotipi import SpotiPi
+from pi_ink.art import CachingArtSource, FileArtSource
+from pi_ink.bench.fixtures import ALBUMS, FIXTURES_DIR
+from pi_ink.clock import IClock, VirtualClock
+from pi_ink.displays import PanelModel, RecordingMockDisplay
+from pi_ink.renderers import ImageRenderer
+from pi_ink.spotify.models import Track
+
+logger = logging.getLogger(__name__)
+
+# virtual time the replays start at, 2024-01-01 00:00:00 UTC
+REPLAY_EPOCH = 1704067200.0
+REPLAY_START = datetime(2024, 1, 1)
+
+
+@dataclass(frozen=True)
+class PlaybackState:
+    at: float  # seconds since the start of the timeline
+    track: Optional[Track]  # None when nothing is playing
+
+
+class ReplaySpotify:
+    """
+    Stand-in for the Spotify wrapper that answers from a timeline of playback states at the current (virtual) time,
+    counting the Spotify API calls the real wrapper would have made.
+    """
+
+    _timeline: List[PlaybackState]
+    _times: List[float]
+    _clock: IClock
+    _start: float
+    calls: Dict[str, int]
+
+    def __init__(self, timeline: List[PlaybackState], clock: IClock, start: float):
+        """
+        Args:
+            timeline (List[PlaybackState]): playback states, sorted by time
+            clock (IClock): clock giving the current time
+            start (float): clock time the timeline starts at
+        """
+        self._timeline = timeline
+        self._times = [state.at for state in timeline]
+        self._clock = clock
+        self._start = start
+        self.calls = {
+            "current_playback": 0,
+            "current_user_recently_played": 0,
+            "current_user_saved_tracks_contains": 0,
+        }
+
+    def __index_now(self) -> int:
+        return bisect.bisect_right(self._times, self._clock.time() - self._start) - 1
+
+    def get_currently_playing(self) -> Optional[Track]:
+        self.calls["current_playback"] += 1
+        idx = self.__index_now()
+        if idx < 0 or self._timeline[idx].track is None:
+            return None
+
+        self.is_track_saved(self._timeline[idx].track.title)
+        return self._timeline[idx].track
+
+    def get_last_played(
+        self, limit: int = 1, with_loved: bool = True
+    ) -> Optional[List[Track]]:
+        self.calls["current_user_recently_played"] += 1
+        idx = self.__index_now()
+        played = [
+            state.track
+            for state in self._timeline[: max(idx, 0) + 1]
+            if state.track is not None
+        ]
+        if len(played) == 0:
+            # nothing played yet today, fall back to what was played "yesterday"
+            played = [state.track for state in self._timeline if state.track][:1]
+
+        tracks = played[::-1][:limit]
+        if with_loved:
+            for track in tracks:
+                self.is_track_saved(track.title)
+        return tracks
+
+    def is_track_saved(self, tracks) -> List[bool]:
+        self.calls["current_user_saved_tracks_contains"] += 1
+        return [False]
+
+
+class _CountingRenderer(ImageRenderer):
+    renders: int = 0
+    render_cpu: float = 0.0
+
+    def render_frame_from_track(self, track: Track) -> Image:
+        t0 = time.process_time()
+        frame = super().render_frame_from_track(track)
+        self.render_cpu += time.process_time() - t0
+        self.renders += 1
+        return frame
+
+    def render_mosaic(self, tracks: List[Track]) -> Image:
+        t0 = time.process_time()
+        frame = super().render_mosaic(tracks)
+        self.render_cpu += time.process_time() - t0
+        self.renders += 1
+        return frame
+
+
+def synthetic_day(seed: int = 0) -> List[PlaybackState]:
+    """
+    Generates a day of listening: a few sessions (morning, afternoon, evening) of albums played through, with pauses
+    in between.
+
+    Args:
+        seed (int, optional): random seed. Defaults to 0.
+
+    Returns:
+        List[PlaybackState]: playback states of the day
+    """
+    rnd = random.Random(seed)
+    sessions = [(7.5, 1.0), (13.0, 3.0), (19.0, 2.5)]  # (start hour, duration hours)
+    timeline = [PlaybackState(at=0.0, track=None)]
+    album_no = 0
+
+    for start_h, duration_h in sessions:
+        t = start_h * 3600 + rnd.uniform(-900, 900)
+        end = t + duration_h * 3600
+        while t < end:
+            album_no += 1
+            for track_no in range(rnd.randint(6, 14)):
+                if t >= end:
+                    break
+                track = Track(
+                    title=f"Track {track_no + 1} of Album {album_no}",
+                    album=f"Album {album_no}",
+                    album_cover_url_300px=f"fixture://album_{album_no}_300.jpg",
+                    album_cover_url_640px=f"fixture://album_{album_no}_640.jpg",
+                    artist=f"Artist {album_no % 7}",
+                    played_at=REPLAY_START + timedelta(seconds=t),
+                    is_loved=rnd.random() < 0.2,
+                )
+                timeline.append(PlaybackState(at=t, track=track))
+                t += rnd.uniform(150, 330)
+        timeline.append(PlaybackState(at=t, track=None))
+
+    return timeline
+
+
+def load_timeline(fp: str) -> List[PlaybackState]:
+    """
+    Loads a recorded timeline, a json list of {"at": seconds, "track": null or Track fields (without played_at)}.
+
+    Args:
+        fp (str): path of the timeline
+
+    Returns:
+        List[PlaybackState]: playback states sorted by time
+    """
+    timeline = []
+    for entry in json.loads(Path(fp).read_text()):
+        track = None
+        if entry.get("track") is not None:
+            track = Track(
+                played_at=REPLAY_START + timedelta(seconds=entry["at"]),
+                **entry["track"],
+            )
+        timeline.append(PlaybackState(at=float(entry["at"]), track=track))
+    return sorted(timeline, key=lambda state: state.at)
+
+
+def fixture_art_for(timeline: List[PlaybackState]) -> FileArtSource:
+    """
+    Maps every album cover url in the timeline onto the bundled fixture covers, so replays need no network.
+    """
+    files = {}
+    albums = {}
+    for state in timeline:
+        if state.track is None:
+            continue
+        album = albums.setdefault(state.track.album, ALBUMS[len(albums) % len(ALBUMS)])
+        files[state.track.album_cover_url_300px] = FIXTURES_DIR / f"{album}_300.jpg"
+        files[state.track.album_cover_url_640px] = FIXTURES_DIR / f"{album}_640.jpg"
+    return FileArtSource(files)
+
+
+def run_replay(
+    timeline: List[PlaybackState],
+    duration: float,
+    panel: PanelModel = None,
+    spotify_poll_interval: float = 15,
+    art_cache_items: int = 32,
+) -> Dict[str, Any]:
+    """
+    Replays a timeline through SpotiPi in virtual time, with a stand-in Spotify wrapper and a mock display.
+
+    Args:
+        timeline (List[PlaybackState]): playback states to replay
+        duration (float): virtual seconds to replay for
+        panel (PanelModel, optional): panel to simulate. Defaults to PanelModel.inky_impression().
+        spotify_poll_interval (float, optional): seconds between polls. Defaults to 15.
+        art_cache_items (int, optional): number of covers the art cache keeps. Defaults to 32.
+
+    Returns:
+        Dict[str, Any]: api calls, renders, refreshes, cache hit rates and wall/cpu cost of the replay
+    """
+    clock = VirtualClock(start=REPLAY_EPOCH)
+    spotify = ReplaySpotify(timeline, clock, REPLAY_EPOCH)
+    art_source = CachingArtSource(fixture_art_for(timeline), max_items=art_cache_items)
+    renderer = _CountingRenderer(art_source=art_source)
+    display = RecordingMockDisplay(
+        panel=panel if panel is not None else PanelModel.inky_impression(),
+        clock=clock,
+    )
+    app = SpotiPi(
+        spotify=spotify,
+        display=display,
+        img_renderer=renderer,
+        clock=clock,
+        spotify_poll_interval=spotify_poll_interval,
+    )
+    clock.call_at(REPLAY_EPOCH + duration, app.stop)
+
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    app.run()
+    wall, cpu = time.perf_counter() - wall0, time.process_time() - cpu0
+
+    panel_stats = display.panel_stats()
+    art_stats = art_source.stats()
+    polls = spotify.calls["current_playback"]
+    return {
+        "virtual_hours": duration / 3600,
+        "api_calls": dict(spotify.calls, total=sum(spotify.calls.values())),
+        "polls": polls,
+        "renders": renderer.renders,
+        "unchanged_polls": polls - renderer.renders,
+        "panel": {
+            "refreshes": panel_stats.refreshes,
+            "not_ready": panel_stats.not_ready,
+            "busy_seconds": panel_stats.busy_time,
+            "energy_joules": panel_stats.energy,
+        },
+        "art_cache": {
+            "hits": art_stats.hits,
+            "misses": art_stats.misses,
+            "hit_rate": art_stats.hit_rate,
+        },
+        "cost": {
+            "wall_seconds": wall,
+            "cpu_seconds": cpu,
+            "render_cpu_seconds": renderer.render_cpu,
+        },
+    }
+
+
+@click.command(name="replay")
+@click.option("--hours", default=24.0, help="virtual hours to replay")
+@click.option("--seed", default=0, help="seed of the synthetic day")
+@click.option("--timeline", default=None, help="recorded timeline json to replay")
+@click.option("--poll-interval", default=15.0, help="seconds between spotify polls")
+@click.option(
+    "--panel",
+    type=click.Choice(["inky", "instant"]),
+    default="inky",
+    help="panel timing to simulate",
+)
+def main(hours: float, seed: int, timeline: str, poll_interval: float, panel: str):
+    logging.basicConfig(level=logging.WARNING)
+    states = load_timeline(timeline) if timeline else synthetic_day(seed)
+    report = run_replay(
+        states,
+        hours * 3600,
+        panel=(
+            PanelModel.inky_impression() if panel == "inky" else PanelModel.instant()
+        ),
+        spotify_poll_interval=poll_interval,
+    )
+    click.echo(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
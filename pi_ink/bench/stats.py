@@ -0,0 +1,43 @@
+import math
+from typing import Dict, List
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Computes a percentile of the values using linear interpolation between the closest ranks.
+
+    Args:
+        values (List[float]): values to compute the percentile of
+        pct (float): percentile in the range [0, 100]
+
+    Returns:
+        float: the percentile, nan if values is empty
+    """
+    if len(values) == 0:
+        return math.nan
+
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lo = math.floor(rank)
+    hi = math.ceil(rank)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (rank - lo)
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """
+    Summarizes a list of samples.
+
+    Args:
+        values (List[float]): samples
+
+    Returns:
+        Dict[str, float]: count, mean, p50, p95, p99 and max of the samples
+    """
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if len(values) > 0 else math.nan,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if len(values) > 0 else math.nan,
+    }
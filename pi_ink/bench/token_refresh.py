@@ -0,0 +1,200 @@
+import json
+import logging
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict
+
+import click
+from spotipy.cache_handler import CacheFileHandler
+from spotipy.oauth2 import SpotifyOAuth
+
+from pi_ink.bench.stats import summarize
+from pi_ink.metrics import Metrics
+from pi_ink.spotify.token_manager import TokenCache, TokenManager
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+SCOPE = "user-read-playback-state"
+
+
+class _TokenHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        stub: "OAuthStub" = self.server.stub
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(stub.delay)  # the round trip to accounts.spotify.com
+        with stub.lock:
+            stub.refreshes += 1
+            n = stub.refreshes
+        body = json.dumps(
+            {
+                "access_token": f"access-{n}",
+                "token_type": "Bearer",
+                "expires_in": stub.expires_in,
+                "scope": SCOPE,
+            }
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+
+class OAuthStub:
+    """
+    Local stand-in for the Spotify token endpoint, issuing short lived access tokens for refresh tokens after a delay.
+    """
+
+    expires_in: int
+    delay: float
+    refreshes: int = 0
+    lock: threading.Lock
+    _server: ThreadingHTTPServer
+
+    def __init__(self, expires_in: int = 75, delay: float = 0.2):
+        """
+        Args:
+            expires_in (int, optional): lifetime of the tokens in seconds. Defaults to 75.
+            delay (float, optional): seconds each refresh takes. Defaults to 0.2.
+        """
+        self.expires_in = expires_in
+        self.delay = delay
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _TokenHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_address[1]}/api/token"
+
+    def __enter__(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+        return False
+
+
+class _CountingCacheHandler(CacheFileHandler):
+    writes: int = 0
+
+    def save_token_to_cache(self, token_info):
+        self.writes += 1
+        super().save_token_to_cache(token_info)
+
+
+def _oauth(stub: OAuthStub, cache_handler) -> SpotifyOAuth:
+    oauth = SpotifyOAuth(
+        client_id="bench",
+        client_secret="bench",
+        redirect_uri="http://127.0.0.1/callback",
+        scope=SCOPE,
+        open_browser=False,
+        cache_handler=cache_handler,
+    )
+    oauth.OAUTH_TOKEN_URL = stub.url
+    return oauth
+
+
+def _seed_cache(fp: Path, expires_in: int) -> None:
+    fp.write_text(
+        json.dumps(
+            {
+                "access_token": "access-0",
+                "token_type": "Bearer",
+                "expires_in": expires_in,
+                "expires_at": int(time.time()) + expires_in,
+                "refresh_token": "refresh",
+                "scope": SCOPE,
+            }
+        )
+    )
+
+
+def _poll(
+    get_token: Callable[[], str], duration: float, interval: float
+) -> Dict[str, Any]:
+    # the token lookup every spotify request starts with
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        t0 = time.perf_counter()
+        get_token()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        time.sleep(interval)
+    return {"token_ms": summarize(latencies)}
+
+
+def run_token_benchmark(
+    duration: float = 40.0,
+    interval: float = 0.25,
+    expires_in: int = 75,
+    delay: float = 0.2,
+) -> Dict[str, Any]:
+    """
+    Polls for tokens the way the spotipy client does before each request, with spotipy refreshing them when a poll
+    finds them expired and with TokenManager refreshing them in the background, against a local OAuth stub.
+
+    Args:
+        duration (float, optional): seconds to poll for. Defaults to 40.
+        interval (float, optional): seconds between polls. Defaults to 0.25.
+        expires_in (int, optional): lifetime of the stub's tokens in seconds, spotipy treats them as expired 60
+            seconds early. Defaults to 75.
+        delay (float, optional): seconds a refresh takes. Defaults to 0.2.
+
+    Returns:
+        Dict[str, Any]: token lookup latency in ms, refreshes and cache file writes of both
+    """
+    report = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        with OAuthStub(expires_in, delay) as stub:
+            fp = Path(tmp) / ".cache-lazy"
+            _seed_cache(fp, expires_in)
+            cache_handler = _CountingCacheHandler(cache_path=str(fp))
+            oauth = _oauth(stub, cache_handler)
+            report["lazy"] = _poll(
+                lambda: oauth.get_access_token(as_dict=False), duration, interval
+            )
+            report["lazy"]["refreshes"] = stub.refreshes
+            report["lazy"]["cache_writes"] = cache_handler.writes
+
+        with OAuthStub(expires_in, delay) as stub:
+            fp = Path(tmp) / ".cache-proactive"
+            _seed_cache(fp, expires_in)
+            writes_before = metrics.counter("spotify.token_cache_writes").value
+            cache = TokenCache(str(fp))
+            manager = TokenManager(_oauth(stub, cache), cache, refresh_margin=65)
+            manager.start()
+            report["proactive"] = _poll(manager.get_access_token, duration, interval)
+            report["proactive"]["refreshes"] = stub.refreshes
+            report["proactive"]["cache_writes"] = int(
+                metrics.counter("spotify.token_cache_writes").value - writes_before
+            )
+            manager.stop()
+    return report
+
+
+@click.command(name="token-refresh")
+@click.option("--duration", default=40.0, help="seconds to poll for, per mode")
+@click.option("--interval", default=0.25, help="seconds between polls")
+@click.option("--expires-in", default=75, help="lifetime of the tokens in seconds")
+@click.option("--delay", default=0.2, help="seconds a refresh takes")
+def main(duration: float, interval: float, expires_in: int, delay: float):
+    logging.basicConfig(level=logging.WARNING)
+    metrics.enable()  # counts the cache writes
+    report = run_token_benchmark(duration, interval, expires_in, delay)
+    click.echo(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
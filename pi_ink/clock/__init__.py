@@ -0,0 +1,5 @@
+from .iclock import IClock
+from .system_clock import SystemClock
+from .virtual_clock import VirtualClock
+
+__all__ = ["IClock", "SystemClock", "VirtualClock"]
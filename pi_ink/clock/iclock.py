@@ -0,0 +1,18 @@
+from abc import ABC
+
+
+class IClock(ABC):
+    def time(self) -> float:
+        """
+        Returns the current time in seconds since the epoch.
+        """
+        raise NotImplementedError("time() not implemented")
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Blocks for the given number of seconds.
+
+        Args:
+            seconds (float): time to sleep in seconds
+        """
+        raise NotImplementedError("sleep() not implemented")
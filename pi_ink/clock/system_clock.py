@@ -0,0 +1,12 @@
+import time
+
+from .iclock import IClock
+
+
+class SystemClock(IClock):
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
@@ -0,0 +1,61 @@
+import heapq
+import itertools
+import threading
+from typing import Callable, List, Tuple
+
+from .iclock import IClock
+
+
+class VirtualClock(IClock):
+    """
+    Simulated clock for replaying long timelines quickly. sleep() returns immediately after advancing the virtual time,
+    firing any callbacks scheduled with call_at() on the way, in time order.
+    """
+
+    _now: float
+    _lock: threading.RLock
+    _scheduled: List[Tuple[float, int, Callable[[], None]]]
+    _seq: itertools.count
+
+    def __init__(self, start: float = 0.0):
+        """
+        Args:
+            start (float, optional): virtual time to start at, in seconds since the epoch. Defaults to 0.
+        """
+        self._now = start
+        self._lock = threading.RLock()
+        self._scheduled = []
+        self._seq = itertools.count()
+
+    def time(self) -> float:
+        with self._lock:
+            return self._now
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(max(0.0, seconds))
+
+    def call_at(self, at: float, fn: Callable[[], None]) -> None:
+        """
+        Schedules fn to be called once the virtual time reaches at.
+
+        Args:
+            at (float): virtual time to call fn at
+            fn (Callable[[], None]): function to call
+        """
+        with self._lock:
+            heapq.heappush(self._scheduled, (at, next(self._seq), fn))
+
+    def advance(self, seconds: float) -> None:
+        """
+        Moves the virtual time forwards, calling every callback that becomes due.
+
+        Args:
+            seconds (float): time to advance by in seconds
+        """
+        with self._lock:
+            target = self._now + seconds
+            while len(self._scheduled) > 0 and self._scheduled[0][0] <= target:
+                at, _, fn = heapq.heappop(self._scheduled)
+                self._now = max(self._now, at)
+                fn()
+            self._now = target
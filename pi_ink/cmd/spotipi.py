@@ -1,39 +1,29 @@
 import logging
-import sys
 import time
 from os import environ
 from pathlib import Path
+from typing import List
 
 import click
 
 from pi_ink.apps import app_factory
 from pi_ink.config import Config
+from pi_ink.displays import display_registry
+from pi_ink.log import setup_logging
+from pi_ink.metrics import Metrics
+from pi_ink.profiling import CycleProfiler
+from pi_ink.renderers import renderer_registry
 
 logger = logging.getLogger(__name__)
 
 
-class LogFilter(logging.Filter):
-    def filter(self, record):
-        # determine which keys are extra based on base record keys
-        base_keys = logging.LogRecord(
-            "", logging.DEBUG, "", 0, "", None, None, ""
-        ).__dict__.keys()
-        extra_keys = [key for key in record.__dict__.keys() if key not in base_keys]
-
-        if hasattr(record, "extra"):
-            record.extra_ = record.extra
-            extra_keys.append("extra_")
-
-        record.extra = {}
-
-        for key in extra_keys:
-            record.extra[key] = record.__dict__[key]
-
-        return True
-
-
 def initialize_environment(
-    username: str, redirect_uri: str, config_path: str, default_scopes: str, debug: bool
+    username: str,
+    redirect_uri: str,
+    config_path: str,
+    default_scopes: str,
+    debug: bool,
+    log_json: bool = False,
 ):
     """
     Initializes the environment, including the logging and vyper setup, for the application.
@@ -44,18 +34,16 @@ def initialize_environment(
         config_path (str): path to config file
         default_scopes (str): default scopes to use for spotify oauth
         debug (bool): whether or not to enable debug logging
+        log_json (bool, optional): whether to log json lines instead of text. Defaults to False.
     """
 
-    # setup logging
-    handler = logging.StreamHandler(stream=sys.stdout)
-    handler.addFilter(LogFilter())
-    logging_handlers = [handler]
+    # setup logging, records are written by a background thread so logging never blocks on stdout
     if "PYCHARM_HOSTED" in environ or debug is True:
-        logging.basicConfig(
-            format="%(asctime)s | %(name)35s | %(funcName)35s() | %(levelname)8s | %(message)40s | extra=%(extra)s",
+        setup_logging(
+            logging.DEBUG,
+            fmt="%(asctime)s | %(name)35s | %(funcName)35s() | %(levelname)8s | %(message)40s | extra=%(extra)s",
             datefmt="%b %d %H:%M:%S",
-            level=logging.DEBUG,
-            handlers=logging_handlers,
+            json_logs=log_json,
         )
 
         # disable spotipy debug logging
@@ -72,11 +60,11 @@ def initialize_environment(
         # disable PIL debug logging
         logging.getLogger("PIL.PngImagePlugin").setLevel(logging.INFO)
     else:
-        logging.basicConfig(
-            format="%(asctime)s | %(name)60s | %(funcName)60s() | %(levelname)8s | %(message)s | extra=%(extra)s",
+        setup_logging(
+            logging.INFO,
+            fmt="%(asctime)s | %(name)60s | %(funcName)60s() | %(levelname)8s | %(message)s | extra=%(extra)s",
             datefmt="%b %d %H:%M:%S",
-            level=logging.INFO,
-            handlers=logging_handlers,
+            json_logs=log_json,
         )
 
     # setup config
@@ -110,19 +98,110 @@ def initialize_environment(
     help="redirect uri for spotify oauth",
 )
 @click.option("--debug", "-d", default=False, is_flag=True, help="enable debug logging")
+@click.option(
+    "--log-json", default=False, is_flag=True, help="log json lines instead of text"
+)
 @click.option("--app-name", "-a", default="spotipi", help="name of app to run")
+@click.option(
+    "--display",
+    default=None,
+    help="name of display to draw on, e.g. inky or tkinter. Defaults to the app's default",
+)
+@click.option(
+    "--panel",
+    "panels",
+    multiple=True,
+    help="drive several panels from this process, each as name=app[:display], e.g. kitchen=spotipi:inky. "
+    "Panels can also be configured under panels in the config file",
+)
+@click.option(
+    "--refresh-stagger",
+    default=0.0,
+    help="minimum seconds between the start of two panel refreshes when driving several panels",
+)
+@click.option(
+    "--serve",
+    "serve_address",
+    default="127.0.0.1:8750",
+    help="host:port the frameserver app serves frames on",
+)
+@click.option(
+    "--frame-url",
+    default=None,
+    help="url of the panel's frame on a frame server, for the thinclient app",
+)
+@click.option(
+    "--state-dir",
+    default=None,
+    help="directory to keep a warm start snapshot in, so restarts resume with the last frame",
+)
+@click.option(
+    "--render-process",
+    default=False,
+    is_flag=True,
+    help="render in a separate worker process, keeps buttons responsive while rendering",
+)
 @click.option("--saturation", "-s", default=0.5, help="saturation of display")
 @click.option(
     "--dynamic-saturation", "-ds", default=False, help="enable dynamic saturation"
 )
+@click.option(
+    "--metrics-textfile",
+    default=None,
+    help="periodically write prometheus metrics to this file",
+)
+@click.option(
+    "--metrics-port",
+    default=None,
+    type=int,
+    help="serve prometheus metrics on this local port",
+)
+@click.option(
+    "--profile",
+    default=0,
+    help="profile this many render/display cycles, 0 disables profiling",
+)
+@click.option(
+    "--profile-dir", default="profiles", help="directory to write the profiles to"
+)
+@click.option(
+    "--profile-format",
+    type=click.Choice(CycleProfiler.FORMATS),
+    default="pstats",
+    help="cProfile pstats, or sampled collapsed stacks for flamegraphs",
+)
+@click.option(
+    "--profile-tracemalloc",
+    default=False,
+    is_flag=True,
+    help="also write a tracemalloc snapshot per profiled cycle",
+)
+@click.option(
+    "--profile-keep", default=20, help="number of profiled cycles to keep on disk"
+)
 def main(
     username: str,
     config_path: str,
     redirect_uri: str,
     debug: bool,
+    log_json: bool,
     app_name: str,
+    display: str,
+    panels: List[str],
+    refresh_stagger: float,
+    serve_address: str,
+    frame_url: str,
+    state_dir: str,
+    render_process: bool,
     saturation: float,
     dynamic_saturation: bool,
+    metrics_textfile: str,
+    metrics_port: int,
+    profile: int,
+    profile_dir: str,
+    profile_format: str,
+    profile_tracemalloc: bool,
+    profile_keep: int,
 ):
     initialize_environment(
         username,
@@ -130,10 +209,130 @@ def main(
         config_path,
         "user-read-playback-state user-read-currently-playing user-read-recently-played",
         debug,
+        log_json,
     )
 
-    app = app_factory(app_name)
-    app.run(saturation=saturation, dynamic_saturation=dynamic_saturation)
+    # instrumentation is a no-op unless an export surface is requested, the exporters are imported only then
+    if metrics_textfile is not None or metrics_port is not None:
+        Metrics.instance().enable()
+    if metrics_textfile is not None:
+        from pi_ink.metrics import PrometheusTextfileExporter
+
+        PrometheusTextfileExporter(metrics_textfile).start()
+    if metrics_port is not None:
+        from pi_ink.metrics import MetricsHttpServer
+
+        MetricsHttpServer(metrics_port).start()
+
+    profiler = None
+    if profile > 0:
+        profiler = CycleProfiler(
+            profile_dir,
+            iterations=profile,
+            fmt=profile_format,
+            tracemalloc_snapshots=profile_tracemalloc,
+            keep=profile_keep,
+        )
+
+    if len(panels) > 0 or Config.instance().get("panels"):
+        from pi_ink.apps import PanelSpec
+        from pi_ink.displays import RefreshGate
+
+        panel_specs = [PanelSpec.parse(panel) for panel in panels]
+        if len(panel_specs) == 0:
+            panel_specs = [
+                PanelSpec.from_dict(d) for d in Config.instance().get("panels")
+            ]
+
+        # every panel runs its own app, they share the caches and refresh one after another
+        app_kwargs = {
+            "panels": panel_specs,
+            "renderer": "process" if render_process else "image",
+            "refresh_gate": RefreshGate(stagger=refresh_stagger),
+        }
+        if state_dir is not None:
+            from pi_ink.snapshot import SnapshotStore
+
+            app_kwargs["snapshot_store"] = SnapshotStore(state_dir)
+        app = app_factory("multipanel", **app_kwargs)
+        app.run(
+            saturation=saturation,
+            dynamic_saturation=dynamic_saturation,
+            profiler=profiler,
+        )
+        return
+
+    if app_name == "frameserver":
+        from pi_ink.displays import PackedFrameStore
+        from pi_ink.server import ServedPanel
+
+        # panels are configured under served_panels, by default one panel for the user
+        served_panels = [
+            ServedPanel.from_dict(d)
+            for d in Config.instance().get("served_panels") or [{"name": username}]
+        ]
+        host, _, port = serve_address.rpartition(":")
+        app_kwargs = {
+            "panels": served_panels,
+            "host": host or "127.0.0.1",
+            "port": int(port),
+            "renderer": "process" if render_process else "image",
+        }
+        if state_dir is not None:
+            app_kwargs["frame_store"] = PackedFrameStore(Path(state_dir) / "frames")
+        if any(panel.username is not None for panel in served_panels):
+            from pi_ink.spotify import RateBudget, SpotifyAccounts
+
+            # one budget for all accounts, spotify rate limits the app
+            budget = RateBudget(
+                rate=Config.instance().get_float("spotify_request_rate", 2.0),
+                burst=Config.instance().get_int("spotify_request_burst", 10),
+            )
+            app_kwargs["accounts"] = SpotifyAccounts(budget=budget)
+        app_factory(app_name, **app_kwargs).run()
+        return
+
+    if app_name == "thinclient":
+        if frame_url is None:
+            raise click.UsageError("--frame-url is required for the thinclient app")
+        app_kwargs = {"url": frame_url}
+        if display is not None:
+            app_kwargs["display"] = display_registry.create(display)
+        app_factory(app_name, **app_kwargs).run(profiler=profiler)
+        return
+
+    app_kwargs = {}
+    if display is not None or render_process:
+        # the worker process lays out frames for the display, so it's created up front
+        app_kwargs["display"] = display_registry.create(display or "inky")
+    if render_process:
+        app_kwargs["img_renderer"] = renderer_registry.create(
+            "process", resolution=app_kwargs["display"].resolution
+        )
+    if state_dir is not None:
+        from pi_ink.snapshot import SnapshotStore
+
+        app_kwargs["snapshot_store"] = SnapshotStore(state_dir)
+    if app_name == "pictureframe":
+        if state_dir is not None:
+            from pi_ink.phash import PhotoHashIndex
+
+            # near-duplicate pictures aren't shown one after another, the hashes are kept in the state dir
+            app_kwargs["photo_index"] = PhotoHashIndex(
+                Path(state_dir) / "photo-hashes.json"
+            )
+        else:
+            # an index kept in memory only would re-hash the whole library on every start
+            logger.warning(
+                "no --state-dir given, near-duplicate pictures may be shown one after another"
+            )
+
+    app = app_factory(app_name, **app_kwargs)
+    app.run(
+        saturation=saturation,
+        dynamic_saturation=dynamic_saturation,
+        profiler=profiler,
+    )
 
 
 if __name__ == "__main__":
@@ -1,8 +1,40 @@
+from pi_ink.registry import Registry, lazy_attributes
+
 from .display_result import DisplayResult
 from .edisplay_response import EDisplayResponse
 from .idisplay import IDisplay
-from .inkyimpression_display import InkyImpressionDisplay
-from .tkinter_eink_mock_display import TkinterEinkMockDisplay
+from .panel_model import PanelModel, PanelSimulator, PanelStats
+
+# displays are imported on first use, they pull in optional dependencies (inky, tkinter) that most runs don't need
+__getattr__ = lazy_attributes(
+    __name__,
+    {
+        "TkinterEinkMockDisplay": ".tkinter_eink_mock_display",
+        "InkyImpressionDisplay": ".inkyimpression_display",
+        "RecordingMockDisplay": ".recording_mock_display",
+        "FrameRecord": ".recording_mock_display",
+        "FileSinkDisplay": ".file_sink_display",
+        "FramebufferDisplay": ".framebuffer_display",
+        "Palette": ".packed_frame",
+        "PackedFrame": ".packed_frame",
+        "PackedFrameStore": ".packed_frame",
+        "pack_frame": ".packed_frame",
+        "RefreshGate": ".refresh_gate",
+        "RefreshSlot": ".refresh_gate",
+        "GatedDisplay": ".refresh_gate",
+    },
+)
+
+display_registry = Registry(
+    "pi_ink.displays",
+    builtins={
+        "inky": "pi_ink.displays.inkyimpression_display:InkyImpressionDisplay",
+        "tkinter": "pi_ink.displays.tkinter_eink_mock_display:TkinterEinkMockDisplay",
+        "recording": "pi_ink.displays.recording_mock_display:RecordingMockDisplay",
+        "file": "pi_ink.displays.file_sink_display:FileSinkDisplay",
+        "framebuffer": "pi_ink.displays.framebuffer_display:FramebufferDisplay",
+    },
+)
 
 __all__ = [
     "IDisplay",
@@ -10,4 +42,19 @@ __all__ = [
     "DisplayResult",
     "TkinterEinkMockDisplay",
     "InkyImpressionDisplay",
+    "RecordingMockDisplay",
+    "FrameRecord",
+    "FileSinkDisplay",
+    "FramebufferDisplay",
+    "PanelModel",
+    "PanelSimulator",
+    "PanelStats",
+    "Palette",
+    "PackedFrame",
+    "PackedFrameStore",
+    "pack_frame",
+    "RefreshGate",
+    "RefreshSlot",
+    "GatedDisplay",
+    "display_registry",
 ]
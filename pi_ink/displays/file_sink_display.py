@@ -0,0 +1,121 @@
+import logging
+import os
+from pathlib import Path
+
+from PIL import Image
+
+from pi_ink.clock import IClock
+from pi_ink.metrics import Metrics
+
+from .display_result import DisplayResult
+from .edisplay_response import EDisplayResponse
+from .idisplay import IDisplay
+from .panel_model import PanelModel, PanelSimulator, PanelStats
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+
+class FileSinkDisplay(IDisplay):
+    """
+    Headless display that writes every displayed frame to a file, either as a PNG or as raw RGB bytes.
+    """
+
+    _panel: PanelSimulator
+    _frame: Image = None
+    _out_dir: Path
+    _fmt: str
+    _overwrite: bool
+    _compress_level: int
+    _frame_count: int = 0
+
+    def __init__(
+        self,
+        out_dir: str,
+        fmt: str = "png",
+        overwrite: bool = False,
+        compress_level: int = 1,
+        panel: PanelModel = None,
+        clock: IClock = None,
+    ):
+        """
+        Args:
+            out_dir (str): directory the frames are written to, created if it does not exist
+            fmt (str, optional): "png" or "raw" (packed RGB bytes). Defaults to "png".
+            overwrite (bool, optional): whether to keep overwriting one file instead of numbering frames. Defaults to False.
+            compress_level (int, optional): zlib compression level for png frames. Defaults to 1.
+            panel (PanelModel, optional): panel timing to simulate. Defaults to PanelModel.instant().
+            clock (IClock, optional): clock used to simulate the panel timing. Defaults to SystemClock.
+        """
+        fmt = fmt.lower()
+        if fmt not in ["png", "raw"]:
+            raise ValueError(f"invalid frame format: {fmt}")
+
+        self._out_dir = Path(out_dir)
+        self._out_dir.mkdir(parents=True, exist_ok=True)
+        self._fmt = fmt
+        self._overwrite = overwrite
+        self._compress_level = compress_level
+        self._panel = PanelSimulator(panel, clock)
+
+    def set_frame(
+        self, frame: Image, saturation: float = 0.5, dynamic_saturation: bool = False
+    ) -> None:
+        self._frame = frame
+
+    def __frame_path(self) -> Path:
+        name = "frame" if self._overwrite else f"frame_{self._frame_count:06d}"
+        if self._fmt == "raw":
+            w, h = self._frame.size
+            return self._out_dir / f"{name}_{w}x{h}.rgb"
+        return self._out_dir / f"{name}.png"
+
+    def display_frame(self) -> DisplayResult:
+        not_ready = self._panel.check_ready()
+        if not_ready is not None:
+            return not_ready  # cannot update screen yet
+
+        if self._frame is None:
+            return DisplayResult(
+                response=EDisplayResponse.ERROR, value="no frame to display"
+            )
+
+        fp = self.__frame_path()
+        tmp_fp = fp.with_name(fp.name + ".tmp")
+
+        frame = self._frame
+        with metrics.span("display.show"):
+            try:
+                if self._fmt == "png":
+                    # the e-ink panels have no alpha channel, drop it to keep the files small
+                    if frame.mode not in ["RGB", "P", "L"]:
+                        frame = frame.convert("RGB")
+                    frame.save(tmp_fp, "PNG", compress_level=self._compress_level)
+                else:
+                    # RGB and RGBA frames are packed straight to RGB bytes, without converting the image first
+                    if frame.mode not in ["RGB", "RGBA"]:
+                        frame = frame.convert("RGB")
+                    with open(tmp_fp, "wb") as f:
+                        f.write(frame.tobytes("raw", "RGB"))
+                os.replace(tmp_fp, fp)  # readers never see a partially written frame
+            except OSError as e:
+                logger.error(f"failed to write frame to {fp}: {e}")
+                return DisplayResult(response=EDisplayResponse.ERROR, value=str(e))
+
+        logger.info(f"wrote frame to {fp}")
+        self._frame_count += 1
+        self._panel.refresh(self._frame.width, self._frame.height)
+
+        return DisplayResult(
+            response=EDisplayResponse.SUCCESS,
+            value=fp,
+        )
+
+    def clear_frame(self) -> None:
+        self._frame = None
+
+    def panel_stats(self) -> PanelStats:
+        """
+        Returns the refresh count, busy time and energy used by the simulated panel so far.
+        """
+        return self._panel.stats()
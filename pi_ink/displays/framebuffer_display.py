@@ -0,0 +1,190 @@
+import logging
+import mmap
+import os
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from pi_ink.clock import IClock
+from pi_ink.metrics import Metrics
+
+from .display_result import DisplayResult
+from .edisplay_response import EDisplayResponse
+from .idisplay import IDisplay
+from .panel_model import PanelModel, PanelSimulator, PanelStats
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+_BAND_ROWS = 64  # rows of the frame copied out of Pillow at a time
+
+
+class FramebufferDisplay(IDisplay):
+    """
+    Display that writes frames into a memory mapped Linux framebuffer (/dev/fb*), or a regular file standing in for one.
+
+    Frames are copied out of Pillow in bands of rows and swizzled with numpy straight into a view of the mapping, the
+    only intermediate buffers per refresh are a band in size. 24 and 32 bits per pixel (BGR / BGRA, the common little-endian framebuffer layouts) are
+    supported.
+    """
+
+    # (bits per pixel, frame mode) -> channel of the frame written to each byte of a framebuffer pixel, None for padding
+    _channels = {
+        (24, "RGB"): (2, 1, 0),
+        (24, "RGBA"): (2, 1, 0),
+        (32, "RGB"): (2, 1, 0, None),
+        (32, "RGBA"): (2, 1, 0, 3),
+    }
+
+    _panel: PanelSimulator
+    _frame: Image = None
+    _device: str
+    _width: int
+    _height: int
+    _bits_per_pixel: int
+    _stride: int
+    _fd: Optional[int] = None
+    _mmap: Optional[mmap.mmap] = None
+
+    def __init__(
+        self,
+        device: str = "/dev/fb0",
+        resolution: Optional[Tuple[int, int]] = None,
+        bits_per_pixel: Optional[int] = None,
+        panel: PanelModel = None,
+        clock: IClock = None,
+    ):
+        """
+        Args:
+            device (str, optional): framebuffer device or file to write to. Defaults to "/dev/fb0".
+            resolution (Tuple[int, int], optional):
+                width and height of the framebuffer, read from sysfs for /dev/fb* devices. Required for regular files.
+            bits_per_pixel (int, optional): 24 or 32, read from sysfs for /dev/fb* devices. Defaults to 32 for files.
+            panel (PanelModel, optional): panel timing to simulate. Defaults to PanelModel.instant().
+            clock (IClock, optional): clock used to simulate the panel timing. Defaults to SystemClock.
+        """
+        self._device = device
+        self._panel = PanelSimulator(panel, clock)
+
+        sysfs = Path("/sys/class/graphics") / Path(device).name
+        if (resolution is None or bits_per_pixel is None) and sysfs.is_dir():
+            w, h = (sysfs / "virtual_size").read_text().strip().split(",")
+            resolution = resolution or (int(w), int(h))
+            bits_per_pixel = bits_per_pixel or int(
+                (sysfs / "bits_per_pixel").read_text().strip()
+            )
+            stride = int((sysfs / "stride").read_text().strip())
+        else:
+            if resolution is None:
+                raise ValueError(f"resolution is required for framebuffer {device}")
+            bits_per_pixel = bits_per_pixel or 32
+            stride = resolution[0] * bits_per_pixel // 8
+
+        if (bits_per_pixel, "RGB") not in self._channels:
+            raise ValueError(f"unsupported framebuffer depth: {bits_per_pixel} bpp")
+
+        self._width, self._height = resolution
+        self._bits_per_pixel = bits_per_pixel
+        self._stride = stride
+
+        size = self._stride * self._height
+        self._fd = os.open(device, os.O_RDWR | os.O_CREAT)
+        if os.fstat(self._fd).st_size < size and not device.startswith("/dev/"):
+            os.ftruncate(self._fd, size)  # a file standing in for the framebuffer
+        self._mmap = mmap.mmap(
+            self._fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE
+        )
+
+        logger.info(
+            f"mapped framebuffer {device}",
+            extra={
+                "resolution": resolution,
+                "bits_per_pixel": bits_per_pixel,
+                "stride": stride,
+            },
+        )
+
+    @property
+    def resolution(self) -> Tuple[int, int]:
+        return self._width, self._height
+
+    def set_frame(
+        self, frame: Image, saturation: float = 0.5, dynamic_saturation: bool = False
+    ) -> None:
+        self._frame = frame
+
+    def __blit(self, frame: Image) -> None:
+        """
+        Writes the frame, clipped to the framebuffer size, band by band into the memory mapping, reordering its
+        channels into the framebuffer's byte order.
+
+        Args:
+            frame (Image): RGB or RGBA frame
+        """
+        w = min(frame.width, self._width)
+        h = min(frame.height, self._height)
+        bytes_per_pixel = self._bits_per_pixel // 8
+
+        channels = self._channels[(self._bits_per_pixel, frame.mode)]
+        rows = np.frombuffer(self._mmap, dtype=np.uint8).reshape(
+            self._height, self._stride
+        )
+        target = rows[:h, : w * bytes_per_pixel].reshape(h, w, bytes_per_pixel)
+        try:
+            for y0 in range(0, h, _BAND_ROWS):
+                y1 = min(y0 + _BAND_ROWS, h)
+                # np.asarray() copies the whole image through tobytes(), only a band is handed to it
+                pixels = np.asarray(frame.crop((0, y0, w, y1)))
+                for i, channel in enumerate(channels):
+                    if channel is None:
+                        target[y0:y1, :, i] = 0
+                    else:
+                        target[y0:y1, :, i] = pixels[:, :, channel]
+        finally:
+            # views of the mapping must be released before it can be closed
+            del rows, target
+
+    def display_frame(self) -> DisplayResult:
+        not_ready = self._panel.check_ready()
+        if not_ready is not None:
+            return not_ready  # cannot update screen yet
+
+        logger.info(f"displaying frame")
+        if self._frame is None:
+            return DisplayResult(
+                response=EDisplayResponse.ERROR, value="no frame to display"
+            )
+
+        frame = self._frame
+        if frame.mode not in ["RGB", "RGBA"]:
+            frame = frame.convert("RGBA")
+        with metrics.span("display.show"):
+            self.__blit(frame)
+            self._panel.refresh(frame.width, frame.height)
+
+        return DisplayResult(
+            response=EDisplayResponse.SUCCESS,
+            value=None,
+        )
+
+    def clear_frame(self) -> None:
+        self._frame = None
+
+    def panel_stats(self) -> PanelStats:
+        """
+        Returns the refresh count, busy time and energy used by the simulated panel so far.
+        """
+        return self._panel.stats()
+
+    def close(self) -> None:
+        """
+        Unmaps and closes the framebuffer.
+        """
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -1,10 +1,29 @@
 from abc import ABC
-from typing import Any
+from typing import TYPE_CHECKING, Any, Tuple
 
 from .display_result import DisplayResult
 
+if TYPE_CHECKING:
+    from .packed_frame import PackedFrame
+
 
 class IDisplay(ABC):
+    @property
+    def retains_frame(self) -> bool:
+        """
+        Whether the display keeps showing its last frame after the app exits or the device reboots, like e-ink panels
+        do. Apps use this to skip refreshing a panel that already shows the frame they would draw.
+        """
+        return False
+
+    @property
+    def resolution(self) -> Tuple[int, int]:
+        """
+        Width and height of the frames the display shows, renderers lay out their frames for it. Defaults to the
+        600x448 of the Inky Impression.
+        """
+        return 600, 448
+
     def set_frame(
         self, frame: Any, saturation: float = 0.5, dynamic_saturation: bool = False
     ) -> None:
@@ -18,6 +37,16 @@ class IDisplay(ABC):
         """
         raise NotImplementedError("set_frame() not implemented")
 
+    def set_packed_frame(self, frame: "PackedFrame") -> None:
+        """
+        Sets a frame already quantized to a palette to be displayed. Displays that can't take the palette indices
+        as is show the frame in the colours of its palette.
+
+        Args:
+            frame (PackedFrame): frame to be displayed
+        """
+        self.set_frame(frame.to_image().convert("RGB"))
+
     def display_frame(self) -> DisplayResult:
         """
         Displays the frame.
@@ -1,25 +1,47 @@
 import logging
 import time
+from typing import Tuple
 
 from inky.auto import auto
 from PIL import Image
 
+from pi_ink.metrics import Metrics
+
 from .display_result import DisplayResult
 from .edisplay_response import EDisplayResponse
 from .idisplay import IDisplay
+from .packed_frame import PackedFrame, Palette
+from .panel_model import PanelModel
 
 logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
 
 
 class InkyImpressionDisplay(IDisplay):
     _last_update: float = 0
-    _screen_refresh_time: float = 15  # in seconds
+    _screen_refresh_time: float  # in seconds
     _frame: Image = None
     _display = None
 
-    def __init__(self):
+    def __init__(self, panel: PanelModel = None):
+        """
+        Args:
+            panel (PanelModel, optional):
+                timing of the panel, only min_interval is used as show() blocks for the real refresh.
+                Defaults to PanelModel.inky_impression().
+        """
+        panel = panel if panel is not None else PanelModel.inky_impression()
+        self._screen_refresh_time = panel.min_interval
         self._display = auto()
 
+    @property
+    def retains_frame(self) -> bool:
+        return True  # e-ink keeps its image without power
+
+    @property
+    def resolution(self) -> Tuple[int, int]:
+        return tuple(self._display.resolution)
+
     @staticmethod
     def _normalize_rgb(r: int, g: int, b: int) -> (float, float, float):
         assert (
@@ -56,12 +78,29 @@ class InkyImpressionDisplay(IDisplay):
             # TODO
             pass
 
-        self._display.set_image(self._frame, saturation=saturation)
+        with metrics.span("display.set_image"):
+            self._display.set_image(self._frame, saturation=saturation)
+
+    def set_packed_frame(self, frame: PackedFrame) -> None:
+        if frame.palette.id != Palette.INKY_IMPRESSION or frame.size != self.resolution:
+            super().set_packed_frame(frame)
+            return
+
+        if self._frame is not None:
+            del self._frame
+        self._frame = frame
+
+        # the indices are the panel's colours, the driver sends them without quantizing the frame again
+        with metrics.span("display.set_image"):
+            self._display.buf = frame.indices().reshape(
+                (self._display.rows, self._display.cols)
+            )
 
     def display_frame(self) -> DisplayResult:
         now = time.time()
         delta = now - self._last_update
         if delta < self._screen_refresh_time:
+            metrics.inc("display.not_ready")
             return DisplayResult(
                 response=EDisplayResponse.NOT_READY,
                 value=self._screen_refresh_time
@@ -77,7 +116,9 @@ class InkyImpressionDisplay(IDisplay):
             )
 
         # draw frame
-        self._display.show()
+        with metrics.span("display.show"):
+            self._display.show()
+        metrics.inc("display.refreshes")
 
         return DisplayResult(
             response=EDisplayResponse.SUCCESS,
@@ -0,0 +1,340 @@
+import logging
+import mmap
+import os
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"PIPF"
+_VERSION = 1
+_BITS_PER_PIXEL = 4
+_MAX_COLORS = 1 << _BITS_PER_PIXEL
+_DIGEST_SIZE = 16  # bytes, of the render_digest() hex digest
+
+# magic, version, bits per pixel, width, height, palette id, number of colors, source digest, RGB colors, padding
+_HEADER = struct.Struct(f"<4sBBHHHB{_DIGEST_SIZE}s{_MAX_COLORS * 3}s3x")
+
+# the 7 colours of the Inky Impression and its clean colour, blended between the two by the saturation
+# https://github.com/pimoroni/inky/blob/main/library/inky/inky_uc8159.py
+_INKY_DESATURATED = [
+    (0, 0, 0),
+    (255, 255, 255),
+    (0, 255, 0),
+    (0, 0, 255),
+    (255, 0, 0),
+    (255, 255, 0),
+    (255, 140, 0),
+]
+_INKY_SATURATED = [
+    (57, 48, 57),
+    (255, 255, 255),
+    (58, 91, 70),
+    (61, 59, 94),
+    (156, 72, 75),
+    (208, 190, 71),
+    (177, 106, 73),
+]
+
+
+@dataclass(frozen=True)
+class Palette:
+    id: int  # identifies what the indices mean to a panel, 0 for palettes no panel knows
+    colors: Tuple[Tuple[int, int, int], ...]  # RGB, at most 16
+
+    INKY_IMPRESSION = 1
+
+    @classmethod
+    def inky_impression(cls, saturation: float = 0.5):
+        """
+        The palette the Inky Impression quantizes frames with, its indices are the panel's colours.
+
+        Args:
+            saturation (float, optional): saturation of the palette. Defaults to 0.5.
+        """
+        colors = []
+        for s, d in zip(_INKY_SATURATED, _INKY_DESATURATED):
+            # same rounding as the inky driver, so frames are quantized exactly like set_image() does
+            colors.append(
+                tuple(
+                    int(cs * saturation + cd * (1.0 - saturation))
+                    for cs, cd in zip(s, d)
+                )
+            )
+        colors.append((255, 255, 255))  # clean
+        return cls(id=cls.INKY_IMPRESSION, colors=tuple(colors))
+
+    def image(self) -> Image.Image:
+        """
+        1x1 P mode image holding the palette, to quantize images with.
+        """
+        img = Image.new("P", (1, 1))
+        img.putpalette(
+            [c for color in self.colors for c in color]
+            + [0, 0, 0] * (256 - len(self.colors))
+        )
+        return img
+
+
+class PackedFrame:
+    """
+    Frame quantized to a palette of up to 16 colours, two pixels per byte, high nibble first.
+
+    A 600x448 frame takes 131 KiB on disk instead of the 1 MiB of the RGBA image. The file is an 80 byte header
+    (dimensions, palette and the render digest of the frame) followed by the packed rows, frames are loaded by
+    mapping the file into memory. Displays knowing the palette take the indices as is, without quantizing again.
+    """
+
+    _size: Tuple[int, int]
+    _palette: Palette
+    _digest: Optional[str]
+    _packed: np.ndarray  # (height, (width + 1) // 2) bytes
+
+    def __init__(
+        self,
+        size: Tuple[int, int],
+        palette: Palette,
+        packed: np.ndarray,
+        digest: str = None,
+    ):
+        """
+        Args:
+            size (Tuple[int, int]): width and height of the frame
+            palette (Palette): palette the indices are of
+            packed (np.ndarray): (height, (width + 1) // 2) uint8 array of packed indices
+            digest (str, optional): render digest of the frame, see render_digest(). Defaults to None.
+        """
+        w, h = size
+        if packed.shape != (h, (w + 1) // 2):
+            raise ValueError(
+                f"packed pixels of shape {packed.shape} don't fit a {w}x{h} frame"
+            )
+        if len(palette.colors) > _MAX_COLORS:
+            raise ValueError(
+                f"palette of {len(palette.colors)} colors doesn't fit {_BITS_PER_PIXEL} bits"
+            )
+        if digest is not None and len(bytes.fromhex(digest)) != _DIGEST_SIZE:
+            raise ValueError(
+                f"digest {digest} isn't a {_DIGEST_SIZE} byte render digest"
+            )
+        self._size = (w, h)
+        self._palette = palette
+        self._digest = digest
+        self._packed = packed
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self._size
+
+    @property
+    def palette(self) -> Palette:
+        return self._palette
+
+    @property
+    def digest(self) -> Optional[str]:
+        return self._digest
+
+    @property
+    def packed(self) -> np.ndarray:
+        """
+        The packed pixels, read only when the frame was loaded from a file.
+        """
+        return self._packed
+
+    def indices(self) -> np.ndarray:
+        """
+        Unpacks the pixels.
+
+        Returns:
+            np.ndarray: (height, width) uint8 array of palette indices
+        """
+        w, h = self._size
+        indices = np.empty((h, self._packed.shape[1] * 2), dtype=np.uint8)
+        np.right_shift(self._packed, 4, out=indices[:, 0::2])
+        np.bitwise_and(self._packed, 0x0F, out=indices[:, 1::2])
+        return indices[:, :w]
+
+    def to_image(self) -> Image.Image:
+        """
+        Unpacks the frame into a P mode image with the palette of the frame.
+
+        Returns:
+            Image.Image: the frame
+        """
+        img = Image.frombytes("P", self._size, self.indices().tobytes())
+        img.putpalette([c for color in self._palette.colors for c in color])
+        return img
+
+    def to_bytes(self) -> bytes:
+        """
+        Serializes the frame into the bytes of a packed frame file.
+        """
+        digest = bytes.fromhex(self._digest) if self._digest is not None else b""
+        header = _HEADER.pack(
+            _MAGIC,
+            _VERSION,
+            _BITS_PER_PIXEL,
+            self._size[0],
+            self._size[1],
+            self._palette.id,
+            len(self._palette.colors),
+            digest,
+            bytes(c for color in self._palette.colors for c in color),
+        )
+        return header + self._packed.tobytes()
+
+    def save(self, fp: str) -> None:
+        """
+        Writes the frame to a file, atomically.
+
+        Args:
+            fp (str): file to write
+        """
+        fp = Path(fp)
+        tmp_fp = fp.with_name(fp.name + ".tmp")
+        tmp_fp.write_bytes(self.to_bytes())
+        os.replace(tmp_fp, fp)  # readers never see a partially written frame
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "PackedFrame":
+        """
+        Reads a frame from the bytes of a packed frame file, without copying the pixels.
+
+        Args:
+            buffer: bytes, memoryview or mmap of the file
+
+        Returns:
+            PackedFrame: the frame, its pixels sharing the buffer
+        """
+        if len(buffer) < _HEADER.size:
+            raise ValueError("too short for a packed frame")
+        magic, version, bits, w, h, palette_id, n_colors, digest, colors = (
+            _HEADER.unpack_from(buffer)
+        )
+        if magic != _MAGIC:
+            raise ValueError("not a packed frame")
+        if version != _VERSION or bits != _BITS_PER_PIXEL:
+            raise ValueError(
+                f"unsupported packed frame version {version} with {bits} bits per pixel"
+            )
+
+        stride = (w + 1) // 2
+        if len(buffer) < _HEADER.size + stride * h:
+            raise ValueError(f"packed frame of {w}x{h} is truncated")
+        packed = np.frombuffer(
+            buffer, dtype=np.uint8, count=stride * h, offset=_HEADER.size
+        ).reshape(h, stride)
+
+        palette = Palette(
+            id=palette_id,
+            colors=tuple(tuple(colors[i * 3 : i * 3 + 3]) for i in range(n_colors)),
+        )
+        return cls(
+            (w, h),
+            palette,
+            packed,
+            digest.hex() if digest != bytes(_DIGEST_SIZE) else None,
+        )
+
+    @classmethod
+    def load(cls, fp: str) -> "PackedFrame":
+        """
+        Loads a frame by mapping its file into memory, the pixels are only read when they're used.
+
+        Args:
+            fp (str): packed frame file
+
+        Returns:
+            PackedFrame: the frame
+        """
+        with open(fp, "rb") as f:
+            # the mapping stays valid after the file is closed, it's unmapped with the last frame using it
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(buffer)
+
+
+def pack_frame(frame: Image.Image, palette: Palette, digest: str = None) -> PackedFrame:
+    """
+    Quantizes a frame to a palette, dithered, and packs it.
+
+    Args:
+        frame (Image.Image): frame to pack
+        palette (Palette): palette to quantize to
+        digest (str, optional): render digest of the frame, see render_digest(). Defaults to None.
+
+    Returns:
+        PackedFrame: the packed frame
+    """
+    if frame.mode not in ["RGB", "L"]:
+        frame = frame.convert("RGB")
+    # dithered the same way the inky driver quantizes frames given to set_image()
+    quantized = frame.quantize(
+        palette=palette.image(), dither=Image.Dither.FLOYDSTEINBERG
+    )
+
+    w, h = frame.size
+    indices = np.frombuffer(quantized.tobytes(), dtype=np.uint8).reshape(h, w)
+    if w % 2 == 1:
+        indices = np.pad(indices, ((0, 0), (0, 1)))
+    packed = (indices[:, 0::2] << 4) | indices[:, 1::2]
+    return PackedFrame((w, h), palette, packed, digest)
+
+
+class PackedFrameStore:
+    """
+    Directory of packed frames named by their render digest, e.g. a library of pre-rendered frames.
+    """
+
+    _dir: Path
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): directory to keep the frames in, created if missing
+        """
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+    def __fp(self, digest: str) -> Path:
+        return self._dir / f"{digest}.pipf"
+
+    def __contains__(self, digest: str) -> bool:
+        return self.__fp(digest).is_file()
+
+    def get(self, digest: str) -> Optional[PackedFrame]:
+        """
+        Loads the frame with a render digest.
+
+        Args:
+            digest (str): render digest of the frame
+
+        Returns:
+            Optional[PackedFrame]: the frame, None if there is none or it is unreadable
+        """
+        fp = self.__fp(digest)
+        try:
+            return PackedFrame.load(fp)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"ignoring unreadable packed frame {fp}: {e}")
+            return None
+
+    def put(self, frame: PackedFrame) -> None:
+        """
+        Stores a frame under its render digest, errors are logged and otherwise ignored.
+
+        Args:
+            frame (PackedFrame): frame to store, must have a digest
+        """
+        if frame.digest is None:
+            raise ValueError("only frames with a digest can be stored")
+        try:
+            frame.save(self.__fp(frame.digest))
+        except OSError as e:
+            logger.error(f"failed to store packed frame {frame.digest}: {e}")
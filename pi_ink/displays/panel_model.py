@@ -0,0 +1,149 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Optional
+
+from pi_ink.clock import IClock, SystemClock
+from pi_ink.metrics import Metrics
+
+from .display_result import DisplayResult
+from .edisplay_response import EDisplayResponse
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+
+@dataclass(frozen=True)
+class PanelModel:
+    refresh_time: float = 0.0  # seconds the panel takes to refresh
+    blocking: bool = True  # whether show() blocks until the refresh is done
+    min_interval: float = 0.0  # minimum seconds between the start of two refreshes
+    spi_bytes_per_second: float = 0.0  # 0 disables simulating the transfer time
+    bits_per_pixel: int = 4  # bits per pixel sent to the panel
+    energy_per_refresh: float = 0.0  # joules per refresh
+
+    @classmethod
+    def instant(cls):
+        """
+        Panel that refreshes immediately, for benchmarking everything but the panel.
+        """
+        return cls()
+
+    @classmethod
+    def inky_impression(cls):
+        """
+        Approximates an Inky Impression 5.7" (600x448, 7 colours).
+
+        A refresh takes about 30s and show() blocks for it. The spi clock is ~3MHz, and the energy figure is a rough
+        estimate (~0.2W over the refresh), measure your own panel if it matters.
+        """
+        return cls(
+            refresh_time=30.0,
+            blocking=True,
+            min_interval=15.0,
+            spi_bytes_per_second=3_000_000 / 8,
+            bits_per_pixel=4,
+            energy_per_refresh=6.0,
+        )
+
+    def transfer_time(self, width: int, height: int) -> float:
+        """
+        Returns the time in seconds it takes to send a frame of the given size to the panel.
+        """
+        if self.spi_bytes_per_second <= 0:
+            return 0.0
+        return width * height * self.bits_per_pixel / 8 / self.spi_bytes_per_second
+
+
+@dataclass(frozen=True)
+class PanelStats:
+    refreshes: int
+    not_ready: int  # display_frame() calls rejected because the panel was busy or refreshed too recently
+    busy_time: float  # seconds spent transferring & refreshing
+    blocked_time: float  # seconds callers of display_frame() were blocked for
+    energy: float  # joules
+
+
+class PanelSimulator:
+    """
+    Simulates the refresh timing and power use of a panel described by a PanelModel. Shared by the mock displays, so
+    every mock backend behaves like the same panel.
+    """
+
+    _model: PanelModel
+    _clock: IClock
+    _lock: threading.Lock
+    _last_refresh_start: Optional[float] = None
+    _busy_until: float = 0.0
+    _refreshes: int = 0
+    _not_ready: int = 0
+    _busy_time: float = 0.0
+    _blocked_time: float = 0.0
+
+    def __init__(self, model: PanelModel = None, clock: IClock = None):
+        """
+        Args:
+            model (PanelModel, optional): panel to simulate. Defaults to PanelModel.instant().
+            clock (IClock, optional): clock to measure and sleep with. Defaults to SystemClock.
+        """
+        self._model = model if model is not None else PanelModel.instant()
+        self._clock = clock if clock is not None else SystemClock()
+        self._lock = threading.Lock()
+
+    @property
+    def model(self) -> PanelModel:
+        return self._model
+
+    def check_ready(self) -> Optional[DisplayResult]:
+        """
+        Checks whether the panel can start a refresh now.
+
+        Returns:
+            Optional[DisplayResult]: NOT_READY with the remaining wait time, or None if the panel is ready
+        """
+        now = self._clock.time()
+        with self._lock:
+            wait = self._busy_until - now
+            if self._last_refresh_start is not None:
+                wait = max(
+                    wait, self._last_refresh_start + self._model.min_interval - now
+                )
+
+            if wait > 0:
+                metrics.inc("display.not_ready")
+                self._not_ready += 1
+                return DisplayResult(response=EDisplayResponse.NOT_READY, value=wait)
+        return None
+
+    def refresh(self, width: int, height: int) -> None:
+        """
+        Simulates sending a frame to the panel and refreshing it, blocking the caller as the real panel would.
+
+        Args:
+            width (int): frame width in pixels
+            height (int): frame height in pixels
+        """
+        now = self._clock.time()
+        transfer = self._model.transfer_time(width, height)
+        busy = transfer + self._model.refresh_time
+        blocked = busy if self._model.blocking else transfer
+
+        metrics.inc("display.refreshes")
+        with self._lock:
+            self._last_refresh_start = now
+            self._busy_until = now + busy
+            self._refreshes += 1
+            self._busy_time += busy
+            self._blocked_time += blocked
+
+        self._clock.sleep(blocked)
+
+    def stats(self) -> PanelStats:
+        with self._lock:
+            return PanelStats(
+                refreshes=self._refreshes,
+                not_ready=self._not_ready,
+                busy_time=self._busy_time,
+                blocked_time=self._blocked_time,
+                energy=self._refreshes * self._model.energy_per_refresh,
+            )
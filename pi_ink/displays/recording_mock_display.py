@@ -0,0 +1,107 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+from PIL import Image
+
+from pi_ink.clock import IClock, SystemClock
+from pi_ink.metrics import Metrics
+
+from .display_result import DisplayResult
+from .edisplay_response import EDisplayResponse
+from .idisplay import IDisplay
+from .panel_model import PanelModel, PanelSimulator, PanelStats
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+
+@dataclass(frozen=True)
+class FrameRecord:
+    ready_at: float  # clock time when set_frame() was called
+    shown_at: float  # clock time when display_frame() finished the refresh
+    frame: Optional[Image.Image] = None
+    # when the render of the frame started, if the renderer stamped it as frame.info["rendered_at"]
+    rendered_at: Optional[float] = None
+
+
+class RecordingMockDisplay(IDisplay):
+    """
+    Headless display that records when frames become ready and when they are shown, for benchmarking apps.
+    """
+
+    _panel: PanelSimulator
+    _clock: IClock
+    _keep_frames: bool
+    _frame: Image = None
+    _ready_at: float = 0
+    _rendered_at: Optional[float] = None
+    _lock: threading.Lock
+    records: List[FrameRecord]
+
+    def __init__(
+        self,
+        panel: PanelModel = None,
+        clock: IClock = None,
+        keep_frames: bool = False,
+    ):
+        """
+        Args:
+            panel (PanelModel, optional): panel timing to simulate. Defaults to PanelModel.instant().
+            clock (IClock, optional): clock used to timestamp frames and simulate the panel. Defaults to SystemClock.
+            keep_frames (bool, optional): whether to keep every shown frame in records. Defaults to False.
+        """
+        self._clock = clock if clock is not None else SystemClock()
+        self._panel = PanelSimulator(panel, self._clock)
+        self._keep_frames = keep_frames
+        self._lock = threading.Lock()
+        self.records = []
+
+    def set_frame(
+        self, frame: Image, saturation: float = 0.5, dynamic_saturation: bool = False
+    ) -> None:
+        self._frame = frame
+        self._ready_at = self._clock.time()
+        self._rendered_at = frame.info.get("rendered_at")
+
+    def display_frame(self) -> DisplayResult:
+        not_ready = self._panel.check_ready()
+        if not_ready is not None:
+            return not_ready  # cannot update screen yet
+
+        if self._frame is None:
+            return DisplayResult(
+                response=EDisplayResponse.ERROR, value="no frame to display"
+            )
+
+        with metrics.span("display.show"):
+            self._panel.refresh(self._frame.width, self._frame.height)
+
+        with self._lock:
+            self.records.append(
+                FrameRecord(
+                    ready_at=self._ready_at,
+                    shown_at=self._clock.time(),
+                    frame=self._frame if self._keep_frames else None,
+                    rendered_at=self._rendered_at,
+                )
+            )
+
+        return DisplayResult(
+            response=EDisplayResponse.SUCCESS,
+            value=None,
+        )
+
+    def clear_frame(self) -> None:
+        self._frame = None
+
+    def frame_count(self) -> int:
+        with self._lock:
+            return len(self.records)
+
+    def panel_stats(self) -> PanelStats:
+        """
+        Returns the refresh count, busy time and energy used by the simulated panel so far.
+        """
+        return self._panel.stats()
@@ -0,0 +1,149 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Tuple
+
+from pi_ink.clock import IClock, SystemClock
+from pi_ink.metrics import Metrics
+
+from .display_result import DisplayResult
+from .edisplay_response import EDisplayResponse
+from .idisplay import IDisplay
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+
+class RefreshSlot:
+    """
+    Slot of a refresh taken from a RefreshGate.
+    """
+
+    # cleared when the panel didn't refresh after all, e.g. it wasn't ready, the slot then doesn't delay other panels
+    refreshed: bool = True
+
+
+class RefreshGate:
+    """
+    Staggers the refreshes of panels driven from one process: at most max_concurrent panels refresh at once, and a
+    refresh starts at least stagger seconds after the previous one started. Panels on one SPI bus can't be written at
+    the same time, and several e-ink refreshes at once draw more power than a Pi's supply may have to spare.
+    """
+
+    _max_concurrent: int
+    _stagger: float
+    _clock: IClock
+    _cond: threading.Condition
+    _active: int = 0
+    _last_start: float = None
+
+    def __init__(
+        self, max_concurrent: int = 1, stagger: float = 0.0, clock: IClock = None
+    ):
+        """
+        Args:
+            max_concurrent (int, optional): panels refreshing at the same time. Defaults to 1.
+            stagger (float, optional): minimum seconds between the start of two refreshes. Defaults to 0.
+            clock (IClock, optional): clock the stagger is measured and waited with. Defaults to SystemClock.
+        """
+        if max_concurrent < 1:
+            raise ValueError(f"max_concurrent must be at least 1, not {max_concurrent}")
+        self._max_concurrent = max_concurrent
+        self._stagger = stagger
+        self._clock = clock if clock is not None else SystemClock()
+        self._cond = threading.Condition()
+
+    @contextmanager
+    def refresh(self):
+        """
+        Blocks until the caller may refresh its panel, the panel is refreshed in the with block. If it turns out not
+        to refresh, the caller clears refreshed of the slot and the stagger is measured from the refresh before.
+
+        Yields:
+            RefreshSlot: the slot taken
+        """
+        slot = RefreshSlot()
+        waited = False
+        while True:
+            with self._cond:
+                while self._active >= self._max_concurrent:
+                    waited = True
+                    self._cond.wait()
+                now = self._clock.time()
+                wait = 0.0
+                if self._last_start is not None:
+                    wait = self._last_start + self._stagger - now
+                if wait <= 0:
+                    self._active += 1
+                    previous_start, self._last_start = self._last_start, now
+                    break
+            # sleep outside of the lock, another panel may take the slot meanwhile so it's checked again after
+            waited = True
+            self._clock.sleep(wait)
+
+        try:
+            yield slot
+        finally:
+            with self._cond:
+                self._active -= 1
+                if not slot.refreshed and self._last_start == now:
+                    # no refresh started, other panels are staggered against the last one that did
+                    self._last_start = previous_start
+                self._cond.notify()
+        if waited and slot.refreshed:
+            metrics.inc("display.refreshes_staggered")
+
+
+class GatedDisplay(IDisplay):
+    """
+    Display that refreshes the display it wraps through a RefreshGate shared with other panels.
+    """
+
+    _display: IDisplay
+    _gate: RefreshGate
+
+    def __init__(self, display: IDisplay, gate: RefreshGate):
+        """
+        Args:
+            display (IDisplay): display to refresh through the gate
+            gate (RefreshGate): gate shared by the panels of the process
+        """
+        self._display = display
+        self._gate = gate
+
+    @property
+    def display(self) -> IDisplay:
+        return self._display
+
+    @property
+    def retains_frame(self) -> bool:
+        return self._display.retains_frame
+
+    @property
+    def resolution(self) -> Tuple[int, int]:
+        return self._display.resolution
+
+    def set_frame(
+        self, frame: Any, saturation: float = 0.5, dynamic_saturation: bool = False
+    ) -> None:
+        self._display.set_frame(
+            frame, saturation=saturation, dynamic_saturation=dynamic_saturation
+        )
+
+    def set_packed_frame(self, frame) -> None:
+        self._display.set_packed_frame(frame)
+
+    def display_frame(self) -> DisplayResult:
+        with self._gate.refresh() as slot:
+            res = self._display.display_frame()
+            slot.refreshed = res.response == EDisplayResponse.SUCCESS
+            return res
+
+    def clear_frame(self) -> None:
+        self._display.clear_frame()
+
+    def __getattr__(self, name: str) -> Any:
+        # e.g. panel_stats() and close() of the wrapped display
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._display, name)
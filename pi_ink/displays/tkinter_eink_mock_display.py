@@ -1,24 +1,38 @@
 import logging
-import time
 from tkinter import Label, Tk
 
 from PIL import Image, ImageTk
 
+from pi_ink.clock import IClock
+from pi_ink.metrics import Metrics
+
 from .display_result import DisplayResult
 from .edisplay_response import EDisplayResponse
 from .idisplay import IDisplay
+from .panel_model import PanelModel, PanelSimulator, PanelStats
 
 logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
 
 
 class TkinterEinkMockDisplay(IDisplay):
-    _last_update: float = 0
-    _screen_refresh_time: float = 15  # in seconds
+    _panel: PanelSimulator
     _frame: Image = None
     _root: Tk = None
     _label: Label = None
 
-    def __init__(self):
+    def __init__(self, panel: PanelModel = None, clock: IClock = None):
+        """
+        Args:
+            panel (PanelModel, optional): panel timing to simulate. Defaults to a panel that refreshes at once, at
+                most every 15s. A blocking model freezes the window for the refresh, Tk is driven from the caller's
+                thread.
+            clock (IClock, optional): clock used to simulate the panel timing. Defaults to SystemClock.
+        """
+        self._panel = PanelSimulator(
+            panel if panel is not None else PanelModel(min_interval=15.0), clock
+        )
+
         self._root = Tk()
         self._root.title("[MOCK] E-Ink Display")
         self._root.geometry("600x448")
@@ -37,28 +51,26 @@ class TkinterEinkMockDisplay(IDisplay):
         self._frame = frame
 
     def display_frame(self) -> DisplayResult:
-        now = time.time()
-        delta = now - self._last_update
-        if delta < self._screen_refresh_time:
-            return DisplayResult(
-                response=EDisplayResponse.NOT_READY,
-                value=self._screen_refresh_time
-                - delta,  # remaining wait time until screen is ready
-            )  # cannot update screen yet
+        not_ready = self._panel.check_ready()
+        if not_ready is not None:
+            return not_ready  # cannot update screen yet
 
         logger.info(f"displaying frame")
-        self._last_update = now
 
         if self._frame is None:
             return DisplayResult(
                 response=EDisplayResponse.ERROR, value="no frame to display"
             )
 
-        # draw image onto Tk Window
-        img_tk = ImageTk.PhotoImage(self._frame)
-        self._label.configure(image=img_tk)
-        self._root.update_idletasks()
-        self._root.update()
+        with metrics.span("display.show"):
+            # draw image onto Tk Window
+            img_tk = ImageTk.PhotoImage(self._frame)
+            self._label.configure(image=img_tk)
+            self._root.update_idletasks()
+            self._root.update()
+
+            # blocks only if the panel model does, the default doesn't
+            self._panel.refresh(self._frame.width, self._frame.height)
 
         return DisplayResult(
             response=EDisplayResponse.SUCCESS,
@@ -68,3 +80,9 @@ class TkinterEinkMockDisplay(IDisplay):
     def clear_frame(self) -> None:
         del self._frame
         self._frame = None
+
+    def panel_stats(self) -> PanelStats:
+        """
+        Returns the refresh count, busy time and energy used by the simulated panel so far.
+        """
+        return self._panel.stats()
@@ -0,0 +1,5 @@
+from .igpio import IGpio
+from .rpi_gpio import RPiGpio
+from .simulated_gpio import ScriptedPress, SimulatedGpio
+
+__all__ = ["IGpio", "RPiGpio", "SimulatedGpio", "ScriptedPress"]
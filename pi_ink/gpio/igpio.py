@@ -0,0 +1,32 @@
+from abc import ABC
+from typing import Callable, List
+
+
+class IGpio(ABC):
+    def setup_buttons(self, pins: List[int]) -> None:
+        """
+        Sets up the given pins as button inputs (connected to ground, with pull-up resistors).
+
+        Args:
+            pins (List[int]): gpio pins of the buttons
+        """
+        raise NotImplementedError("setup_buttons() not implemented")
+
+    def add_press_callback(
+        self, pin: int, callback: Callable[[int], None], bouncetime: int = 0
+    ) -> None:
+        """
+        Registers a callback that is called, from a gpio thread, with the pin number whenever the button is pressed.
+
+        Args:
+            pin (int): gpio pin of the button
+            callback (Callable[[int], None]): function called with the pin number on a press
+            bouncetime (int, optional): presses within this many milliseconds of the last one are ignored. Defaults to 0.
+        """
+        raise NotImplementedError("add_press_callback() not implemented")
+
+    def cleanup(self) -> None:
+        """
+        Releases the gpio resources.
+        """
+        raise NotImplementedError("cleanup() not implemented")
@@ -0,0 +1,35 @@
+import logging
+from typing import Callable, List
+
+from .igpio import IGpio
+
+logger = logging.getLogger(__name__)
+
+
+class RPiGpio(IGpio):
+    _gpio = None
+
+    def __init__(self):
+        # imported here so the rest of pi_ink can be imported on machines without RPi.GPIO
+        from RPi import GPIO
+
+        self._gpio = GPIO
+        self._gpio.setmode(
+            self._gpio.BCM
+        )  # setups RPI.GPIO to use the BCM pin numbering scheme
+
+    def setup_buttons(self, pins: List[int]) -> None:
+        # btns connect to ground, set them as inputs with pull-up resistors
+        self._gpio.setup(pins, self._gpio.IN, pull_up_down=self._gpio.PUD_UP)
+
+    def add_press_callback(
+        self, pin: int, callback: Callable[[int], None], bouncetime: int = 0
+    ) -> None:
+        kwargs = {"bouncetime": bouncetime} if bouncetime > 0 else {}
+        self._gpio.add_event_detect(
+            pin, self._gpio.FALLING, callback=callback, **kwargs
+        )
+        logger.debug(f"added falling edge callback on pin {pin}")
+
+    def cleanup(self) -> None:
+        self._gpio.cleanup()
@@ -0,0 +1,99 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .igpio import IGpio
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ScriptedPress:
+    at: float  # seconds after the start of the replay
+    pin: int
+
+
+class SimulatedGpio(IGpio):
+    """
+    Gpio backend that replays a script of button presses from a background thread, the same way RPi.GPIO calls
+    back from its own thread. The actual time of every delivered press is recorded in presses.
+    """
+
+    _script: List[ScriptedPress]
+    _pins: List[int]
+    _callbacks: Dict[int, Tuple[Callable[[int], None], int]]
+    _last_press: Dict[int, float]
+    _thread: Optional[threading.Thread] = None
+    _stop: threading.Event
+    presses: List[Tuple[int, float]]  # (pin, time.time() of the press)
+    done: threading.Event
+
+    def __init__(self, script: List[ScriptedPress] = None):
+        """
+        Args:
+            script (List[ScriptedPress], optional): presses to replay once start() is called. Defaults to no presses.
+        """
+        self._script = sorted(script or [], key=lambda p: p.at)
+        self._pins = []
+        self._callbacks = {}
+        self._last_press = {}
+        self._stop = threading.Event()
+        self.presses = []
+        self.done = threading.Event()
+
+    def setup_buttons(self, pins: List[int]) -> None:
+        self._pins = list(pins)
+
+    def add_press_callback(
+        self, pin: int, callback: Callable[[int], None], bouncetime: int = 0
+    ) -> None:
+        if pin not in self._pins:
+            raise RuntimeError(f"pin {pin} has not been set up as a button")
+        self._callbacks[pin] = (callback, bouncetime)
+
+    def press(self, pin: int) -> None:
+        """
+        Presses a button immediately, calling its callback on the calling thread.
+
+        Args:
+            pin (int): gpio pin of the button
+        """
+        now = time.time()
+        callback, bouncetime = self._callbacks.get(pin, (None, 0))
+        last = self._last_press.get(pin)
+        if callback is None or (last is not None and (now - last) * 1000 < bouncetime):
+            return
+
+        self._last_press[pin] = now
+        self.presses.append((pin, now))
+        callback(pin)
+
+    def start(self) -> None:
+        """
+        Starts replaying the script on a background thread, done is set once every press has been delivered.
+        """
+        self._thread = threading.Thread(
+            target=self.__replay, name="simulated-gpio", daemon=True
+        )
+        self._thread.start()
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def __replay(self):
+        t0 = time.time()
+        for scripted in self._script:
+            delay = t0 + scripted.at - time.time()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            self.press(scripted.pin)
+
+        logger.debug(f"replayed {len(self.presses)} presses")
+        self.done.set()
+
+    def cleanup(self) -> None:
+        self._stop.set()
+        self.join()
@@ -0,0 +1,11 @@
+from .json_formatter import JsonFormatter
+from .log_filter import BASE_RECORD_KEYS, LogFilter
+from .pipeline import DroppingQueueHandler, setup_logging
+
+__all__ = [
+    "BASE_RECORD_KEYS",
+    "LogFilter",
+    "JsonFormatter",
+    "DroppingQueueHandler",
+    "setup_logging",
+]
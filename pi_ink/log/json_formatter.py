@@ -0,0 +1,40 @@
+import json
+import logging
+
+from .log_filter import BASE_RECORD_KEYS
+
+# built once, json.dumps() with non-default arguments creates a new encoder per call
+_encoder = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one compact json object per line, with the extra= fields of the logging call under "extra".
+    Values json can't encode are written as their str().
+    """
+
+    def format(self, record):
+        doc = {
+            "ts": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "func": record.funcName,
+            "msg": record.getMessage(),
+        }
+
+        extra = {
+            key: value
+            for key, value in record.__dict__.items()
+            if key not in BASE_RECORD_KEYS
+        }
+        if extra:
+            doc["extra"] = extra
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            doc["exc"] = record.exc_text
+        if record.stack_info:
+            doc["stack"] = self.formatStack(record.stack_info)
+
+        return _encoder.encode(doc)
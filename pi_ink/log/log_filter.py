@@ -0,0 +1,27 @@
+import logging
+
+# attributes every LogRecord has, plus the ones formatters and QueueHandler.prepare() add. Anything else on a record
+# came from the extra= argument of the logging call.
+BASE_RECORD_KEYS = frozenset(
+    logging.LogRecord("", logging.DEBUG, "", 0, "", None, None, "").__dict__.keys()
+) | {"message", "asctime"}
+
+
+class LogFilter(logging.Filter):
+    """
+    Collects the extra= fields of a record into record.extra, for the "extra=%(extra)s" part of the text format.
+    """
+
+    def filter(self, record):
+        extra_keys = [key for key in record.__dict__ if key not in BASE_RECORD_KEYS]
+
+        if hasattr(record, "extra"):
+            record.extra_ = record.extra
+            extra_keys.append("extra_")
+
+        record.extra = {}
+
+        for key in extra_keys:
+            record.extra[key] = record.__dict__[key]
+
+        return True
@@ -0,0 +1,79 @@
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import TextIO
+
+from pi_ink.metrics import Metrics
+
+from .json_formatter import JsonFormatter
+from .log_filter import LogFilter
+
+metrics = Metrics.instance()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler for a bounded queue that drops records when the queue is full, instead of blocking the logging
+    thread or reporting the error on stderr.
+    """
+
+    dropped: int = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            metrics.inc("log.dropped")
+
+
+def _stop_listener(listener: QueueListener) -> None:
+    # QueueListener.stop() fails when called twice before python 3.12
+    if listener._thread is not None:
+        listener.stop()
+
+
+def setup_logging(
+    level: int,
+    fmt: str = None,
+    datefmt: str = None,
+    json_logs: bool = False,
+    stream: TextIO = None,
+    queue_size: int = 10000,
+) -> QueueListener:
+    """
+    Sets up the root logger to hand records to a background thread, which formats and writes them. Logging calls only
+    format the message and put the record on a queue, so the render & gpio threads never wait on a slow console or
+    journald.
+
+    Args:
+        level (int): root log level
+        fmt (str, optional): format of text logs. Defaults to the logging default.
+        datefmt (str, optional): date format of text logs. Defaults to the logging default.
+        json_logs (bool, optional): whether to write json lines instead of text. Defaults to False.
+        stream (TextIO, optional): stream to write to. Defaults to sys.stdout.
+        queue_size (int, optional): records buffered before new records are dropped. Defaults to 10000.
+
+    Returns:
+        QueueListener: the started listener, stopped (and flushed) automatically at exit
+    """
+    handler = logging.StreamHandler(stream=stream if stream is not None else sys.stdout)
+    if json_logs:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.addFilter(LogFilter())
+        handler.setFormatter(logging.Formatter(fmt=fmt, datefmt=datefmt))
+
+    log_queue = queue.Queue(maxsize=queue_size)
+    root = logging.getLogger()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level)
+
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(_stop_listener, listener)
+    return listener
@@ -0,0 +1,22 @@
+from pi_ink.registry import lazy_attributes
+
+from .metrics import Counter, Histogram, Metrics
+
+# the exporters pull in http.server (and with it ssl), only import them when an export surface is used
+__getattr__ = lazy_attributes(
+    __name__,
+    {
+        "render_prometheus": ".exporters",
+        "PrometheusTextfileExporter": ".exporters",
+        "MetricsHttpServer": ".exporters",
+    },
+)
+
+__all__ = [
+    "Metrics",
+    "Counter",
+    "Histogram",
+    "render_prometheus",
+    "PrometheusTextfileExporter",
+    "MetricsHttpServer",
+]
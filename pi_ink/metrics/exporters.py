@@ -0,0 +1,148 @@
+import logging
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List
+
+from .metrics import Metrics
+
+logger = logging.getLogger(__name__)
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+
+def _metric_name(name: str) -> str:
+    return "pi_ink_" + _INVALID_NAME_CHARS.sub("_", name)
+
+
+def render_prometheus(metrics: Metrics = None) -> str:
+    """
+    Renders the counters and histograms in the Prometheus text exposition format.
+
+    Counters are exported as pi_ink_<name>_total, timing histograms as pi_ink_<name>_seconds, with dots and other
+    invalid characters in names replaced by underscores.
+
+    Args:
+        metrics (Metrics, optional): registry to render. Defaults to Metrics.instance().
+
+    Returns:
+        str: metrics in the Prometheus text format
+    """
+    metrics = metrics if metrics is not None else Metrics.instance()
+    lines: List[str] = []
+
+    for name, counter in sorted(metrics.counters().items()):
+        metric = _metric_name(name) + "_total"
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {counter.value}")
+
+    for name, histogram in sorted(metrics.histograms().items()):
+        metric = _metric_name(name) + "_seconds"
+        cumulative, total, count = histogram.snapshot()
+        lines.append(f"# TYPE {metric} histogram")
+        for bound, c in zip(histogram.buckets, cumulative):
+            lines.append(f'{metric}_bucket{{le="{bound}"}} {c}')
+        lines.append(f'{metric}_bucket{{le="+Inf"}} {cumulative[-1]}')
+        lines.append(f"{metric}_sum {total}")
+        lines.append(f"{metric}_count {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+class PrometheusTextfileExporter:
+    """
+    Periodically writes the metrics to a file, e.g. for the node_exporter textfile collector.
+    """
+
+    _fp: Path
+    _interval: float
+    _stop: threading.Event
+    _thread: threading.Thread = None
+
+    def __init__(self, fp: str, interval: float = 30):
+        """
+        Args:
+            fp (str): file to write, should end in .prom for the textfile collector
+            interval (float, optional): seconds between writes. Defaults to 30.
+        """
+        self._fp = Path(fp)
+        self._interval = interval
+        self._stop = threading.Event()
+
+    def write(self) -> None:
+        # write to a temporary file first, so the collector never reads a half written file
+        tmp_fp = self._fp.with_name(self._fp.name + ".tmp")
+        tmp_fp.write_text(render_prometheus())
+        os.replace(tmp_fp, self._fp)
+
+    def __run(self):
+        while not self._stop.wait(self._interval):
+            try:
+                self.write()
+            except OSError as e:
+                logger.error(f"failed to write metrics to {self._fp}: {e}")
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self.__run, name="metrics-textfile", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"writing metrics to {self._fp} every {self._interval}s")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.write()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+
+class MetricsHttpServer:
+    """
+    Serves the metrics at http://<host>:<port>/metrics from a background thread.
+    """
+
+    _server: ThreadingHTTPServer
+    _thread: threading.Thread = None
+
+    def __init__(self, port: int, host: str = "127.0.0.1"):
+        """
+        Args:
+            port (int): port to listen on, 0 picks a free port
+            host (str, optional): address to listen on. Defaults to "127.0.0.1".
+        """
+        self._server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        self._server.daemon_threads = True
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> None:
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-http", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"serving metrics on port {self.port}")
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,184 @@
+import bisect
+import threading
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Tuple
+
+# default histogram buckets in seconds, from a fast PIL op up to a full e-ink refresh
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+_NULL_SPAN = nullcontext()
+
+
+class Counter:
+    _value: float
+    _lock: threading.Lock
+
+    def __init__(self):
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, value: float = 1) -> None:
+        with self._lock:
+            self._value += value
+
+    @property
+    def value(self) -> float:
+        with self._lock:
+            return self._value
+
+
+class Histogram:
+    buckets: Tuple[float, ...]
+    _counts: List[int]
+    _sum: float
+    _count: int
+    _lock: threading.Lock
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)  # last bucket is +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        """
+        Returns:
+            Tuple[List[int], float, int]: cumulative bucket counts (ending with +Inf), sum and count
+        """
+        with self._lock:
+            cumulative = []
+            total = 0
+            for c in self._counts:
+                total += c
+                cumulative.append(total)
+            return cumulative, self._sum, self._count
+
+
+class _Span:
+    __slots__ = ("_histogram", "_t0")
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._histogram.observe(time.perf_counter() - self._t0)
+        return False
+
+
+class Metrics:
+    """
+    Process-wide registry of counters and timing histograms.
+
+    Disabled by default, in which case span() returns a shared no-op context manager and inc()/observe() return
+    immediately, so instrumented code pays next to nothing.
+    """
+
+    _enabled: bool = False
+    _counters: Dict[str, Counter] = {}
+    _histograms: Dict[str, Histogram] = {}
+    _lock: threading.Lock = threading.Lock()
+    _instance = None
+
+    def __init__(self):
+        raise RuntimeError("Call instance() instead")
+
+    @classmethod
+    def instance(cls):
+        if cls._instance is None:
+            cls._instance = cls.__new__(cls)
+        return cls._instance
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def enable(self, enabled: bool = True) -> None:
+        self._enabled = enabled
+
+    def counter(self, name: str) -> Counter:
+        counter = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(name, Counter())
+        return counter
+
+    def histogram(self, name: str) -> Histogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """
+        Increments the named counter.
+
+        Args:
+            name (str): counter name, e.g. "spotify.calls"
+            value (float, optional): amount to increment by. Defaults to 1.
+        """
+        if not self._enabled:
+            return
+        self.counter(name).inc(value)
+
+    def observe(self, name: str, value: float) -> None:
+        """
+        Records a value in the named histogram.
+
+        Args:
+            name (str): histogram name
+            value (float): value to record, in seconds for timings
+        """
+        if not self._enabled:
+            return
+        self.histogram(name).observe(value)
+
+    def span(self, name: str):
+        """
+        Times the enclosed block into the named histogram.
+
+        Args:
+            name (str): stage name, e.g. "renderer.blur"
+
+        Returns:
+            a context manager timing the block
+        """
+        if not self._enabled:
+            return _NULL_SPAN
+        return _Span(self.histogram(name))
+
+    def counters(self) -> Dict[str, Counter]:
+        with self._lock:
+            return dict(self._counters)
+
+    def histograms(self) -> Dict[str, Histogram]:
+        with self._lock:
+            return dict(self._histograms)
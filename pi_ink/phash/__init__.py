@@ -0,0 +1,4 @@
+from .dhash import dhash, hamming_distance, hash_file
+from .photo_hash_index import IndexUpdate, PhotoHashIndex
+
+__all__ = ["dhash", "hamming_distance", "hash_file", "IndexUpdate", "PhotoHashIndex"]
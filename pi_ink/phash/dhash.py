@@ -0,0 +1,61 @@
+from pathlib import Path
+from typing import Union
+
+import numpy as np
+from PIL import Image
+
+# popcount of every byte, for numpy versions without bitwise_count
+_BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def dhash(img: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash of an image: whether each pixel of a hash_size x hash_size greyscale thumbnail is brighter than
+    its left neighbour. Rescaled, recompressed or slightly edited copies of a picture hash the same or a few bits
+    apart.
+
+    Args:
+        img (Image.Image): image to hash, JPEGs not loaded yet are decoded at a reduced scale
+        hash_size (int, optional): rows of the thumbnail, the hash has hash_size**2 bits. Defaults to 8.
+
+    Returns:
+        int: the hash
+    """
+    # JPEGs are decoded at 1/8 scale straight from the DCT coefficients, far faster than decoding full size
+    img.draft("L", (hash_size * 8, hash_size * 8))
+    thumb = img.convert("L").resize((hash_size + 1, hash_size), Image.BOX)
+    pixels = np.asarray(thumb, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """
+    Number of bits two hashes differ in.
+    """
+    return bin(a ^ b).count("1")
+
+
+def popcount(values: np.ndarray) -> np.ndarray:
+    """
+    Number of set bits of each element of an unsigned integer array.
+    """
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+    as_bytes = values.view(np.uint8).reshape(values.shape + (values.dtype.itemsize,))
+    return _BYTE_POPCOUNT[as_bytes].sum(axis=-1, dtype=np.uint8)
+
+
+def hash_file(fp: Union[str, Path], hash_size: int = 8) -> int:
+    """
+    Difference hash of a picture file.
+
+    Args:
+        fp (Union[str, Path]): path of the picture
+        hash_size (int, optional): rows of the thumbnail the hash is of. Defaults to 8.
+
+    Returns:
+        int: the hash
+    """
+    with Image.open(fp) as img:
+        return dhash(img, hash_size)
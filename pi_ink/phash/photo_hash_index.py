@@ -0,0 +1,344 @@
+import json
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from pi_ink.metrics import Metrics
+
+from .dhash import hamming_distance, hash_file, popcount
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+_VERSION = 1
+_SLICES = 8  # bytes of the 64 bit hashes, each indexed on its own
+_POOL_MIN = 32  # fewer pictures than this are hashed on the calling thread, starting workers takes longer
+# hashes after which a long update makes them queryable and saves them
+_CHECKPOINT_EVERY = 2000
+
+
+@dataclass(frozen=True)
+class IndexUpdate:
+    hashed: int  # new or modified pictures
+    unchanged: int  # pictures whose hash was kept
+    removed: int  # pictures gone from the library
+    failed: int  # pictures that couldn't be read
+    seconds: float
+
+
+def _hash_path(fp: str) -> Tuple[Optional[int], Optional[str]]:
+    # runs in the worker processes, errors are returned instead of raised so one bad file doesn't end the update
+    try:
+        return hash_file(fp), None
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+
+
+class _BitSlices:
+    """
+    Multi-index over the bytes of the hashes. Two hashes at most 7 bits apart have at least one of their 8 bytes in
+    common, so the candidates of a query are the hashes sharing a byte with it, about 1/32 of them, and only those are
+    compared in full.
+    """
+
+    _paths: List[str]
+    _hashes: np.ndarray  # uint64
+    _orders: List[np.ndarray]  # per slice, indices of the hashes sorted by the byte
+    _starts: List[np.ndarray]  # per slice, where each byte value starts in the order
+
+    def __init__(self, hashes: Dict[str, int]):
+        self._paths = list(hashes.keys())
+        self._hashes = np.fromiter(hashes.values(), dtype=np.uint64, count=len(hashes))
+        self._orders = []
+        self._starts = []
+        for s in range(_SLICES):
+            values = (self._hashes >> np.uint64(8 * s)) & np.uint64(0xFF)
+            self._orders.append(np.argsort(values, kind="stable"))
+            self._starts.append(
+                np.concatenate([[0], np.cumsum(np.bincount(values, minlength=256))])
+            )
+
+    def query(self, h: int, max_distance: int) -> List[Tuple[int, str]]:
+        if len(self._paths) == 0:
+            return []
+        if max_distance < _SLICES:
+            candidates = np.concatenate(
+                [
+                    order[starts[v] : starts[v + 1]]
+                    for order, starts, v in (
+                        (self._orders[s], self._starts[s], (h >> (8 * s)) & 0xFF)
+                        for s in range(_SLICES)
+                    )
+                ]
+            )
+        else:
+            # the bytes don't narrow it down, all hashes are compared
+            candidates = np.arange(len(self._paths))
+        distances = popcount(self._hashes[candidates] ^ np.uint64(h))
+        close = distances <= max_distance
+        # hashes sharing several bytes with h are candidates more than once, only the few close ones are deduplicated
+        return [
+            (int(d), self._paths[i])
+            for i, d in dict(zip(candidates[close], distances[close])).items()
+        ]
+
+
+class PhotoHashIndex:
+    """
+    Difference hashes of a photo library, to tell near-identical pictures apart from different ones: burst shots,
+    exported copies, rescaled duplicates.
+
+    The hashes are kept in a json file with the mtime and size of each picture, an update only hashes new and modified
+    pictures, on a pool of worker processes. Near-duplicates of a picture across the library are found with a
+    bit-sliced lookup, near-duplicates among the few pictures shown last by comparing the hashes directly.
+    """
+
+    _fp: Optional[Path]
+    _workers: Optional[int]
+    _start_method: str
+    _lock: threading.Lock
+    # path -> mtime_ns, size, hash, None for pictures that couldn't be read, they aren't read again until modified
+    _entries: Dict[str, Tuple[int, int, Optional[int]]]
+    _hashes: Dict[str, int]  # of the readable pictures, by path
+    _slices: Optional[_BitSlices] = None  # built on the first query after a change
+
+    def __init__(
+        self,
+        fp: Union[str, Path] = None,
+        workers: int = None,
+        start_method: str = "spawn",
+    ):
+        """
+        Args:
+            fp (Union[str, Path], optional): json file the hashes are kept in, loaded if it exists. Defaults to None,
+                keeping them in memory only.
+            workers (int, optional): processes pictures are hashed with. Defaults to the number of cores.
+            start_method (str, optional): multiprocessing start method of the workers. Defaults to "spawn", forking a
+                process with running gpio threads isn't safe.
+        """
+        self._fp = Path(fp) if fp is not None else None
+        self._workers = workers
+        self._start_method = start_method
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._hashes = {}
+        if self._fp is not None:
+            self.__load()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._hashes)
+
+    def __load(self) -> None:
+        try:
+            doc = json.loads(self._fp.read_text())
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            logger.warning(f"ignoring unreadable photo hash index {self._fp}: {e}")
+            return
+
+        if doc.get("version") != _VERSION:
+            logger.info(
+                f"ignoring photo hash index {self._fp} of version {doc.get('version')}"
+            )
+            return
+        entries = {
+            path: (mtime_ns, size, int(h, 16) if h is not None else None)
+            for path, (mtime_ns, size, h) in doc["photos"].items()
+        }
+        self.__set_entries(entries)
+        logger.info(f"loaded {len(entries)} photo hashes from {self._fp}")
+
+    def __save(self) -> None:
+        if self._fp is None:
+            return
+        with self._lock:
+            photos = {
+                path: [mtime_ns, size, f"{h:016x}" if h is not None else None]
+                for path, (mtime_ns, size, h) in self._entries.items()
+            }
+        try:
+            tmp_fp = self._fp.with_name(self._fp.name + ".tmp")
+            tmp_fp.write_text(json.dumps({"version": _VERSION, "photos": photos}))
+            os.replace(tmp_fp, self._fp)
+        except OSError as e:
+            logger.error(f"failed to save photo hash index {self._fp}: {e}")
+
+    def __set_entries(self, entries: Dict[str, Tuple[int, int, Optional[int]]]) -> None:
+        hashes = {path: h for path, (_, _, h) in entries.items() if h is not None}
+        with self._lock:
+            self._entries = entries
+            self._hashes = hashes
+            self._slices = None
+
+    def update(self, fps: Iterable[Union[str, Path]]) -> IndexUpdate:
+        """
+        Brings the index in line with the library: hashes new and modified pictures, and drops the pictures that
+        aren't in it anymore. Hashes are queryable, and saved, as they're done, a long first update can be queried
+        while it runs.
+
+        Args:
+            fps (Iterable[Union[str, Path]]): pictures of the library
+
+        Returns:
+            IndexUpdate: what was hashed, kept and removed
+        """
+        t0 = time.perf_counter()
+        with self._lock:
+            entries = dict(self._entries)
+
+        stats: Dict[str, Tuple[int, int]] = {}
+        for fp in fps:
+            try:
+                stat = os.stat(fp)
+            except OSError:
+                continue
+            stats[str(fp)] = (stat.st_mtime_ns, stat.st_size)
+
+        removed = [path for path in entries if path not in stats]
+        for path in removed:
+            del entries[path]
+        todo = [
+            path
+            for path, (mtime_ns, size) in stats.items()
+            if entries.get(path, (None, None))[:2] != (mtime_ns, size)
+        ]
+        unchanged = len(stats) - len(todo)
+        self.__set_entries(dict(entries))
+
+        hashed = failed = 0
+        if len(todo) > 0:
+            logger.info(f"hashing {len(todo)} photos, {unchanged} unchanged")
+            for i, (h, error) in enumerate(self.__hash_all(todo)):
+                path = todo[i]
+                if h is None:
+                    failed += 1
+                    logger.warning(f"failed to hash {path}: {error}")
+                else:
+                    hashed += 1
+                entries[path] = (*stats[path], h)
+                if (i + 1) % _CHECKPOINT_EVERY == 0:
+                    self.__set_entries(dict(entries))
+                    self.__save()
+            self.__set_entries(entries)
+
+        if hashed > 0 or failed > 0 or len(removed) > 0:
+            self.__save()
+        metrics.inc("phash.hashed", hashed)
+        update = IndexUpdate(
+            hashed=hashed,
+            unchanged=unchanged,
+            removed=len(removed),
+            failed=failed,
+            seconds=time.perf_counter() - t0,
+        )
+        logger.info(f"photo hash index updated: {update}")
+        return update
+
+    def __hash_all(
+        self, paths: List[str]
+    ) -> Iterable[Tuple[Optional[int], Optional[str]]]:
+        if len(paths) < _POOL_MIN or self._workers == 1:
+            return map(_hash_path, paths)
+
+        workers = self._workers or os.cpu_count() or 1
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(self._start_method),
+        )
+        # big chunks keep the ipc per picture low, several per worker keep them all busy until the end
+        chunksize = max(1, min(256, len(paths) // (workers * 8)))
+
+        def results():
+            done = 0
+            try:
+                with executor:
+                    for result in executor.map(_hash_path, paths, chunksize=chunksize):
+                        yield result
+                        done += 1
+            except BrokenProcessPool as e:
+                # e.g. a worker killed for running out of memory, the rest is hashed here
+                logger.error(f"photo hashing workers failed, hashing on one core: {e}")
+                yield from map(_hash_path, paths[done:])
+
+        return results()
+
+    def hash_of(self, fp: Union[str, Path]) -> Optional[int]:
+        """
+        The hash of a picture, None if it isn't hashed (yet).
+        """
+        with self._lock:
+            return self._hashes.get(str(fp))
+
+    def is_near_duplicate(
+        self,
+        fp: Union[str, Path],
+        recent: Iterable[Union[str, Path]],
+        max_distance: int,
+    ) -> bool:
+        """
+        Whether a picture is, or nearly is, one of the recent pictures. The recent pictures are few, their hashes are
+        compared directly, taking microseconds whatever the size of the library.
+
+        Args:
+            fp (Union[str, Path]): the picture, e.g. the next one to show
+            recent (Iterable[Union[str, Path]]): pictures shown last
+            max_distance (int): bits the hashes of near-duplicates differ in at most
+
+        Returns:
+            bool: whether the picture is a near-duplicate, pictures not hashed yet are only duplicates of themselves
+        """
+        # paths are compared as strings, they're the keys of the hashes and cheaper to hash than Paths
+        fp = str(fp)
+        with self._lock:
+            hashes = self._hashes
+        h = hashes.get(fp)
+        for other in recent:
+            other = str(other)
+            if other == fp:
+                return True
+            other_h = hashes.get(other)
+            if (
+                h is not None
+                and other_h is not None
+                and hamming_distance(h, other_h) <= max_distance
+            ):
+                return True
+        return False
+
+    def near(self, fp: Union[str, Path], max_distance: int) -> List[Tuple[int, Path]]:
+        """
+        Near-duplicates of a picture across the library.
+
+        Args:
+            fp (Union[str, Path]): the picture
+            max_distance (int): bits the hashes of near-duplicates differ in at most, lookups up to 7 bits only compare
+                the hashes sharing a byte with the picture's
+
+        Returns:
+            List[Tuple[int, Path]]: distance and path of the other pictures at most max_distance bits apart, closest
+                first
+        """
+        fp = str(fp)
+        with self._lock:
+            h = self._hashes.get(fp)
+            if h is None:
+                return []
+            if self._slices is None:
+                self._slices = _BitSlices(self._hashes)
+            slices = self._slices
+        return sorted(
+            (d, Path(other))
+            for d, other in slices.query(h, max_distance)
+            if other != fp
+        )
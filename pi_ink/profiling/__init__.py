@@ -0,0 +1,4 @@
+from .cycle_profiler import CycleProfiler, profile_cycle
+from .sampling_profiler import SamplingProfiler
+
+__all__ = ["CycleProfiler", "SamplingProfiler", "profile_cycle"]
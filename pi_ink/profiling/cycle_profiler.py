@@ -0,0 +1,158 @@
+import cProfile
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import List, Optional
+
+from .sampling_profiler import SamplingProfiler
+
+logger = logging.getLogger(__name__)
+
+_NULL_CYCLE = nullcontext()
+
+
+class CycleProfiler:
+    """
+    Profiles a bounded number of an app's render/display cycles, writing one profile per cycle to a directory.
+
+    Each cycle produces cycle_<n>.pstats (cProfile, for pstats/snakeviz) or cycle_<n>.collapsed (sampled collapsed
+    stacks, for flamegraph.pl/speedscope) and, with tracemalloc enabled, cycle_<n>.tracemalloc (a snapshot for
+    tracemalloc.Snapshot.load). Only the newest `keep` cycles are kept on disk and profiling stops after `iterations`
+    cycles, so it is safe to leave enabled on a device.
+    """
+
+    FORMATS = ("pstats", "collapsed")
+
+    _out_dir: Path
+    _iterations: int
+    _fmt: str
+    _tracemalloc: bool
+    _keep: int
+    _sample_interval: float
+    _cycles: int = 0
+    _offset: int = 0
+    _written: List[int]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        out_dir: str,
+        iterations: int = 10,
+        fmt: str = "pstats",
+        tracemalloc_snapshots: bool = False,
+        keep: int = 20,
+        sample_interval: float = 0.005,
+    ):
+        """
+        Args:
+            out_dir (str): directory to write the profiles to, created if missing
+            iterations (int, optional): number of cycles to profile. Defaults to 10.
+            fmt (str, optional): "pstats" (cProfile) or "collapsed" (sampling profiler). Defaults to "pstats".
+            tracemalloc_snapshots (bool, optional): whether to also write a tracemalloc snapshot per cycle.
+                Defaults to False.
+            keep (int, optional): number of cycles whose profiles are kept on disk. Defaults to 20.
+            sample_interval (float, optional): seconds between samples of the "collapsed" format. Defaults to 0.005.
+        """
+        if fmt not in self.FORMATS:
+            raise ValueError(
+                f"unknown profile format {fmt}, expected one of {self.FORMATS}"
+            )
+        if keep < 1:
+            raise ValueError("keep must be at least 1")
+
+        self._out_dir = Path(out_dir)
+        self._out_dir.mkdir(parents=True, exist_ok=True)
+        self._iterations = iterations
+        self._fmt = fmt
+        self._tracemalloc = tracemalloc_snapshots
+        self._keep = keep
+        self._sample_interval = sample_interval
+        # continue numbering after the profiles of earlier runs, so they rotate out with the new ones
+        self._written = sorted(
+            {int(fp.name[6:12]) for fp in self._out_dir.glob("cycle_[0-9]*.*")}
+        )
+        self._offset = self._written[-1] if self._written else 0
+        self._lock = threading.Lock()
+
+    @property
+    def done(self) -> bool:
+        return self._cycles >= self._iterations
+
+    def cycle(self):
+        """
+        Profiles the enclosed block as one cycle, or does nothing once all iterations have been profiled.
+
+        Returns:
+            a context manager profiling the block
+        """
+        with self._lock:
+            if self.done:
+                return _NULL_CYCLE
+            self._cycles += 1
+            n = self._offset + self._cycles
+        return self.__profile(n)
+
+    @contextmanager
+    def __profile(self, n: int):
+        if self._tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+        if self._fmt == "pstats":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            profiler = SamplingProfiler(interval=self._sample_interval)
+            profiler.start()
+
+        try:
+            yield
+        finally:
+            if self._fmt == "pstats":
+                profiler.disable()
+            else:
+                profiler.stop()
+
+            try:
+                self.__write(n, profiler)
+            except OSError as e:
+                logger.error(f"failed to write profile of cycle {n}: {e}")
+
+            if self.done:
+                if self._tracemalloc:
+                    tracemalloc.stop()
+                logger.info(
+                    f"profiled {self._cycles} cycles, profiles are in {self._out_dir}"
+                )
+
+    def __write(self, n: int, profiler):
+        stem = self._out_dir / f"cycle_{n:06d}"
+        if self._fmt == "pstats":
+            profiler.dump_stats(f"{stem}.pstats")
+        else:
+            Path(f"{stem}.collapsed").write_text(profiler.collapsed())
+
+        if self._tracemalloc:
+            tracemalloc.take_snapshot().dump(f"{stem}.tracemalloc")
+
+        logger.debug(f"wrote profile of cycle {n} to {stem}.*")
+        with self._lock:
+            self._written.append(n)
+            expired, self._written = (
+                self._written[: -self._keep],
+                self._written[-self._keep :],
+            )
+        for old in expired:
+            for fp in self._out_dir.glob(f"cycle_{old:06d}.*"):
+                fp.unlink(missing_ok=True)
+
+
+def profile_cycle(profiler: Optional[CycleProfiler]):
+    """
+    Returns:
+        a context manager profiling the enclosed cycle with the given profiler, or a no-op if it is None
+    """
+    if profiler is None:
+        return _NULL_CYCLE
+    return profiler.cycle()
@@ -0,0 +1,70 @@
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Optional
+
+
+class SamplingProfiler:
+    """
+    Low overhead profiler that samples the stack of one thread at a fixed interval and aggregates the samples as
+    collapsed stacks ("outer;inner;leaf count" lines), the input format of flamegraph.pl and speedscope.
+    """
+
+    _interval: float
+    _thread_id: Optional[int] = None
+    _stacks: Counter
+    _stop: threading.Event
+    _sampler: Optional[threading.Thread] = None
+
+    def __init__(self, interval: float = 0.005):
+        """
+        Args:
+            interval (float, optional): seconds between samples. Defaults to 0.005.
+        """
+        self._interval = interval
+        self._stacks = Counter()
+        self._stop = threading.Event()
+
+    def start(self, thread_id: Optional[int] = None) -> None:
+        """
+        Starts sampling.
+
+        Args:
+            thread_id (int, optional): ident of the thread to sample. Defaults to the calling thread.
+        """
+        self._thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self._stacks.clear()
+        self._stop.clear()
+        self._sampler = threading.Thread(
+            target=self.__sample, name="sampling-profiler", daemon=True
+        )
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+            self._sampler = None
+
+    def __sample(self):
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})"
+                )
+                frame = frame.f_back
+            self._stacks[";".join(reversed(stack))] += 1
+
+    def collapsed(self) -> str:
+        """
+        Returns:
+            str: the samples as collapsed stacks, one "stack count" line per unique stack
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.items())
@@ -0,0 +1,3 @@
+from .registry import Registry, lazy_attributes
+
+__all__ = ["Registry", "lazy_attributes"]
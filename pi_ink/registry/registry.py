@@ -0,0 +1,163 @@
+import importlib
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Union
+
+logger = logging.getLogger(__name__)
+
+
+def _load(spec: str) -> Any:
+    module_name, _, attr = spec.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class Registry:
+    """
+    Maps plugin names to "module:attribute" specs, importing a plugin's module only the first time it is used. Keeps
+    heavy and optional dependencies (inky, tkinter, RPi.GPIO, spotipy) out of startup, and a missing optional
+    dependency only breaks the plugins that need it.
+
+    Besides the built-in plugins, other packages can add plugins through entry points in the registry's group, e.g.
+    in their pyproject.toml:
+
+        [project.entry-points."pi_ink.displays"]
+        my_panel = "my_package.my_panel:MyPanelDisplay"
+
+    Entry points are only scanned when a name isn't built-in, or when all names are listed.
+    """
+
+    _group: str
+    _specs: Dict[str, Union[str, Any]]
+    _loaded: Dict[str, Any]
+    _discovered: bool = False
+    _lock: threading.Lock
+
+    def __init__(self, group: str, builtins: Dict[str, str] = None):
+        """
+        Args:
+            group (str): entry point group, e.g. "pi_ink.displays"
+            builtins (Dict[str, str], optional): built-in plugins, name -> "module:attribute". Defaults to None.
+        """
+        self._group = group
+        self._specs = {}
+        self._loaded = {}
+        self._lock = threading.Lock()
+        for name, spec in (builtins or {}).items():
+            self.register(name, spec)
+
+    def register(self, name: str, target: Union[str, Callable]) -> None:
+        """
+        Registers a plugin, replacing any plugin of the same name.
+
+        Args:
+            name (str): plugin name, case insensitive
+            target (Union[str, Callable]): "module:attribute" spec to import on first use, or the plugin itself
+        """
+        with self._lock:
+            self._specs[name.lower()] = target
+            self._loaded.pop(name.lower(), None)
+
+    def __discover(self):
+        # imported here, importlib.metadata is slow to import and only needed for non built-in plugins
+        from importlib.metadata import entry_points
+
+        eps = entry_points()
+        if hasattr(eps, "select"):
+            eps = eps.select(group=self._group)
+        else:  # python < 3.10
+            eps = eps.get(self._group, [])
+
+        with self._lock:
+            for ep in eps:
+                # built-in & explicitly registered plugins win over installed ones
+                self._specs.setdefault(ep.name.lower(), ep.value)
+            self._discovered = True
+
+    def names(self) -> List[str]:
+        """
+        Returns:
+            List[str]: names of all built-in, registered & installed plugins
+        """
+        if not self._discovered:
+            self.__discover()
+        return sorted(self._specs)
+
+    def get(self, name: str) -> Any:
+        """
+        Returns the plugin, importing its module if it hasn't been used yet.
+
+        Args:
+            name (str): plugin name, case insensitive
+
+        Raises:
+            ValueError: if there is no plugin of that name
+            ImportError: if the plugin, or a dependency of it, can't be imported
+
+        Returns:
+            Any: the plugin, usually a class
+        """
+        key = name.lower()
+        plugin = self._loaded.get(key)
+        if plugin is not None:
+            return plugin
+
+        if key not in self._specs and not self._discovered:
+            self.__discover()
+        target = self._specs.get(key)
+        if target is None:
+            raise ValueError(
+                f"invalid {self._group} name: {key}, expected one of {self.names()}"
+            )
+
+        if isinstance(target, str):
+            logger.debug(f"loading {self._group} plugin {key} from {target}")
+            try:
+                plugin = _load(target)
+            except ImportError as e:
+                raise ImportError(
+                    f"can't load {self._group} plugin {key} ({target}): {e}"
+                ) from e
+        else:
+            plugin = target
+
+        with self._lock:
+            self._loaded[key] = plugin
+        return plugin
+
+    def create(self, name: str, **kwargs) -> Any:
+        """
+        Loads the plugin and calls it with the keyword arguments.
+
+        Args:
+            name (str): plugin name, case insensitive
+            **kwargs: keyword arguments to pass to the plugin
+
+        Returns:
+            Any: the plugin instance
+        """
+        return self.get(name)(**kwargs)
+
+
+def lazy_attributes(package: str, attributes: Dict[str, str]) -> Callable[[str], Any]:
+    """
+    Builds a module __getattr__ (PEP 562) that imports the submodule defining an attribute the first time the
+    attribute is accessed, so `from package import Name` keeps working without the package importing every submodule.
+
+    Args:
+        package (str): name of the package, i.e. __name__
+        attributes (Dict[str, str]): attribute name -> relative module name, e.g. ".image_renderer"
+
+    Returns:
+        Callable[[str], Any]: the module __getattr__
+    """
+
+    def __getattr__(name: str) -> Any:
+        module_name = attributes.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(module_name, package), name)
+        # cache on the package, so the next access doesn't go through __getattr__
+        setattr(importlib.import_module(package), name, value)
+        return value
+
+    return __getattr__
@@ -1,4 +1,41 @@
-from .image_renderer import ImageRenderer
+from pi_ink.registry import Registry, lazy_attributes
+
 from .irenderer import IRenderer
 
-__all__ = ["IRenderer", "ImageRenderer"]
+__getattr__ = lazy_attributes(
+    __name__,
+    {
+        "FrameBuffer": ".frame_buffer",
+        "ImageRenderer": ".image_renderer",
+        "MosaicGrid": ".layout",
+        "MosaicRenderer": ".mosaic_renderer",
+        "ProcessRenderer": ".process_renderer",
+        "TrackLayout": ".layout",
+        "TrackLayoutSpec": ".layout",
+        "solve_mosaic_grid": ".layout",
+        "solve_track_layout": ".layout",
+    },
+)
+
+renderer_registry = Registry(
+    "pi_ink.renderers",
+    builtins={
+        "image": "pi_ink.renderers.image_renderer:ImageRenderer",
+        "mosaic": "pi_ink.renderers.mosaic_renderer:MosaicRenderer",
+        "process": "pi_ink.renderers.process_renderer:ProcessRenderer",
+    },
+)
+
+__all__ = [
+    "FrameBuffer",
+    "IRenderer",
+    "ImageRenderer",
+    "MosaicGrid",
+    "MosaicRenderer",
+    "ProcessRenderer",
+    "TrackLayout",
+    "TrackLayoutSpec",
+    "renderer_registry",
+    "solve_mosaic_grid",
+    "solve_track_layout",
+]
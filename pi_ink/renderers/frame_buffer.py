@@ -0,0 +1,203 @@
+import sys
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+Box = Tuple[int, int, int, int]  # left, top, right, bottom
+
+_BAND_PIXELS = 65536  # pixels of a layer copied out of PIL at once, bounds the copies of large layers
+_BLEND_PIXELS = 8192  # pixels blended at once, bounds the temporaries of the blend
+
+
+def _alpha_composite_tables() -> Tuple[np.ndarray, np.ndarray]:
+    # PIL's fixed point alpha composite (libImaging/AlphaComposite.c) only depends on the two alphas for the colour
+    # coefficient and the alpha of the result, both are looked up by (layer alpha << 8) | frame alpha
+    src_a = np.arange(256, dtype=np.uint32)[:, None]
+    dst_a = np.arange(256, dtype=np.uint32)[None, :]
+    out_a255 = src_a * 255 + dst_a * (255 - src_a)
+    coef = src_a * (255 * 255 << 7) // np.maximum(out_a255, 1)
+    out_a = out_a255 + 0x80
+    out_a = ((out_a >> 8) + out_a) >> 8
+    return coef.ravel(), (out_a << 24).ravel()
+
+
+_COEF, _ALPHA = _alpha_composite_tables()
+
+
+def _blend(frame: np.ndarray, layer: np.ndarray) -> None:
+    """
+    Alpha composites a layer over the frame in place, exactly like Image.alpha_composite().
+
+    Args:
+        frame (np.ndarray): (height, width, 4) RGBA pixels written to, e.g. a region of a larger frame
+        layer (np.ndarray): (height, width, 4) RGBA pixels of the layer
+    """
+    rows = max(1, _BLEND_PIXELS // layer.shape[1])
+    for y in range(0, layer.shape[0], rows):
+        # whole pixels as little-endian integers, far faster than strided channel views
+        src = layer[y : y + rows].view("<u4")[..., 0]
+        dst = frame[y : y + rows].view("<u4")[..., 0]
+        lookup = ((src >> 24) << 8) | (dst >> 24)
+        coef = _COEF.take(lookup)
+        inv_coef = (255 << 7) - coef
+        out = _ALPHA.take(lookup)
+        # a transparent layer pixel has coef 0, which gives the frame pixel back unchanged
+        for shift in (0, 8, 16):
+            c = (src >> shift) & 0xFF
+            c *= coef
+            d = (dst >> shift) & 0xFF
+            d *= inv_coef
+            c += d
+            c += 0x80 << 7
+            c += c >> 8
+            c >>= 15
+            c <<= shift
+            out |= c
+        dst[...] = out
+
+
+class FrameBuffer:
+    """
+    RGBA frame kept as one contiguous (height, width, 4) array that layers are pasted and alpha composited onto in
+    place.
+
+    Only the part of a layer overlapping the frame is touched, layers may lie partly outside of the frame, e.g. a
+    background pasted at a negative offset to center it. Layers are alpha composited over the bounding box of their
+    visible pixels only, blended straight into the frame with PIL's fixed point arithmetic, so frames are identical
+    to those composited with Image.alpha_composite.
+    """
+
+    _pixels: np.ndarray
+
+    def __init__(
+        self,
+        size: Tuple[int, int],
+        color: Tuple[int, int, int, int] = (0, 0, 0, 0),
+    ):
+        """
+        Args:
+            size (Tuple[int, int]): width and height of the frame
+            color (Tuple[int, int, int, int], optional): RGBA color to fill the frame with. Defaults to transparent.
+        """
+        self._pixels = np.empty((size[1], size[0], 4), dtype=np.uint8)
+        self.fill(color)
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return self._pixels.shape[1], self._pixels.shape[0]
+
+    @property
+    def pixels(self) -> np.ndarray:
+        """
+        The frame pixels, writes to the array change the frame.
+        """
+        return self._pixels
+
+    def __clip(
+        self, position: Tuple[int, int], size: Tuple[int, int], clip: Box = None
+    ) -> Optional[Box]:
+        # box of the frame the layer overlaps, within clip if given, None if it doesn't
+        x, y = position
+        w, h = size
+        cx0, cy0, cx1, cy1 = (0, 0) + self.size if clip is None else clip
+        fw, fh = self.size
+        box = (
+            max(x, cx0, 0),
+            max(y, cy0, 0),
+            min(x + w, cx1, fw),
+            min(y + h, cy1, fh),
+        )
+        if box[0] >= box[2] or box[1] >= box[3]:
+            return None
+        return box
+
+    def __bands(
+        self, image: Image.Image, position: Tuple[int, int], box: Box
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        # the region of the frame within box and the RGBA pixels of the image over it, a band of rows at a time
+        x, y = position
+        x0, y0, x1, y1 = box
+        rows = max(1, _BAND_PIXELS // (x1 - x0))
+        for top in range(y0, y1, rows):
+            bottom = min(top + rows, y1)
+            part = image
+            if (x1 - x0, bottom - top) != image.size:
+                # crop first, only the visible part is converted
+                part = image.crop((x0 - x, top - y, x1 - x, bottom - y))
+            if part.mode != "RGBA":
+                part = part.convert("RGBA")
+            yield self._pixels[top:bottom, x0:x1], np.asarray(part)
+
+    def fill(self, color: Tuple[int, int, int, int], clip: Box = None) -> None:
+        """
+        Fills the frame with a color.
+
+        Args:
+            color (Tuple[int, int, int, int]): RGBA color
+            clip (Box, optional): only fill this box of the frame. Defaults to None, the whole frame.
+        """
+        box = self.__clip((0, 0), self.size, clip)
+        if box is None:
+            return
+        x0, y0, x1, y1 = box
+        # fill whole pixels at once, much faster than broadcasting the color per channel
+        self._pixels[y0:y1, x0:x1].view(np.uint32).fill(
+            int.from_bytes(bytes(color), sys.byteorder)
+        )
+
+    def paste(
+        self, image: Image.Image, position: Tuple[int, int] = (0, 0), clip: Box = None
+    ) -> None:
+        """
+        Replaces the pixels under the image with the image converted to RGBA, like Image.paste() without a mask.
+
+        Args:
+            image (Image.Image): image to paste
+            position (Tuple[int, int], optional): top left corner of the image on the frame. Defaults to (0, 0).
+            clip (Box, optional): only draw within this box of the frame. Defaults to None, the whole frame.
+        """
+        box = self.__clip(position, image.size, clip)
+        if box is None:
+            return
+        for target, pixels in self.__bands(image, position, box):
+            target[...] = pixels
+
+    def alpha_composite(
+        self, image: Image.Image, position: Tuple[int, int] = (0, 0), clip: Box = None
+    ) -> None:
+        """
+        Alpha composites the image over the frame, like Image.alpha_composite() of the covered part of the frame.
+
+        Args:
+            image (Image.Image): image to composite
+            position (Tuple[int, int], optional): top left corner of the image on the frame. Defaults to (0, 0).
+            clip (Box, optional): only draw within this box of the frame. Defaults to None, the whole frame.
+        """
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+
+        # fully transparent pixels leave the frame as is, only the bounding box of the others is composited
+        bbox = image.getbbox(alpha_only=True)
+        if bbox is None:
+            return
+        x, y = position
+        box = self.__clip(
+            (x + bbox[0], y + bbox[1]), (bbox[2] - bbox[0], bbox[3] - bbox[1]), clip
+        )
+        if box is None:
+            return
+        for target, pixels in self.__bands(image, position, box):
+            _blend(target, pixels)
+
+    def to_image(self) -> Image.Image:
+        """
+        Copies the frame into a new RGBA image.
+
+        Returns:
+            Image.Image: the frame
+        """
+        # the image shares the frame's memory until copied, the one copy of the frame
+        return Image.frombuffer(
+            "RGBA", self.size, self._pixels, "raw", "RGBA", 0, 1
+        ).copy()
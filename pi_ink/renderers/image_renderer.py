@@ -1,26 +1,145 @@
 import logging
 import os
-import tempfile
-from typing import Any
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from typing import (TYPE_CHECKING, Any, Callable, Hashable, List, Optional,
+                    Sequence, Tuple)
 
-import requests
 from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
 
+from pi_ink.art import CoverThemeCache, HttpArtSource, IArtSource
+from pi_ink.art.cover_theme import contrast_ratio
+from pi_ink.displays.packed_frame import Palette
+from pi_ink.metrics import Metrics
 from pi_ink.spotify import Spotify
 from pi_ink.spotify.models import Track
 
+from .frame_buffer import FrameBuffer
 from .irenderer import IRenderer
+from .layout import TrackLayout, solve_track_layout
+from .scene import Scene, SceneNode, Sprite
+
+if TYPE_CHECKING:
+    from .mosaic_renderer import MosaicRenderer
 
 logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+_WHITE = (255, 255, 255, 255)
+_BG_DARKEN = 0.7  # the blurred cover is darkened to keep the text readable
+_MIN_TITLE_CONTRAST = 3.0  # WCAG contrast of large text, below it the title stays white
+
+
+@dataclass(frozen=True)
+class _TextLayer:
+    text: str
+    font_size: int
+    x: int
+    y: int
+    color: Tuple[int, int, int, int] = _WHITE
+
+
+@lru_cache(maxsize=256)
+def _fit_font_size(font_path: str, text: str, max_width: int, font_size: int) -> int:
+    """
+    Largest font size up to font_size the text fits into max_width with, cached as titles repeat every poll.
+    """
+    font = ImageFont.truetype(font_path, font_size)
+    while font_size > 1 and font.getlength(text) > max_width:
+        # title is too long, scale down font size
+        font_size -= 1
+        font = ImageFont.truetype(font_path, font_size)
+    return font_size
+
+
+def default_layer_workers() -> int:
+    """
+    Number of threads frames are rendered with by default, one per core up to the number of layers worth splitting.
+    """
+    return min(4, os.cpu_count() or 1)
 
 
 class ImageRenderer(IRenderer):
+    """
+    Renders a track frame as a scene of independent layers: the background, the drop shadow, the album cover art, the
+    heart of loved tracks and the artist, album and title text. The layers are rendered concurrently, PIL releases the
+    GIL in the heavy operations (blur, resize, alpha composite), and composited in a fixed z-order so the frame is the
+    same as if they were drawn one after another.
+
+    The scene of the last frame is retained, a layer is only rendered again when what it's rendered from changed, and
+    only the regions of the frame the changed layers cover are composited again. E.g. when the next track is on the
+    same album only the text is redrawn.
+
+    The frame is laid out for the resolution of the panel it's shown on, the layout is solved once and the album
+    cover art is requested from the art source at the sizes the layout draws it at.
+
+    The title is drawn in the accent colour of the cover, snapped to the palette of the panel so it's shown without
+    dithering, if it's readable on the background. The theme of a cover is cached per album.
+    """
+
     _font_path: str
     _heart_outline_white_512px: Image
     _heart_solid_white_512px: Image
     _drop_shadow_300px: Image
-
-    def __init__(self):
+    _drop_shadow_sprites: Tuple[Sprite, ...]
+    _art_source: IArtSource
+    _layout: TrackLayout
+    _themes: Optional[CoverThemeCache] = None
+    _layer_pool: Optional[ThreadPoolExecutor] = None
+    _heart_layer: Optional[Sprite] = None
+    _scene: Scene
+    _scene_lock: threading.Lock
+    # picture frames are composited in the same buffer every time
+    _picture_frame: Optional[FrameBuffer] = None
+    _picture_lock: threading.Lock
+    _mosaic_after: float
+    _mosaic_tracks: int
+    _mosaic: Optional["MosaicRenderer"] = None
+
+    def __init__(
+        self,
+        art_source: IArtSource = None,
+        layer_workers: int = None,
+        resolution: Tuple[int, int] = (600, 448),
+        mosaic_after: float = 15 * 60,
+        mosaic_tracks: int = 50,
+        palette: Sequence[Tuple[int, int, int]] = None,
+        theme_colors: bool = True,
+    ):
+        """
+        Args:
+            art_source (IArtSource, optional): where album cover art is loaded from. Defaults to HttpArtSource.
+            layer_workers (int, optional):
+                threads layers are rendered with, 1 renders them one after another on the calling thread. Defaults
+                to default_layer_workers().
+            resolution (Tuple[int, int], optional):
+                width and height of the frames, of the display they're shown on. Defaults to (600, 448).
+            mosaic_after (float, optional): seconds without plays after which render_frame() renders a mosaic of
+                the last played albums instead of the last played track. Defaults to 15 minutes.
+            mosaic_tracks (int, optional): last played tracks the mosaic is of. Defaults to 50.
+            palette (Sequence[Tuple[int, int, int]], optional): colours of the panel, the accent colours are snapped
+                to them. Defaults to the Inky Impression's.
+            theme_colors (bool, optional): whether to draw the title in the accent colour of the cover, white
+                otherwise. Defaults to True.
+        """
+        self._art_source = art_source if art_source is not None else HttpArtSource()
+        self._layout = solve_track_layout(tuple(resolution))
+        self._mosaic_after = mosaic_after
+        self._mosaic_tracks = mosaic_tracks
+        if theme_colors:
+            if palette is None:
+                palette = Palette.inky_impression().colors
+            self._themes = CoverThemeCache(self._art_source, palette)
+        if layer_workers is None:
+            layer_workers = default_layer_workers()
+        if layer_workers > 1:
+            # the calling thread renders a layer too
+            self._layer_pool = ThreadPoolExecutor(
+                max_workers=layer_workers - 1, thread_name_prefix="pi-ink-layer"
+            )
         self._font_path = os.path.abspath(
             os.path.join(
                 os.path.dirname(__file__),
@@ -58,76 +177,141 @@ class ImageRenderer(IRenderer):
             self._heart_solid_white_512px
         ).convert("RGBA")
 
-    def __draw_bg_and_album_cover_art(self, track: Track, frame_img: Image) -> None:
+        # drop shadow split into its left, right and bottom edge and the middle, the album cover is pasted over the
+        # middle so only the edges are composited
+        layout = self._layout
+        dx, dy, dr, db = layout.drop_shadow
+        drop_shadow = self._drop_shadow_300px
+        if drop_shadow.size != (dr - dx, db - dy):
+            drop_shadow = drop_shadow.resize((dr - dx, db - dy), Image.LANCZOS)
+        left, cover_size = layout.drop_shadow_left, layout.cover_size
+        self._drop_shadow_sprites = tuple(
+            Sprite(drop_shadow.crop(box), (dx + box[0], dy + box[1]))
+            for box in [
+                (0, 0, left, db - dy),
+                (left + cover_size, 0, dr - dx, db - dy),
+                (left, cover_size, left + cover_size, db - dy),
+                (left, 0, left + cover_size, cover_size),
+            ]
+        )
+
+        self._scene = Scene(layout.size, (255, 255, 255, 255))
+        self._scene_lock = threading.Lock()
+        self._picture_lock = threading.Lock()
+
+    def __render_layers(self, jobs: List[Callable[[], Any]]) -> List[Any]:
         """
-        Draws the background and album cover art onto the frame image.
+        Renders layers on the layer pool, the first job runs on the calling thread.
 
         Args:
-            track (Track): track to draw bg and album cover art for.
-            frame_img (Image): frame image to draw bg and album cover art onto.
+            jobs (List[Callable[[], Any]]): functions rendering one layer each
+
+        Returns:
+            List[Any]: the rendered layers, in the order of the jobs
         """
-        with tempfile.TemporaryDirectory() as temp_dir:
-            # download 300px and 640px album art
-            album_cover_300px_fp = os.path.join(temp_dir, "album_cover_300px.jpg")
-            album_cover_640px_fp = os.path.join(temp_dir, "album_cover_640px.jpg")
+        if self._layer_pool is None or len(jobs) < 2:
+            return [job() for job in jobs]
 
-            logger.info(
-                f"downloading album cover 300px from {track.album_cover_url_300px}"
-            )
-            resp = requests.get(track.album_cover_url_300px, allow_redirects=True)
-            with open(album_cover_300px_fp, "wb") as f:
-                f.write(resp.content)
-            logger.info(f"saved album cover 300px to {album_cover_300px_fp}")
+        futures = [self._layer_pool.submit(job) for job in jobs[1:]]
+        first = jobs[0]()
+        return [first] + [future.result() for future in futures]
 
-            logger.info(
-                f"downloading album cover 640px from {track.album_cover_url_640px}"
-            )
-            resp = requests.get(track.album_cover_url_640px, allow_redirects=True)
-            with open(album_cover_640px_fp, "wb") as f:
-                f.write(resp.content)
-            logger.info(f"saved album cover 640px to {album_cover_640px_fp}")
+    def __render_bg(self, track: Track) -> Tuple[Sprite, ...]:
+        """
+        Renders the background, the blurred and darkened 640px album cover art covering the frame.
 
-            # open album cover images
-            album_cover_300px_img = Image.open(album_cover_300px_fp)
-            album_cover_640px_img = Image.open(album_cover_640px_fp)
+        Args:
+            track (Track): track to render the bg for.
 
-            # background album cover 640px, offsets to center:
-            #   x: (600 - 640) / 2 = -20
-            #   y: (448 - 640) / 2 = -96
+        Returns:
+            Tuple[Sprite, ...]: the bg, centered on the frame
+        """
+        with metrics.span("renderer.bg"):
+            with metrics.span("renderer.art_fetch"):
+                album_cover_640px_img = self._art_source.get_cover(
+                    track.album_cover_url_640px,
+                    (self._layout.bg_size, self._layout.bg_size),
+                )
 
-            # gaussian blur background album cover 640px
-            bg = album_cover_640px_img.filter(ImageFilter.GaussianBlur(radius=2.5))
+            with metrics.span("renderer.blur"):
+                # gaussian blur background album cover 640px
+                bg = album_cover_640px_img.filter(
+                    ImageFilter.GaussianBlur(radius=self._layout.bg_blur_radius)
+                )
 
-            # darken background
-            bg = bg.point(lambda p: p * 0.7)
+                # darken background
+                bg = bg.point(lambda p: p * _BG_DARKEN)
 
-            # draw bg centered on frame_img
-            frame_img.paste(bg, (-20, -96))
+        # centered on the frame, e.g. at (-20, -96) on a 600x448 frame
+        return (Sprite(bg, self._layout.bg[:2], paste=True),)
 
-            # paste drop shadow
-            # 7 px comes from the drop shadow image width being 14px larger
+    def __cover_url(self, track: Track) -> str:
+        # the smallest art at least as large as it's drawn
+        if self._layout.cover_size <= 300:
+            return track.album_cover_url_300px
+        return track.album_cover_url_640px
 
-            # get portion of background covered by drop shadow
-            bg_drop_shadow = bg.crop(
-                (20 + 150 - 7, 96 + 25, 20 + 150 - 7 + 300 + 14, 96 + 25 + 311)
-            )
+    def __render_album_cover_art(self, track: Track) -> Tuple[Sprite, ...]:
+        """
+        Renders the album cover art, centered on the frame horizontally, 300px and 25px from the top on a 600x448
+        frame.
 
-            # make sure bg_drop_shadow is RGBA
-            bg_drop_shadow = bg_drop_shadow.convert("RGBA")
+        Args:
+            track (Track): track to render the album cover art for.
 
-            # alpha composite drop shadow onto bg portion it covers
-            shadow = Image.alpha_composite(bg_drop_shadow, self._drop_shadow_300px)
+        Returns:
+            Tuple[Sprite, ...]: the album cover art
+        """
+        with metrics.span("renderer.art_fetch"):
+            cover_size = self._layout.cover_size
+            album_cover_img = self._art_source.get_cover(
+                self.__cover_url(track), (cover_size, cover_size)
+            )
+        return (Sprite(album_cover_img, self._layout.cover[:2], paste=True),)
 
-            # finally paste the shadow with the bg information preserved
-            frame_img.paste(shadow, (150 - 7, 25))
+    def __title_color(self, track: Track) -> Tuple[int, int, int, int]:
+        """
+        Colour of the title: the accent colour of the cover if it contrasts enough with the darkened background,
+        white otherwise.
+        """
+        if self._themes is None:
+            return _WHITE
+        cover_size = self._layout.cover_size
+        try:
+            with metrics.span("renderer.theme"):
+                theme = self._themes.get_theme(
+                    self.__cover_url(track), (cover_size, cover_size)
+                )
+        except Exception as e:
+            # the cover layer fails on its own if the art can't be loaded
+            logger.warning(f"failed to get the theme of {track.album}: {e}")
+            return _WHITE
+        if theme.accent is None:
+            return _WHITE
+        bg = tuple(int(c * _BG_DARKEN) for c in theme.mean)
+        if contrast_ratio(theme.accent, bg) < _MIN_TITLE_CONTRAST:
+            return _WHITE
+        return (*theme.accent, 255)
+
+    def __layout_info(
+        self,
+        track: Track,
+        left_margin: int,
+        text_anchor_y: int,
+        title_color: Tuple[int, int, int, int] = _WHITE,
+    ) -> List[_TextLayer]:
+        """
+        Sizes and positions the info text of a track.
 
-            # draw album cover 300px centered on frame_img horizontally and 25 px from the top
-            frame_img.paste(album_cover_300px_img, (150, 25))
+        Args:
+            track (Track): track to lay out the info of
+            left_margin (int): x of the text
+            text_anchor_y (int): y of the title, artist and album go below it
+            title_color (Tuple[int, int, int, int], optional): colour of the title. Defaults to white.
 
-    def __draw_info(
-        self, track: Track, frame_img: Image, left_margin: int, text_anchor_y: int
-    ) -> None:
-        target_font_size = 25
+        Returns:
+            List[_TextLayer]: the text layers in z-order, bottom first
+        """
 
         def trunc_str(s: str, max_len: int = 40, trunc_chars: str = "...") -> str:
             # helper function to truncate strings
@@ -140,45 +324,69 @@ class ImageRenderer(IRenderer):
         album = trunc_str(track.album, max_len=50)
         artist = trunc_str(track.artist, max_len=50)
 
-        def __get_title_font(font_size: int):
-            # helper function to get the size of the title font whilst allowing for down scaling
-            parent_font = ImageFont.truetype(self._font_path, font_size)
-
-            # get width of text
-            title_width = parent_font.getlength(title)
-
-            if title_width > 600 - (left_margin * 2):
-                # title is too long, scale down font size
-                return __get_title_font(font_size - 1)
-
-            return parent_font, font_size, title_width
-
-        title_font, used_font_size, title_width = __get_title_font(target_font_size)
-        subtitle_font = ImageFont.truetype(self._font_path, int(used_font_size * 0.75))
+        layout = self._layout
+        used_font_size = _fit_font_size(
+            self._font_path, title, layout.text_max_width, layout.title_font_size
+        )
+        subtitle_font_size = int(used_font_size * layout.subtitle_font_scale)
         logger.debug(
             "font and text sizes",
             extra={
                 "title_font_size": used_font_size,
                 "title chars": len(title),
-                "subtitle_font_size": subtitle_font.size,
+                "subtitle_font_size": subtitle_font_size,
                 "album chars": len(album),
                 "artist chars": len(artist),
             },
         )
 
-        # start drawing info
-        draw = ImageDraw.Draw(frame_img)
+        # artist and album are drawn before the title, their shadows are overlapped by the ones above them
+        return [
+            _TextLayer(
+                artist,
+                subtitle_font_size,
+                left_margin,
+                text_anchor_y
+                + used_font_size
+                + layout.line_gap
+                + subtitle_font_size
+                + layout.line_gap,
+            ),
+            _TextLayer(
+                album,
+                subtitle_font_size,
+                left_margin,
+                text_anchor_y + used_font_size + layout.line_gap,
+            ),
+            _TextLayer(title, used_font_size, left_margin, text_anchor_y, title_color),
+        ]
+
+    def __render_text_layer(self, layer: _TextLayer) -> Sprite:
+        """
+        Renders text in its colour with a blurred shadow, as strong and blurred as the layout says.
+
+        Args:
+            layer (_TextLayer): text to render
+
+        Returns:
+            Sprite: the text and its shadow, to composite onto the frame
+        """
+        with metrics.span("renderer.text"):
+            # every layer loads its own font, freetype fonts can't be shared between threads
+            ts_font = ImageFont.truetype(self._font_path, layer.font_size)
+            ts_font_size = layer.font_size
+            text = layer.text
 
-        def __text_with_shadow(
-            text, ts_font, ts_font_size, tx, ty, strength, blur_radius
-        ):
             text_width = ts_font.getlength(text)
-            canvas_margin = 60
+            strength = self._layout.text_shadow_strength
+            blur_radius = self._layout.text_shadow_blur_radius
+            canvas_margin = self._layout.text_shadow_margin
             canvas_half_margin = int(canvas_margin / 2)
             canvas_quarter_margin = int(canvas_margin / 4)
 
             # adjust to draw text where we actually intended at for ty, tx is unaffected
-            ty += canvas_quarter_margin
+            tx = layer.x
+            ty = layer.y + canvas_quarter_margin
 
             # draw text shadow
             txt_shadow_img = Image.new(
@@ -219,177 +427,250 @@ class ImageRenderer(IRenderer):
                 ),
                 text,
                 font=ts_font,
-                fill=(255, 255, 255, 255),
+                fill=layer.color,
             )
 
-            # get portion of frame_img being drawn over
-            frame_img_portion = frame_img.crop(
-                (
-                    tx - canvas_half_margin,
-                    ty - canvas_half_margin,
-                    tx - canvas_half_margin + txt_shadow_img.width,
-                    ty - canvas_half_margin + txt_shadow_img.height,
-                )
-            )
-
-            # make sure frame_img_portion is RGBA
-            frame_img_portion = frame_img_portion.convert("RGBA")
-
-            # alpha composite text shadow onto frame_img_portion
-            txt_shadow_img = Image.alpha_composite(frame_img_portion, txt_shadow_img)
-            frame_img.paste(
-                txt_shadow_img, (tx - canvas_half_margin, ty - canvas_half_margin)
-            )
-
-        # draw info text with text shadow
-        __text_with_shadow(
-            artist,
-            subtitle_font,
-            subtitle_font.size,
-            left_margin,
-            text_anchor_y + used_font_size + 5 + subtitle_font.size + 5,
-            3,
-            6,
+        return Sprite(
+            txt_shadow_img, (tx - canvas_half_margin, ty - canvas_half_margin)
         )
-        __text_with_shadow(
-            album,
-            subtitle_font,
-            subtitle_font.size,
-            left_margin,
-            text_anchor_y + used_font_size + 5,
-            3,
-            6,
+
+    def __text_with_hard_shadow(
+        self, draw: ImageDraw.ImageDraw, hs_text, hs_font, hs_font_size, hs_x, hs_y
+    ):
+        # TODO: UNUSED, left for reference/future use
+        # DEAD CODE
+        # helper function to draw text with a hard shadow
+        draw.text(
+            (hs_x, hs_y + 2.5),
+            hs_text,
+            font=hs_font,
+            fill=(0, 0, 0, 255),
         )
-        __text_with_shadow(
-            title, title_font, used_font_size, left_margin, text_anchor_y, 3, 6
+        draw.text(
+            (hs_x, hs_y),
+            hs_text,
+            font=hs_font,
+            fill=(255, 255, 255, 255),
         )
 
-        def __text_with_hard_shadow(hs_text, hs_font, hs_font_size, hs_x, hs_y):
-            # TODO: UNUSED, left for reference/future use
-            # DEAD CODE
-            # helper function to draw text with a hard shadow
-            draw.text(
-                (hs_x, hs_y + 2.5),
-                hs_text,
-                font=hs_font,
-                fill=(0, 0, 0, 255),
+    def __render_heart_layer(self) -> Sprite:
+        """
+        Renders the spotify green heart shown over the cover art of loved tracks, it is the same for every track so
+        it's only rendered once.
+
+        Returns:
+            Sprite: the heart and its shadow, to composite onto the frame
+        """
+        if self._heart_layer is not None:
+            return self._heart_layer
+
+        layout = self._layout
+        with metrics.span("renderer.is_loved"):
+            # get spotify green copy of heart image
+            heart = self._heart_solid_white_512px.copy()
+
+            # resize heart to 50px on a 600x448 frame
+            heart = heart.resize((layout.heart_size, layout.heart_size))
+
+            # make heart spotify green #1DB954
+            # https://developer.spotify.com/documentation/design#using-our-colors
+            spotify_green_rgb = (30, 215, 96)
+            heart_data = list(
+                map(
+                    lambda p: (
+                        (
+                            spotify_green_rgb[0],
+                            spotify_green_rgb[1],
+                            spotify_green_rgb[2],
+                            p[3],
+                        )
+                        if p[3] > 0
+                        else p
+                    ),
+                    heart.getdata(),
+                )
             )
-            draw.text(
-                (hs_x, hs_y),
-                hs_text,
-                font=hs_font,
-                fill=(255, 255, 255, 255),
+            heart.putdata(heart_data)
+
+            # make black copy
+            heart_shadow_diff = layout.heart_shadow_diff
+            heart_shadow_diff_half = int(heart_shadow_diff / 2)
+            heart_black = heart.copy()
+            heart_black = heart_black.resize(
+                (heart.width + heart_shadow_diff, heart.height + heart_shadow_diff)
             )
+            heart_black_data = list(
+                map(lambda p: (0, 0, 0, p[3]) if p[3] > 0 else p, heart_black.getdata())
+            )
+            heart_black.putdata(heart_black_data)
 
-    def __draw_is_loved(self, track: Track, frame_img: Image) -> None:
-        if not track.is_loved:
-            return
-
-        # get spotify green copy of heart image
-        heart = self._heart_solid_white_512px.copy()
-
-        # resize heart to 50px
-        heart = heart.resize((50, 50))
-
-        # make heart spotify green #1DB954
-        # https://developer.spotify.com/documentation/design#using-our-colors
-        spotify_green_rgb = (30, 215, 96)
-        heart_data = list(
-            map(
-                lambda p: (
-                    spotify_green_rgb[0],
-                    spotify_green_rgb[1],
-                    spotify_green_rgb[2],
-                    p[3],
-                )
-                if p[3] > 0
-                else p,
-                heart.getdata(),
+            # make bigger image for shadow
+            shadow_margin = layout.heart_shadow_margin
+            heart_shadow = Image.new(
+                "RGBA",
+                (heart_black.width + shadow_margin, heart_black.height + shadow_margin),
+                (0, 0, 0, 0),
             )
-        )
-        heart.putdata(heart_data)
-
-        # make black copy
-        heart_shadow_diff = 10
-        heart_shadow_diff_half = int(heart_shadow_diff / 2)
-        heart_black = heart.copy()
-        heart_black = heart_black.resize(
-            (heart.width + heart_shadow_diff, heart.height + heart_shadow_diff)
-        )
-        heart_black_data = list(
-            map(lambda p: (0, 0, 0, p[3]) if p[3] > 0 else p, heart_black.getdata())
-        )
-        heart_black.putdata(heart_black_data)
-
-        # make bigger image for shadow
-        shadow_margin = 40
-        shadow_half_margin = int(shadow_margin / 2)
-        heart_shadow = Image.new(
-            "RGBA",
-            (heart_black.width + shadow_margin, heart_black.height + shadow_margin),
-            (0, 0, 0, 0),
-        )
 
-        # draw black heart onto shadow
-        heart_shadow.paste(
-            heart_black, (int(shadow_margin / 2), int(shadow_margin / 2)), heart_black
-        )
+            # draw black heart onto shadow
+            heart_shadow.paste(
+                heart_black,
+                (int(shadow_margin / 2), int(shadow_margin / 2)),
+                heart_black,
+            )
 
-        # blur shadow
-        heart_shadow = heart_shadow.filter(ImageFilter.GaussianBlur(radius=8))
+            # blur shadow
+            heart_shadow = heart_shadow.filter(
+                ImageFilter.GaussianBlur(radius=layout.heart_shadow_blur_radius)
+            )
 
-        # paste clean heart on top
-        heart_shadow.paste(
-            heart,
-            (
-                int(shadow_margin / 2) + heart_shadow_diff_half,
-                int(shadow_margin / 2) + heart_shadow_diff_half,
-            ),
-            heart,
-        )
+            # paste clean heart on top
+            heart_shadow.paste(
+                heart,
+                (
+                    int(shadow_margin / 2) + heart_shadow_diff_half,
+                    int(shadow_margin / 2) + heart_shadow_diff_half,
+                ),
+                heart,
+            )
+
+        # over the bottom right corner of the cover art
+        self._heart_layer = Sprite(heart_shadow, layout.heart[:2])
+        return self._heart_layer
+
+    def __scene_layers(
+        self, track: Track
+    ) -> List[Tuple[str, Hashable, Callable[[], Tuple[Sprite, ...]]]]:
+        """
+        Describes the layers of a track's frame.
 
-        # target top left corner of heart_shadow to place over cover art
-        dest_x = 150 + 300 - heart_shadow.width - 5 - 4 + shadow_half_margin
-        dest_y = 325 - heart_shadow.height - 5 + shadow_half_margin
+        Args:
+            track (Track): track to render
 
-        # get portion of frame covered by heart_shadow
-        frame_img_portion = frame_img.crop(
-            (dest_x, dest_y, dest_x + heart_shadow.width, dest_y + heart_shadow.height)
+        Returns:
+            List[Tuple[str, Hashable, Callable[[], Tuple[Sprite, ...]]]]:
+                name, fingerprint of what it's rendered from and the function rendering it, for each layer in z-order
+        """
+        artist, album, title = self.__layout_info(
+            track,
+            left_margin=self._layout.text_left,
+            text_anchor_y=self._layout.text_top,
+            title_color=self.__title_color(track),
         )
 
-        # make sure frame_img_portion is RGBA
-        frame_img_portion = frame_img_portion.convert("RGBA")
+        def heart() -> Tuple[Sprite, ...]:
+            return (self.__render_heart_layer(),) if track.is_loved else ()
 
-        # alpha composite heart_shadow onto frame_img_portion
-        heart_shadow = Image.alpha_composite(frame_img_portion, heart_shadow)
+        def text(layer: _TextLayer) -> Tuple[Sprite, ...]:
+            return (self.__render_text_layer(layer),)
 
-        # finally paste the shadow with the bg information preserved
-        frame_img.paste(heart_shadow, (dest_x, dest_y))
+        return [
+            ("bg", track.album_cover_url_640px, partial(self.__render_bg, track)),
+            # the drop shadow is rendered from the assets only
+            ("drop_shadow", None, lambda: self._drop_shadow_sprites),
+            (
+                "album_cover_art",
+                self.__cover_url(track),
+                partial(self.__render_album_cover_art, track),
+            ),
+            ("heart", track.is_loved, heart),
+            ("artist", artist, partial(text, artist)),
+            ("album", album, partial(text, album)),
+            ("title", title, partial(text, title)),
+        ]
 
     def render_frame_from_track(self, track: Track) -> Image:
-        frame_img = Image.new("RGBA", (600, 448), (255, 255, 255, 255))
-        self.__draw_bg_and_album_cover_art(track, frame_img)
-        self.__draw_is_loved(track, frame_img)
-        self.__draw_info(track, frame_img, left_margin=25, text_anchor_y=(25 * 2) + 300)
+        with metrics.span("renderer.render_frame_from_track"):
+            layers = self.__scene_layers(track)
+            with self._scene_lock:
+                # only layers rendered from something else than in the last frame are rendered again
+                stale = []
+                for name, fingerprint, render in layers:
+                    node = self._scene.node(name)
+                    if node is None or node.fingerprint != fingerprint:
+                        stale.append((name, render))
+                rendered = dict(
+                    zip(
+                        [name for name, _ in stale],
+                        self.__render_layers([render for _, render in stale]),
+                    )
+                )
+
+                nodes = [
+                    (
+                        SceneNode(name, fingerprint, rendered[name])
+                        if name in rendered
+                        else self._scene.node(name)
+                    )
+                    for name, fingerprint, _ in layers
+                ]
+                with metrics.span("renderer.composite"):
+                    self._scene.update(nodes)
+                    frame_img = self._scene.frame.to_image()
+        metrics.inc("renderer.frames")
+        metrics.inc("renderer.layers_rendered", len(stale))
         return frame_img
 
     def render_frame(self, spotify: Spotify) -> Any:
         # either get the current playing track or the last played track
         track = spotify.get_currently_playing()
-        if track is None:
-            track = spotify.get_last_played(limit=1)[0]
+        if track is not None:
+            return self.render_frame_from_track(track), track
+
+        track = spotify.get_last_played(limit=1)[0]
+        # played_at of the last played tracks is in UTC
+        idle = datetime.now(timezone.utc).replace(tzinfo=None) - track.played_at
+        if idle.total_seconds() >= self._mosaic_after:
+            # nothing played lately, a mosaic of the albums played before
+            tracks = spotify.get_last_played(
+                limit=self._mosaic_tracks, with_loved=False
+            )
+            return self.render_mosaic(tracks), track
 
-        # TODO photo frame mode of last 50 played tracks if no track has been played in the last 15 minutes
-        # this (photo frame) functionality should be in the driver (cmd/spotify_media_controller_command.py)
         return self.render_frame_from_track(track), track
 
+    def render_mosaic(self, tracks: List[Track]) -> Image:
+        """
+        Renders a mosaic of the album covers of played tracks, shown while nothing has been played for a while.
+
+        Args:
+            tracks (List[Track]): played tracks, most recent first
+
+        Returns:
+            Image: the rendered frame
+        """
+        return self.__mosaic_renderer().render_mosaic(tracks)
+
+    def __mosaic_renderer(self) -> "MosaicRenderer":
+        with self._scene_lock:
+            if self._mosaic is None:
+                from .mosaic_renderer import MosaicRenderer
+
+                self._mosaic = MosaicRenderer(
+                    art_source=self._art_source,
+                    resolution=self._layout.size,
+                    max_tiles=self._mosaic_tracks,
+                )
+            return self._mosaic
+
     def render_picture_frame(self, picture: Image) -> Any:
-        frame: Image = Image.new(
-            "RGBA", (600, 448), (255, 0, 0, 255)
-        )  # TODO CHANGE TO BLACK AFTER TESTING
+        with metrics.span("renderer.render_picture_frame"):
+            frame = self.__render_picture_frame(picture)
+        metrics.inc("renderer.frames")
+        return frame
+
+    def __render_picture_frame(self, picture: Image) -> Image:
+        with self._picture_lock:
+            if self._picture_frame is None:
+                self._picture_frame = FrameBuffer(self._layout.size)
+            # TODO CHANGE TO BLACK AFTER TESTING
+            self._picture_frame.fill((255, 0, 0, 255))
+            return self.__compose_picture_frame(self._picture_frame, picture)
+
+    def __compose_picture_frame(self, frame: FrameBuffer, picture: Image) -> Image:
         pic_cpy: Image = picture.copy()
         pw, ph = picture.size  # picture width, height
-        dw, dh = 600, 448  # display width, height
+        dw, dh = self._layout.size  # display width, height
 
         fill_space_with_bg = False
 
@@ -430,12 +711,12 @@ class ImageRenderer(IRenderer):
             # darken background
             bg = bg.point(lambda p: p * 0.7)
 
-            # draw bg centered on frame_img
+            # draw bg centered on frame
             bw, bh = bg.size
             frame.paste(bg, ((dw - bw) // 2, (dh - bh) // 2))
 
-        # draw picture centered on frame_img
+        # draw picture centered on frame
         pw, ph = pic_cpy.size
         frame.paste(pic_cpy, ((dw - pw) // 2, (dh - ph) // 2))
 
-        return frame
+        return frame.to_image()
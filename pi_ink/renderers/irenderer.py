@@ -1,13 +1,14 @@
 from abc import ABC
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from PIL import Image
+if TYPE_CHECKING:
+    from PIL import Image
 
-from pi_ink.spotify import Spotify
+    from pi_ink.spotify import Spotify
 
 
 class IRenderer(ABC):
-    def render_frame(self, spotify: Spotify) -> Any:
+    def render_frame(self, spotify: "Spotify") -> Any:
         """
         Using spotify data, renders a frame and returns it.
 
@@ -19,7 +20,7 @@ class IRenderer(ABC):
         """
         raise NotImplementedError("render_frame() not implemented")
 
-    def render_picture_frame(self, picture: Image) -> Any:
+    def render_picture_frame(self, picture: "Image") -> Any:
         """
         Renders a frame from a picture and returns it.
 
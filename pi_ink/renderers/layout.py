@@ -0,0 +1,214 @@
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple
+
+from .frame_buffer import Box
+
+
+@dataclass(frozen=True)
+class TrackLayoutSpec:
+    """
+    Declarative layout of a track frame, in pixels of the 600x448 panel it was designed for. Solving it for a panel
+    scales it to the panel and centers the album cover art horizontally.
+    """
+
+    reference: Tuple[int, int] = (600, 448)
+    bg_size: int = 640  # square, blurred album cover art covering the whole frame
+    bg_blur_radius: float = 2.5
+    cover_size: int = 300
+    cover_top: int = 25
+    drop_shadow_size: Tuple[int, int] = (314, 311)  # of the drop shadow asset
+    drop_shadow_left: int = 7  # the drop shadow starts this much left of the cover
+    heart_size: int = 50
+    heart_shadow_diff: int = 10  # the heart's shadow is this much larger than the heart
+    heart_shadow_margin: int = 40
+    heart_shadow_blur_radius: float = 8
+    heart_inset: Tuple[int, int] = (
+        9,
+        5,
+    )  # of the heart from the bottom right corner of the cover
+    text_margin: int = 25  # left and right of the text
+    text_top: int = 25  # between the cover and the title
+    title_font_size: int = 25
+    subtitle_font_scale: float = 0.75
+    line_gap: int = 5
+    text_shadow_margin: int = 60
+    text_shadow_strength: int = 3
+    text_shadow_blur_radius: float = 6
+
+
+@dataclass(frozen=True)
+class TrackLayout:
+    """
+    A TrackLayoutSpec solved for a panel resolution, absolute boxes and sizes in pixels of the panel.
+    """
+
+    size: Tuple[int, int]
+    scale: float
+    bg: Box
+    bg_blur_radius: float
+    cover: Box
+    drop_shadow: Box
+    drop_shadow_left: int
+    heart: Box  # of the heart with its shadow
+    heart_size: int
+    heart_shadow_diff: int
+    heart_shadow_margin: int
+    heart_shadow_blur_radius: float
+    text_left: int
+    text_top: int  # of the title
+    text_max_width: int
+    title_font_size: int  # before scaling it down to fit long titles
+    subtitle_font_scale: float
+    line_gap: int
+    text_shadow_margin: int
+    text_shadow_strength: int
+    text_shadow_blur_radius: float
+
+    @property
+    def bg_size(self) -> int:
+        return self.bg[2] - self.bg[0]
+
+    @property
+    def cover_size(self) -> int:
+        return self.cover[2] - self.cover[0]
+
+
+@lru_cache(maxsize=8)
+def solve_track_layout(
+    size: Tuple[int, int], spec: TrackLayoutSpec = TrackLayoutSpec()
+) -> TrackLayout:
+    """
+    Solves a track layout for a panel resolution, solved layouts are cached.
+
+    Args:
+        size (Tuple[int, int]): width and height of the panel
+        spec (TrackLayoutSpec, optional): layout to solve. Defaults to the layout of the 600x448 Inky Impression.
+
+    Returns:
+        TrackLayout: absolute boxes and sizes on the panel
+    """
+    w, h = size
+    scale = min(w / spec.reference[0], h / spec.reference[1])
+
+    def px(v: float) -> int:
+        return int(round(v * scale))
+
+    # the bg covers the whole frame and is centered on it
+    bg_size = max(px(spec.bg_size), w, h)
+    bg_x, bg_y = (w - bg_size) // 2, (h - bg_size) // 2
+
+    cover_size = px(spec.cover_size)
+    cover_x, cover_y = (w - cover_size) // 2, px(spec.cover_top)
+    cover = (cover_x, cover_y, cover_x + cover_size, cover_y + cover_size)
+
+    drop_shadow_left = px(spec.drop_shadow_left)
+    drop_shadow = (
+        cover_x - drop_shadow_left,
+        cover_y,
+        cover_x - drop_shadow_left + px(spec.drop_shadow_size[0]),
+        cover_y + px(spec.drop_shadow_size[1]),
+    )
+
+    # the heart sits in the bottom right corner of the cover, its shadow canvas sticks out by half the margin
+    heart_size = px(spec.heart_size)
+    heart_shadow_diff = px(spec.heart_shadow_diff)
+    heart_shadow_margin = px(spec.heart_shadow_margin)
+    heart_canvas = heart_size + heart_shadow_diff + heart_shadow_margin
+    heart_x = (
+        cover[2] - heart_canvas - px(spec.heart_inset[0]) + int(heart_shadow_margin / 2)
+    )
+    heart_y = (
+        cover[3] - heart_canvas - px(spec.heart_inset[1]) + int(heart_shadow_margin / 2)
+    )
+
+    text_left = px(spec.text_margin)
+    return TrackLayout(
+        size=size,
+        scale=scale,
+        bg=(bg_x, bg_y, bg_x + bg_size, bg_y + bg_size),
+        bg_blur_radius=spec.bg_blur_radius * scale,
+        cover=cover,
+        drop_shadow=drop_shadow,
+        drop_shadow_left=drop_shadow_left,
+        heart=(heart_x, heart_y, heart_x + heart_canvas, heart_y + heart_canvas),
+        heart_size=heart_size,
+        heart_shadow_diff=heart_shadow_diff,
+        heart_shadow_margin=heart_shadow_margin,
+        heart_shadow_blur_radius=spec.heart_shadow_blur_radius * scale,
+        text_left=text_left,
+        text_top=cover[3] + px(spec.text_top),
+        text_max_width=w - text_left * 2,
+        title_font_size=px(spec.title_font_size),
+        subtitle_font_scale=spec.subtitle_font_scale,
+        line_gap=px(spec.line_gap),
+        text_shadow_margin=px(spec.text_shadow_margin),
+        text_shadow_strength=max(1, px(spec.text_shadow_strength)),
+        text_shadow_blur_radius=spec.text_shadow_blur_radius * scale,
+    )
+
+
+@dataclass(frozen=True)
+class MosaicGrid:
+    """
+    Grid of square album cover tiles, centered on the panel.
+    """
+
+    size: Tuple[int, int]
+    cols: int
+    rows: int
+    tile: int  # width and height of a tile
+    gap: int  # between tiles
+    origin: Tuple[int, int]  # top left corner of the first tile
+
+    @property
+    def cells(self) -> int:
+        return self.cols * self.rows
+
+    def position(self, cell: int) -> Tuple[int, int]:
+        """
+        Top left corner of a cell, cells run left to right, top to bottom.
+        """
+        row, col = divmod(cell, self.cols)
+        return (
+            self.origin[0] + col * (self.tile + self.gap),
+            self.origin[1] + row * (self.tile + self.gap),
+        )
+
+
+@lru_cache(maxsize=64)
+def solve_mosaic_grid(size: Tuple[int, int], tiles: int, gap: int = 2) -> MosaicGrid:
+    """
+    Solves the grid showing a number of tiles as large as they fit on a panel, solved grids are cached.
+
+    Args:
+        size (Tuple[int, int]): width and height of the panel
+        tiles (int): number of tiles to show, at least 1
+        gap (int, optional): pixels between tiles. Defaults to 2.
+
+    Returns:
+        MosaicGrid: the grid with the largest tiles, with the fewest empty cells among those
+    """
+    w, h = size
+    tiles = max(1, tiles)
+    best = None
+    for cols in range(1, tiles + 1):
+        rows = -(-tiles // cols)
+        tile = min((w - (cols - 1) * gap) // cols, (h - (rows - 1) * gap) // rows)
+        key = (tile, -(cols * rows))
+        if tile > 0 and (best is None or key > best[0]):
+            best = (key, cols, rows, tile)
+    if best is None:
+        raise ValueError(f"{tiles} tiles don't fit a {w}x{h} panel")
+
+    _, cols, rows, tile = best
+    grid_w = cols * tile + (cols - 1) * gap
+    grid_h = rows * tile + (rows - 1) * gap
+    return MosaicGrid(
+        size=size,
+        cols=cols,
+        rows=rows,
+        tile=tile,
+        gap=gap,
+        origin=((w - grid_w) // 2, (h - grid_h) // 2),
+    )
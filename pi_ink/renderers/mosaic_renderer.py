@@ -0,0 +1,201 @@
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from pi_ink.art import HttpArtSource, IArtSource
+from pi_ink.metrics import Metrics
+from pi_ink.spotify.models import Track
+
+from .irenderer import IRenderer
+from .layout import MosaicGrid, solve_mosaic_grid
+from .scene import Scene, SceneNode, Sprite
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+# shown in place of a cover that couldn't be loaded, it's loaded again next time
+_PLACEHOLDER_COLOR = (48, 48, 48, 255)
+
+
+def _album_key(track: Track) -> Optional[str]:
+    # the cover art identifies the album, tracks without any aren't shown
+    return track.album_cover_url_300px or track.album_cover_url_640px
+
+
+class MosaicRenderer(IRenderer):
+    """
+    Renders a mosaic of the album covers of the last played tracks, one tile per album, e.g. while nothing has been
+    played for a while.
+
+    Tiles are kept pre-scaled to the grid per album, and missing ones are loaded concurrently from the art source by
+    a bounded pool. Albums keep their cell when new plays arrive: a newly played album takes the cell of the least
+    recently played one that dropped out of the mosaic, so only the cells that changed are composited again. The cells
+    are reassigned from the most recent album on when the grid itself changes.
+    """
+
+    _art_source: IArtSource
+    _resolution: Tuple[int, int]
+    _max_tiles: int
+    _gap: int
+    _fetch_pool: ThreadPoolExecutor
+    _tiles: "OrderedDict[Tuple[str, int], Image.Image]"
+    _tile_cache_size: int
+    _grid: Optional[MosaicGrid] = None
+    _cells: List[Optional[str]]  # album shown in each cell of the grid
+    _scene: Scene
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        art_source: IArtSource = None,
+        resolution: Tuple[int, int] = (600, 448),
+        max_tiles: int = 50,
+        fetch_workers: int = 4,
+        gap: int = 2,
+    ):
+        """
+        Args:
+            art_source (IArtSource, optional): where album cover art is loaded from. Defaults to HttpArtSource.
+            resolution (Tuple[int, int], optional): width and height of the frames. Defaults to (600, 448).
+            max_tiles (int, optional): albums shown at most. Defaults to 50, the most recently played tracks Spotify
+                returns.
+            fetch_workers (int, optional): covers loaded at the same time at most. Defaults to 4.
+            gap (int, optional): pixels between tiles. Defaults to 2.
+        """
+        self._art_source = art_source if art_source is not None else HttpArtSource()
+        self._resolution = tuple(resolution)
+        self._max_tiles = max_tiles
+        self._gap = gap
+        self._fetch_pool = ThreadPoolExecutor(
+            max_workers=fetch_workers, thread_name_prefix="pi-ink-mosaic-fetch"
+        )
+        self._tiles = OrderedDict()
+        # tiles of the albums dropping out of the mosaic are kept a while, they're often played again
+        self._tile_cache_size = max_tiles * 2
+        self._cells = []
+        self._scene = Scene(self._resolution, (0, 0, 0, 255))
+        self._lock = threading.Lock()
+
+    def render_frame(self, spotify) -> Any:
+        tracks = spotify.get_last_played(limit=self._max_tiles, with_loved=False)
+        tracks = tracks or []
+        return self.render_mosaic(tracks), tracks[0] if len(tracks) > 0 else None
+
+    def render_mosaic(self, tracks: List[Track]) -> Image.Image:
+        """
+        Renders the mosaic of the albums of the tracks.
+
+        Args:
+            tracks (List[Track]): played tracks, most recent first
+
+        Returns:
+            Image.Image: the RGBA frame
+        """
+        with metrics.span("renderer.render_mosaic"):
+            with self._lock:
+                frame = self.__render_mosaic(tracks)
+        metrics.inc("renderer.frames")
+        return frame
+
+    def __albums(self, tracks: List[Track]) -> Dict[str, Track]:
+        # most recent play of each album, most recent first
+        albums: Dict[str, Track] = {}
+        for track in tracks:
+            key = _album_key(track)
+            if key is not None and key not in albums:
+                albums[key] = track
+                if len(albums) == self._max_tiles:
+                    break
+        return albums
+
+    def __assign_cells(
+        self, grid: MosaicGrid, albums: List[str]
+    ) -> List[Optional[str]]:
+        if grid != self._grid:
+            return albums + [None] * (grid.cells - len(albums))
+
+        # albums still shown keep their cell, new ones take the cells of those dropping out
+        cells = [album if album in albums else None for album in self._cells]
+        shown = set(cells)
+        free = [i for i, album in enumerate(cells) if album is None]
+        for album in albums:
+            if album not in shown:
+                cells[free.pop(0)] = album
+        return cells
+
+    def __load_tiles(
+        self, albums: Dict[str, Track], tile: int
+    ) -> Dict[str, Optional[Image.Image]]:
+        tiles: Dict[str, Optional[Image.Image]] = {}
+        missing = []
+        for key in albums:
+            img = self._tiles.get((key, tile))
+            if img is not None:
+                self._tiles.move_to_end((key, tile))
+                tiles[key] = img
+            else:
+                missing.append(key)
+
+        def load(key: str) -> Image.Image:
+            track = albums[key]
+            # the smallest cover at least as large as the tile
+            url = track.album_cover_url_300px
+            if tile > 300 or url is None:
+                url = track.album_cover_url_640px or url
+            img = self._art_source.get_cover(url, (tile, tile))
+            return img if img.mode == "RGBA" else img.convert("RGBA")
+
+        futures = [(key, self._fetch_pool.submit(load, key)) for key in missing]
+        for key, future in futures:
+            try:
+                img = future.result()
+            except Exception as e:
+                logger.warning(f"failed to load the cover of {albums[key].album}: {e}")
+                metrics.inc("renderer.mosaic_tile_failures")
+                tiles[key] = None
+                continue
+            tiles[key] = img
+            self._tiles[(key, tile)] = img
+        metrics.inc("renderer.mosaic_tiles_loaded", len(missing))
+
+        while len(self._tiles) > self._tile_cache_size:
+            self._tiles.popitem(last=False)
+        return tiles
+
+    def __render_mosaic(self, tracks: List[Track]) -> Image.Image:
+        albums = self.__albums(tracks)
+        grid = solve_mosaic_grid(self._resolution, len(albums), self._gap)
+        cells = self.__assign_cells(grid, list(albums.keys()))
+        tiles = self.__load_tiles(albums, grid.tile)
+
+        placeholder = None
+        nodes = []
+        for i, album in enumerate(cells):
+            position = grid.position(i)
+            if album is None:
+                nodes.append(SceneNode(f"cell{i}", None, ()))
+                continue
+            img = tiles[album]
+            if img is None:
+                if placeholder is None:
+                    placeholder = Image.new(
+                        "RGBA", (grid.tile, grid.tile), _PLACEHOLDER_COLOR
+                    )
+                img = placeholder
+            nodes.append(
+                SceneNode(
+                    f"cell{i}",
+                    (album, tiles[album] is not None, grid),
+                    (Sprite(img, position, paste=True),),
+                )
+            )
+
+        dirty = self._scene.update(nodes)
+        self._grid = grid
+        self._cells = cells
+        metrics.inc("renderer.mosaic_regions_drawn", len(dirty))
+        return self._scene.frame.to_image()
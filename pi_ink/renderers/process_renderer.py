@@ -0,0 +1,259 @@
+import logging
+import multiprocessing
+import threading
+import weakref
+from functools import partial
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Any, Callable, List, Tuple
+
+from PIL import Image
+
+from pi_ink.metrics import Metrics
+
+from .irenderer import IRenderer
+
+if TYPE_CHECKING:
+    from pi_ink.spotify.models import Track
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+# modes frames are handed over in, frames of other modes are converted to RGBA first
+_BYTES_PER_PIXEL = {"L": 1, "RGB": 3, "RGBA": 4}
+
+
+def default_renderer(resolution: Tuple[int, int] = (600, 448)) -> IRenderer:
+    """
+    Creates the renderer the worker process renders with by default, an ImageRenderer with cached album art.
+
+    Args:
+        resolution (Tuple[int, int], optional): width and height of the frames. Defaults to (600, 448).
+    """
+    from pi_ink.art import CachingArtSource, HttpArtSource
+    from pi_ink.renderers.image_renderer import ImageRenderer
+
+    return ImageRenderer(
+        art_source=CachingArtSource(HttpArtSource()), resolution=resolution
+    )
+
+
+def _worker_main(conn, shm_name: str, renderer_factory: Callable[[], IRenderer]):
+    """
+    Entry point of the worker process, renders requests from the pipe into the shared memory slot.
+    """
+    shm = SharedMemory(name=shm_name)
+    renderer = renderer_factory()
+    try:
+        while True:
+            request = conn.recv()
+            if request is None:
+                break
+
+            kind, arg = request
+            try:
+                if kind == "track":
+                    frame = renderer.render_frame_from_track(arg)
+                elif kind == "mosaic":
+                    frame = renderer.render_mosaic(arg)
+                else:
+                    # pictures loaded from disk are sent as their path, so their pixels aren't pickled
+                    picture = Image.open(arg) if isinstance(arg, str) else arg
+                    frame = renderer.render_picture_frame(picture)
+
+                if frame.mode not in _BYTES_PER_PIXEL:
+                    frame = frame.convert("RGBA")
+                data = frame.tobytes()
+                if len(data) > shm.size:
+                    raise ValueError(
+                        f"{frame.mode} frame of {frame.size} is larger than the {shm.size} byte frame slot"
+                    )
+                shm.buf[: len(data)] = data
+                conn.send(("ok", frame.mode, frame.size))
+            except Exception as e:
+                logger.exception("render failed in worker")
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        shm.close()
+
+
+def _shutdown(proc, conn, shm: SharedMemory) -> None:
+    if proc is not None and proc.is_alive():
+        try:
+            conn.send(None)
+        except OSError:
+            pass
+        proc.join(timeout=5)
+        if proc.is_alive():
+            proc.kill()
+            proc.join()
+    shm.close()
+    shm.unlink()
+
+
+class ProcessRenderer(IRenderer):
+    """
+    Renders in a separate worker process, so the CPU heavy PIL work doesn't hold the GIL the gpio callbacks and the
+    poll loop need.
+
+    Finished frames are written by the worker into a shared memory slot and copied out once by this process, the
+    frame pixels are never pickled. Requests are small: a Track, or the path of a picture loaded from disk. A worker
+    that crashes or hangs is replaced by a new one and the render is retried once.
+    """
+
+    _renderer_factory: Callable[[], IRenderer]
+    _timeout: float
+    _ctx: Any
+    _shm: SharedMemory
+    _proc: Any = None
+    _conn: Any = None
+    _lock: threading.Lock
+    _finalizer: weakref.finalize
+    restarts: int = 0
+
+    def __init__(
+        self,
+        renderer_factory: Callable[[], IRenderer] = None,
+        resolution: Tuple[int, int] = (600, 448),
+        timeout: float = 60.0,
+        start_method: str = "spawn",
+    ):
+        """
+        Args:
+            renderer_factory (Callable[[], IRenderer], optional):
+                picklable function creating the renderer in the worker. Defaults to default_renderer for the
+                resolution.
+            resolution (Tuple[int, int], optional):
+                width and height of the frames, the largest frame the renderer returns. Defaults to (600, 448).
+            timeout (float, optional): seconds a render may take before the worker is considered hung. Defaults to 60.
+            start_method (str, optional):
+                multiprocessing start method. Defaults to "spawn", forking a process with running gpio threads isn't
+                safe.
+        """
+        if renderer_factory is None:
+            renderer_factory = partial(default_renderer, resolution=tuple(resolution))
+        self._renderer_factory = renderer_factory
+        self._timeout = timeout
+        self._ctx = multiprocessing.get_context(start_method)
+        self._shm = SharedMemory(create=True, size=resolution[0] * resolution[1] * 4)
+        self._lock = threading.Lock()
+        self._finalizer = weakref.finalize(self, _shutdown, None, None, self._shm)
+
+    def start(self) -> None:
+        """
+        Starts the worker process, done automatically by the first render.
+        """
+        with self._lock:
+            self.__start()
+
+    def __start(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        self._proc = self._ctx.Process(
+            target=_worker_main,
+            args=(child_conn, self._shm.name, self._renderer_factory),
+            name="pi-ink-renderer",
+            daemon=True,
+        )
+        self._proc.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+        # make sure the worker is shut down with this renderer, or at exit
+        self._finalizer.detach()
+        self._finalizer = weakref.finalize(
+            self, _shutdown, self._proc, self._conn, self._shm
+        )
+        logger.info(f"started renderer worker process {self._proc.pid}")
+
+    def __kill(self):
+        if self._proc is not None:
+            self._proc.kill()
+            self._proc.join()
+            self._conn.close()
+        self._proc = None
+        self._conn = None
+
+    def __request(self, request) -> Image:
+        with self._lock:
+            for attempt in range(2):
+                if self._proc is None or not self._proc.is_alive():
+                    if self._proc is not None:
+                        logger.error(
+                            f"renderer worker exited with {self._proc.exitcode}, restarting it"
+                        )
+                        self.__kill()
+                        self.restarts += 1
+                        metrics.inc("renderer.worker_restarts")
+                    self.__start()
+
+                try:
+                    self._conn.send(request)
+                    if not self._conn.poll(self._timeout):
+                        raise TimeoutError(f"render took longer than {self._timeout}s")
+                    response = self._conn.recv()
+                except (EOFError, OSError, TimeoutError) as e:
+                    logger.error(f"renderer worker failed: {e}")
+                    self.__kill()
+                    self.restarts += 1
+                    metrics.inc("renderer.worker_restarts")
+                    if attempt == 1:
+                        raise RuntimeError(f"renderer worker failed twice: {e}") from e
+                    continue
+
+                if response[0] == "error":
+                    raise RuntimeError(f"render failed in worker: {response[1]}")
+
+                _, mode, size = response
+                n = size[0] * size[1] * _BYTES_PER_PIXEL[mode]
+                view = self._shm.buf[:n]
+                try:
+                    # copies the pixels out of the slot, the next render overwrites it
+                    return Image.frombuffer(mode, size, view, "raw", mode, 0, 1).copy()
+                finally:
+                    view.release()
+
+    def render_frame_from_track(self, track: "Track") -> Image:
+        """
+        Renders a frame for the track in the worker process.
+
+        Args:
+            track (Track): track to render
+
+        Returns:
+            Image: the rendered frame
+        """
+        return self.__request(("track", track))
+
+    def render_mosaic(self, tracks: List["Track"]) -> Image:
+        """
+        Renders a mosaic of the album covers of played tracks in the worker process.
+
+        Args:
+            tracks (List[Track]): played tracks, most recent first
+
+        Returns:
+            Image: the rendered frame
+        """
+        return self.__request(("mosaic", tracks))
+
+    def render_picture_frame(self, picture: Image) -> Any:
+        """
+        Renders a frame from a picture in the worker process. Pictures opened from a file are sent as their path,
+        others are pickled.
+
+        Args:
+            picture (Image): picture to render
+
+        Returns:
+            Any: rendered frame
+        """
+        fp = getattr(picture, "filename", None)
+        return self.__request(("picture", fp if fp else picture))
+
+    def close(self) -> None:
+        """
+        Stops the worker process and frees the shared memory, the renderer can't be used afterwards.
+        """
+        with self._lock:
+            self._finalizer()
+            self._proc = None
+            self._conn = None
@@ -0,0 +1,179 @@
+from dataclasses import dataclass
+from typing import Hashable, List, Optional, Tuple
+
+from PIL import Image
+
+from .frame_buffer import Box, FrameBuffer
+
+
+def _intersects(a: Box, b: Box) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+def _contains(outer: Box, inner: Box) -> bool:
+    return (
+        outer[0] <= inner[0]
+        and outer[1] <= inner[1]
+        and outer[2] >= inner[2]
+        and outer[3] >= inner[3]
+    )
+
+
+def _merge(boxes: List[Box]) -> List[Box]:
+    # merges overlapping boxes into the box covering both, so no pixel is composited twice
+    merged: List[Box] = []
+    for box in boxes:
+        while True:
+            overlapping = [m for m in merged if _intersects(m, box)]
+            if len(overlapping) == 0:
+                break
+            for m in overlapping:
+                merged.remove(m)
+                box = (
+                    min(box[0], m[0]),
+                    min(box[1], m[1]),
+                    max(box[2], m[2]),
+                    max(box[3], m[3]),
+                )
+        merged.append(box)
+    return merged
+
+
+@dataclass(frozen=True)
+class Sprite:
+    image: Image.Image
+    position: Tuple[int, int]  # top left corner on the frame, may lie outside of it
+    paste: bool = (
+        False  # replaces the pixels under it instead of being alpha composited over them
+    )
+
+    @property
+    def box(self) -> Box:
+        x, y = self.position
+        return x, y, x + self.image.width, y + self.image.height
+
+
+@dataclass(frozen=True)
+class SceneNode:
+    name: str
+    fingerprint: Hashable  # everything the sprites are rendered from, equal fingerprints render equal sprites
+    sprites: Tuple[Sprite, ...]
+
+    @property
+    def bbox(self) -> Optional[Box]:
+        """
+        Box covering all sprites of the node, None if it has none.
+        """
+        if len(self.sprites) == 0:
+            return None
+        boxes = [sprite.box for sprite in self.sprites]
+        return (
+            min(b[0] for b in boxes),
+            min(b[1] for b in boxes),
+            max(b[2] for b in boxes),
+            max(b[3] for b in boxes),
+        )
+
+
+class Scene:
+    """
+    Retained scene graph of a frame: nodes in z-order, bottom first, and the frame composited from them.
+
+    Updating the scene compares the fingerprints of the new nodes with those of the retained ones. Only the regions
+    of nodes that changed, where they were and where they are now, are composited again, from the bottom node up.
+    Sprites completely covered by a pasted sprite above them are skipped.
+    """
+
+    _size: Tuple[int, int]
+    _color: Tuple[int, int, int, int]
+    _nodes: List[SceneNode]
+    _frame: Optional[FrameBuffer] = None
+
+    def __init__(
+        self,
+        size: Tuple[int, int],
+        color: Tuple[int, int, int, int] = (255, 255, 255, 255),
+    ):
+        """
+        Args:
+            size (Tuple[int, int]): width and height of the frame
+            color (Tuple[int, int, int, int], optional): RGBA color under all nodes. Defaults to white.
+        """
+        self._size = size
+        self._color = color
+        self._nodes = []
+
+    @property
+    def frame(self) -> Optional[FrameBuffer]:
+        """
+        The frame composited from the nodes, None before the first update.
+        """
+        return self._frame
+
+    def node(self, name: str) -> Optional[SceneNode]:
+        """
+        The retained node with that name, None if there is none.
+        """
+        for node in self._nodes:
+            if node.name == name:
+                return node
+        return None
+
+    def invalidate(self) -> None:
+        """
+        Drops the retained nodes and frame, the next update composites the whole frame.
+        """
+        self._nodes = []
+        self._frame = None
+
+    def __dirty_boxes(self, nodes: List[SceneNode]) -> List[Box]:
+        if self._frame is None or [n.name for n in nodes] != [
+            n.name for n in self._nodes
+        ]:
+            return [(0, 0) + self._size]
+
+        dirty = []
+        for old, new in zip(self._nodes, nodes):
+            if old.fingerprint == new.fingerprint:
+                continue
+            # the node is removed from where it was and drawn where it is now
+            dirty.extend(box for box in [old.bbox, new.bbox] if box is not None)
+        return _merge(dirty)
+
+    def update(self, nodes: List[SceneNode]) -> List[Box]:
+        """
+        Replaces the nodes of the scene and composites the regions that changed.
+
+        Args:
+            nodes (List[SceneNode]): all nodes of the frame in z-order, bottom first, with unique names
+
+        Returns:
+            List[Box]: the regions of the frame that were composited again
+        """
+        dirty = self.__dirty_boxes(nodes)
+        if self._frame is None:
+            self._frame = FrameBuffer(self._size, self._color)
+
+        sprites = [sprite for node in nodes for sprite in node.sprites]
+        # sprites covered by a sprite pasted above them never show
+        visible = [
+            sprite
+            for i, sprite in enumerate(sprites)
+            if not any(
+                above.paste and _contains(above.box, sprite.box)
+                for above in sprites[i + 1 :]
+            )
+        ]
+
+        for box in dirty:
+            self._frame.fill(self._color, box)
+            for sprite in visible:
+                if not _intersects(sprite.box, box):
+                    continue
+                if sprite.paste:
+                    self._frame.paste(sprite.image, sprite.position, box)
+                else:
+                    self._frame.alpha_composite(sprite.image, sprite.position, box)
+
+        self._nodes = list(nodes)
+        return dirty
@@ -0,0 +1,4 @@
+from .circuit_breaker import CircuitBreaker, CircuitOpenError, is_outage
+from .ecircuit_state import ECircuitState
+
+__all__ = ["CircuitBreaker", "CircuitOpenError", "ECircuitState", "is_outage"]
@@ -0,0 +1,200 @@
+import logging
+import random
+import threading
+from typing import Any, Callable
+
+import requests
+
+from pi_ink.clock import IClock, SystemClock
+from pi_ink.metrics import Metrics
+
+from .ecircuit_state import ECircuitState
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+
+def is_outage(e: Exception) -> bool:
+    """
+    Whether an exception of a call to a web service means the service, or the network, is down: connection errors,
+    timeouts and 5xx responses, of requests or of clients like spotipy with an http_status. A 4xx is the service
+    answering.
+    """
+    if isinstance(e, requests.HTTPError):
+        return e.response is None or e.response.status_code >= 500
+    if isinstance(e, requests.RequestException):
+        return True
+    status = getattr(e, "http_status", None)
+    return status is not None and status >= 500
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling a service whose circuit is open.
+    """
+
+    name: str  # of the service
+    retry_in: float  # seconds until the next probe may be made
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} is unavailable, retrying in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+    def __reduce__(self):
+        # raised in renderer worker processes too
+        return (CircuitOpenError, (self.name, self.retry_in))
+
+
+class CircuitBreaker:
+    """
+    Stops calling a service that keeps failing, e.g. Spotify or the album art CDN while the Wi-Fi is down.
+
+    After failure_threshold failures in a row the circuit opens: calls fail fast with CircuitOpenError, without
+    touching the network, until the reset timeout passed. Then one probe call is let through (half-open), closing the
+    circuit if it succeeds, and opening it again with twice the timeout, up to max_reset_timeout, if it fails. The
+    timeouts are jittered, so panels losing the network together don't all probe at once when it's back.
+
+    Only exceptions is_failure() accepts count as failures, others, e.g. a 404, pass through and show the service is
+    up.
+    """
+
+    _name: str
+    _failure_threshold: int
+    _reset_timeout: float
+    _max_reset_timeout: float
+    _jitter: float
+    _is_failure: Callable[[Exception], bool]
+    _clock: IClock
+    _rng: random.Random
+    _lock: threading.Lock
+    _state: ECircuitState = ECircuitState.CLOSED
+    _failures: int = 0
+    _opens: int = 0  # times opened since the circuit was last closed
+    _retry_at: float = 0.0
+    _probing: bool = False
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 3,
+        reset_timeout: float = 30.0,
+        max_reset_timeout: float = 600.0,
+        jitter: float = 0.2,
+        is_failure: Callable[[Exception], bool] = None,
+        clock: IClock = None,
+        rng: random.Random = None,
+    ):
+        """
+        Args:
+            name (str): name of the service, e.g. spotify, used in logs and metrics
+            failure_threshold (int, optional): failures in a row opening the circuit. Defaults to 3.
+            reset_timeout (float, optional): seconds the circuit first stays open for. Defaults to 30.
+            max_reset_timeout (float, optional): longest the circuit stays open for. Defaults to 600.
+            jitter (float, optional): relative jitter of the timeouts, e.g. 0.2 for +-20%. Defaults to 0.2.
+            is_failure (Callable[[Exception], bool], optional): whether an exception counts as a failure. Defaults to
+                all exceptions.
+            clock (IClock, optional): clock the timeouts are measured with. Defaults to SystemClock.
+            rng (random.Random, optional): random number generator of the jitter. Defaults to a new one.
+        """
+        if failure_threshold < 1:
+            raise ValueError(
+                f"failure_threshold must be at least 1, not {failure_threshold}"
+            )
+        self._name = name
+        self._failure_threshold = failure_threshold
+        self._reset_timeout = reset_timeout
+        self._max_reset_timeout = max_reset_timeout
+        self._jitter = jitter
+        self._is_failure = is_failure or (lambda e: True)
+        self._clock = clock if clock is not None else SystemClock()
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def state(self) -> ECircuitState:
+        with self._lock:
+            return self._state
+
+    def retry_in(self) -> float:
+        """
+        Seconds until calls go through again, 0 if they do now.
+        """
+        with self._lock:
+            if self._state == ECircuitState.CLOSED:
+                return 0.0
+            return max(0.0, self._retry_at - self._clock.time())
+
+    def __before_call(self) -> None:
+        with self._lock:
+            if self._state == ECircuitState.CLOSED:
+                return
+            now = self._clock.time()
+            if self._probing or now < self._retry_at:
+                metrics.inc(f"circuit.{self._name}.rejected")
+                raise CircuitOpenError(self._name, max(0.0, self._retry_at - now))
+            # this call is the probe, the others keep failing fast until it's done
+            self._state = ECircuitState.HALF_OPEN
+            self._probing = True
+        logger.info(f"probing {self._name}")
+
+    def __on_success(self) -> None:
+        with self._lock:
+            was_open = self._state != ECircuitState.CLOSED
+            self._state = ECircuitState.CLOSED
+            self._failures = 0
+            self._opens = 0
+            self._probing = False
+        if was_open:
+            logger.info(f"{self._name} is back, circuit closed")
+
+    def __on_failure(self, e: Exception) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if (
+                self._state == ECircuitState.CLOSED
+                and self._failures < self._failure_threshold
+            ):
+                return
+            timeout = min(self._max_reset_timeout, self._reset_timeout * 2**self._opens)
+            timeout *= 1 + self._rng.uniform(-self._jitter, self._jitter)
+            self._state = ECircuitState.OPEN
+            self._opens += 1
+            self._retry_at = self._clock.time() + timeout
+        metrics.inc(f"circuit.{self._name}.opened")
+        logger.warning(f"{self._name} is failing, circuit open for {timeout:.0f}s: {e}")
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Calls fn through the circuit.
+
+        Args:
+            fn (Callable[..., Any]): call to the service
+
+        Raises:
+            CircuitOpenError: if the circuit is open, fn isn't called
+
+        Returns:
+            Any: what fn returned
+        """
+        self.__before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if self._is_failure(e):
+                self.__on_failure(e)
+            else:
+                self.__on_success()
+            raise
+        except BaseException:
+            # e.g. KeyboardInterrupt during a probe, nothing was learned about the service
+            with self._lock:
+                self._probing = False
+            raise
+        self.__on_success()
+        return result
@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class ECircuitState(Enum):
+    CLOSED = 0  # calls go through
+    OPEN = 1  # calls fail fast until the reset timeout passed
+    HALF_OPEN = 2  # one probe call goes through, deciding whether to close again
@@ -0,0 +1,21 @@
+from pi_ink.registry import lazy_attributes
+
+# the server pulls in the renderer and http.server, thin clients only need the client
+__getattr__ = lazy_attributes(
+    __name__,
+    {
+        "FrameServer": ".frame_server",
+        "ServedPanel": ".frame_server",
+        "ServedFrame": ".frame_server",
+        "FrameClient": ".frame_client",
+        "FrameClientDisplay": ".frame_client",
+    },
+)
+
+__all__ = [
+    "FrameServer",
+    "ServedPanel",
+    "ServedFrame",
+    "FrameClient",
+    "FrameClientDisplay",
+]
@@ -0,0 +1,148 @@
+import logging
+from typing import Any, Optional, Tuple
+
+import requests
+
+from pi_ink.displays.display_result import DisplayResult
+from pi_ink.displays.edisplay_response import EDisplayResponse
+from pi_ink.displays.idisplay import IDisplay
+from pi_ink.displays.packed_frame import PackedFrame
+from pi_ink.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+
+class FrameClient:
+    """
+    Downloads the frame of a panel from a FrameServer, sending the ETag of the last frame so an unchanged frame is
+    answered with an empty 304.
+    """
+
+    _url: str
+    _session: requests.Session
+    _timeout: float
+    etag: Optional[str] = None  # of the last frame downloaded
+
+    def __init__(self, url: str, session: requests.Session = None, timeout: float = 10):
+        """
+        Args:
+            url (str): url of the panel's frame, e.g. http://192.168.1.2:8750/frames/kitchen
+            session (requests.Session, optional): session to download with, reusing its connection. Defaults to a
+                new session.
+            timeout (float, optional): seconds to wait for the server. Defaults to 10.
+        """
+        self._url = url
+        self._session = session if session is not None else requests.Session()
+        self._timeout = timeout
+
+    def fetch(self) -> Optional[PackedFrame]:
+        """
+        Downloads the frame if it changed since the last one.
+
+        Returns:
+            Optional[PackedFrame]: the new frame, None if it's unchanged or the server hasn't rendered it yet
+        """
+        headers = {"If-None-Match": self.etag} if self.etag is not None else {}
+        with metrics.span("frame_client.fetch"):
+            resp = self._session.get(self._url, headers=headers, timeout=self._timeout)
+        if resp.status_code == 304:
+            metrics.inc("frame_client.not_modified")
+            return None
+        if resp.status_code == 503:
+            logger.info(f"frame at {self._url} not rendered yet")
+            return None
+        resp.raise_for_status()
+
+        frame = PackedFrame.from_buffer(resp.content)
+        self.etag = resp.headers.get("ETag")
+        metrics.inc("frame_client.frames")
+        logger.info(f"downloaded frame from {self._url}", extra={"etag": self.etag})
+        return frame
+
+
+class FrameClientDisplay(IDisplay):
+    """
+    Display showing the frames a FrameServer renders for a panel on the display it wraps, for boards too slow to
+    render frames themselves. Frames are downloaded packed through a FrameClient and handed to the display as is.
+
+    Frames set by the app are ignored, display_frame() shows the server's frame. It answers NOT_READY until the
+    server has a frame the panel doesn't show yet, so an app's loop polls the server through it.
+    """
+
+    _display: IDisplay
+    _client: FrameClient
+    _poll_interval: float
+    _pending: Optional[PackedFrame] = None  # downloaded, not shown yet
+
+    def __init__(
+        self, display: IDisplay, client: FrameClient, poll_interval: float = 15
+    ):
+        """
+        Args:
+            display (IDisplay): display to show the frames on
+            client (FrameClient): client of the panel's frame on the server
+            poll_interval (float, optional): seconds display_frame() asks to wait while there's no new frame.
+                Defaults to 15.
+        """
+        self._display = display
+        self._client = client
+        self._poll_interval = poll_interval
+
+    @property
+    def display(self) -> IDisplay:
+        return self._display
+
+    @property
+    def retains_frame(self) -> bool:
+        return self._display.retains_frame
+
+    @property
+    def resolution(self) -> Tuple[int, int]:
+        return self._display.resolution
+
+    def set_frame(
+        self, frame: Any, saturation: float = 0.5, dynamic_saturation: bool = False
+    ) -> None:
+        logger.debug("ignoring a frame set locally, frames come from the server")
+
+    def set_packed_frame(self, frame: PackedFrame) -> None:
+        logger.debug("ignoring a frame set locally, frames come from the server")
+
+    def fetch(self) -> bool:
+        """
+        Downloads the server's frame if it changed since the last one.
+
+        Returns:
+            bool: whether there's a frame the panel doesn't show yet
+        """
+        try:
+            frame = self._client.fetch()
+            if frame is not None:
+                self._pending = frame
+        except (requests.RequestException, ValueError) as e:
+            # the panel keeps showing the last frame until the server is back
+            logger.error(f"failed to download frame: {e}")
+        return self._pending is not None
+
+    def display_frame(self) -> DisplayResult:
+        if self._pending is None and not self.fetch():
+            return DisplayResult(
+                response=EDisplayResponse.NOT_READY, value=self._poll_interval
+            )
+
+        self._display.set_packed_frame(self._pending)
+        res = self._display.display_frame()
+        if res.response == EDisplayResponse.SUCCESS:
+            self._pending = None
+        return res
+
+    def clear_frame(self) -> None:
+        self._pending = None
+        self._display.clear_frame()
+
+    def __getattr__(self, name: str) -> Any:
+        # e.g. panel_stats() and close() of the wrapped display
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._display, name)
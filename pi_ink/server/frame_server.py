@@ -0,0 +1,361 @@
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote, urlsplit
+
+from pi_ink.apps.iapp import IApp
+from pi_ink.art import CachingArtSource, HttpArtSource, IArtSource
+from pi_ink.displays.packed_frame import PackedFrameStore, Palette, pack_frame
+from pi_ink.metrics import Metrics
+from pi_ink.renderers import IRenderer, renderer_registry
+from pi_ink.snapshot import render_digest
+from pi_ink.spotify import Spotify, SpotifyAccounts
+from pi_ink.spotify.models import Track
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+FRAME_CONTENT_TYPE = "application/vnd.pi-ink.packed-frame"
+
+
+@dataclass(frozen=True)
+class ServedPanel:
+    name: str  # the frame is served at /frames/<name>
+    resolution: Tuple[int, int] = (600, 448)
+    saturation: float = 0.5
+    poll_interval: float = 15  # seconds between spotify polls
+    username: Optional[str] = None  # account shown, from the server's SpotifyAccounts
+    spotify: Any = None  # Spotify or a stand-in. Defaults to the account's client
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "ServedPanel":
+        return cls(
+            name=d["name"],
+            resolution=tuple(d.get("resolution", (600, 448))),
+            saturation=d.get("saturation", 0.5),
+            poll_interval=d.get("poll_interval", 15),
+            username=d.get("username"),
+        )
+
+
+@dataclass(frozen=True)
+class ServedFrame:
+    etag: str  # quoted render digest of the frame
+    body: bytes  # the packed frame file
+    track: Track
+
+
+class _FrameHandler(BaseHTTPRequestHandler):
+    # keep connections open, clients poll every few seconds
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server: "FrameServer" = self.server.frame_server
+        metrics.inc("frame_server.requests")
+        # query strings, e.g. cache busters, don't change what's served
+        path = unquote(urlsplit(self.path).path)
+
+        if path == "/panels":
+            body = json.dumps(
+                {
+                    name: frame.etag if frame is not None else None
+                    for name, frame in server.frames().items()
+                }
+            ).encode("utf-8")
+            self.__respond(200, body, "application/json")
+            return
+
+        if path == "/accounts":
+            body = json.dumps(server.call_rates()).encode("utf-8")
+            self.__respond(200, body, "application/json")
+            return
+
+        prefix = "/frames/"
+        name = path[len(prefix) :] if path.startswith(prefix) else None
+        if name is None or name not in server.panel_names:
+            self.__respond(404, b"no such panel\n", "text/plain")
+            return
+
+        frame = server.frame(name)
+        if frame is None:
+            # not rendered yet
+            self.__respond(
+                503, b"frame not rendered yet\n", "text/plain", {"Retry-After": "5"}
+            )
+            return
+
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match is not None and (
+            if_none_match.strip() == "*"
+            or frame.etag in [tag.strip() for tag in if_none_match.split(",")]
+        ):
+            metrics.inc("frame_server.not_modified")
+            self.send_response(304)
+            self.send_header("ETag", frame.etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.end_headers()
+            return
+
+        self.__respond(
+            200,
+            frame.body,
+            FRAME_CONTENT_TYPE,
+            {"ETag": frame.etag, "Cache-Control": "no-cache"},
+        )
+
+    def __respond(
+        self, code: int, body: bytes, content_type: str, headers: Dict[str, str] = None
+    ):
+        self.send_response(code)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        logger.debug(fmt % args)
+
+
+class FrameServer(IApp):
+    """
+    Renders the frames of many panels centrally and serves the latest frame of each over local HTTP, so panels
+    driven by slow boards only download and show them.
+
+    Frames are served as packed palette frames at /frames/<name>, with the render digest of the frame as ETag. A
+    client sending it back in If-None-Match gets an empty 304 while the frame is unchanged. /panels lists the panels
+    and the ETags of their frames, /accounts the Spotify requests per minute of each account.
+
+    Each panel polls Spotify on its own interval, a frame is only rendered and packed when its render digest changes.
+    Panels of different accounts poll through the server's SpotifyAccounts: their polls are spread over its request
+    budget, stretching the intervals if they don't all fit, and a 429 pauses all of them.
+    Panels of the same resolution share a renderer, all share the album art cache and, if given, a store of packed
+    frames by digest.
+    """
+
+    _panels: List[ServedPanel]
+    _renderer: str
+    _art_source: IArtSource
+    _frame_store: Optional[PackedFrameStore] = None
+    _accounts: Optional[SpotifyAccounts] = None
+    _renderers: Dict[Tuple[int, int], IRenderer]
+    _frames: Dict[str, ServedFrame]
+    _lock: threading.Lock
+    _stop: threading.Event
+    _server: ThreadingHTTPServer
+    _thread: threading.Thread = None
+
+    def __init__(self, **kwargs):
+        """
+        Keyword Args:
+            panels (List[ServedPanel]): panels to serve, with unique names
+            host (str, optional): address to listen on. Defaults to "127.0.0.1".
+            port (int, optional): port to listen on, 0 picks a free port. Defaults to 8750.
+            renderer (str, optional): name of the renderer in the renderer registry. Defaults to image.
+            art_source (IArtSource, optional): album art source shared by the panels. Defaults to a CachingArtSource
+                of HttpArtSource.
+            frame_store (PackedFrameStore, optional): store of packed frames by digest, frames found in it aren't
+                rendered again. Defaults to None.
+            accounts (SpotifyAccounts, optional): clients of the accounts of panels with a username. Defaults to
+                SpotifyAccounts with its defaults, created if a panel has a username.
+        """
+        self._panels = list(kwargs["panels"])
+        names = [panel.name for panel in self._panels]
+        if len(set(names)) != len(names):
+            raise ValueError(f"panel names must be unique: {names}")
+
+        self._renderer = kwargs.get("renderer", "image")
+        self._art_source = kwargs.get("art_source") or CachingArtSource(HttpArtSource())
+        self._frame_store = kwargs.get("frame_store")
+        self._accounts = kwargs.get("accounts")
+        if self._accounts is None and any(p.username for p in self._panels):
+            self._accounts = SpotifyAccounts()
+        self._renderers = {}
+        self._frames = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+        self._server = ThreadingHTTPServer(
+            (kwargs.get("host", "127.0.0.1"), kwargs.get("port", 8750)), _FrameHandler
+        )
+        self._server.daemon_threads = True
+        self._server.frame_server = self
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    @property
+    def panel_names(self) -> List[str]:
+        return [panel.name for panel in self._panels]
+
+    def frame(self, name: str) -> Optional[ServedFrame]:
+        """
+        The latest frame of a panel, None if it wasn't rendered yet.
+        """
+        with self._lock:
+            return self._frames.get(name)
+
+    def frames(self) -> Dict[str, Optional[ServedFrame]]:
+        """
+        The latest frame of every panel, None for panels not rendered yet.
+        """
+        with self._lock:
+            return {name: self._frames.get(name) for name in self.panel_names}
+
+    def call_rates(self) -> Dict[str, float]:
+        """
+        Spotify requests per minute of each account over the last minute, empty without accounts.
+        """
+        return self._accounts.call_rates() if self._accounts is not None else {}
+
+    def __spotify_for(self, panel: ServedPanel):
+        if panel.spotify is not None:
+            return panel.spotify
+        if panel.username is not None:
+            return self._accounts.get(panel.username)
+        return Spotify.instance()
+
+    def __poll_intervals(self) -> Dict[str, float]:
+        # panels of accounts share the request budget, they're polled less often if they don't all fit it
+        accounts = len({p.username for p in self._panels if p.username is not None})
+        return {
+            panel.name: (
+                self._accounts.poll_interval(panel.poll_interval, accounts)
+                if panel.username is not None
+                else panel.poll_interval
+            )
+            for panel in self._panels
+        }
+
+    def __renderer_for(self, resolution: Tuple[int, int]) -> IRenderer:
+        # panels of the same resolution share a renderer, and with it its retained scene
+        resolution = tuple(resolution)
+        if resolution not in self._renderers:
+            kwargs = {"resolution": resolution}
+            if self._renderer == "image":
+                kwargs["art_source"] = self._art_source
+            self._renderers[resolution] = renderer_registry.create(
+                self._renderer, **kwargs
+            )
+        return self._renderers[resolution]
+
+    @staticmethod
+    def __get_track(spotify) -> Track:
+        track = spotify.get_currently_playing()
+        if track is None:
+            track = spotify.get_last_played(limit=1)[0]
+        return track
+
+    def refresh(self, panel: ServedPanel) -> bool:
+        """
+        Polls the track of a panel and renders its frame if it changed.
+
+        Args:
+            panel (ServedPanel): panel to refresh
+
+        Returns:
+            bool: whether the frame changed
+        """
+        track = self.__get_track(self.__spotify_for(panel))
+        digest = render_digest(
+            track.title,
+            track.album,
+            track.artist,
+            track.album_cover_url_300px,
+            track.album_cover_url_640px,
+            track.is_loved,
+            panel.resolution,
+            panel.saturation,
+        )
+        etag = f'"{digest}"'
+        current = self.frame(panel.name)
+        if current is not None and current.etag == etag:
+            return False
+
+        packed = self._frame_store.get(digest) if self._frame_store else None
+        if packed is None:
+            with metrics.span("frame_server.render"):
+                frame = self.__renderer_for(panel.resolution).render_frame_from_track(
+                    track
+                )
+                packed = pack_frame(
+                    frame, Palette.inky_impression(panel.saturation), digest
+                )
+            if self._frame_store is not None:
+                self._frame_store.put(packed)
+        else:
+            metrics.inc("frame_server.store_hits")
+
+        with self._lock:
+            self._frames[panel.name] = ServedFrame(etag, packed.to_bytes(), track)
+        logger.info(f"new frame for panel {panel.name}", extra={"etag": etag})
+        return True
+
+    def start(self) -> None:
+        """
+        Starts serving frames from a background thread, done by run().
+        """
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="frame-server-http", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"serving frames on port {self.port}")
+
+    def stop(self) -> None:
+        """
+        Asks run() to return, it stops serving before it does.
+        """
+        self._stop.set()
+
+    def run(self, **kwargs):
+        """
+        Serves frames and keeps them up to date until stop() is called. The saturation and other run arguments of the
+        other apps are configured per panel instead.
+        """
+        self.start()
+        intervals = self.__poll_intervals()
+        for panel in self._panels:
+            if intervals[panel.name] > panel.poll_interval:
+                logger.warning(
+                    f"polling panel {panel.name} every {intervals[panel.name]:.1f}s to fit the request budget"
+                )
+
+        # the first frames are rendered right away, later polls are spread over the interval
+        now = time.monotonic()
+        next_poll = {panel.name: now for panel in self._panels}
+        offsets = {
+            panel.name: SpotifyAccounts.poll_offset(
+                i, len(self._panels), intervals[panel.name]
+            )
+            for i, panel in enumerate(self._panels)
+        }
+        try:
+            while not self._stop.is_set():
+                for panel in self._panels:
+                    if time.monotonic() < next_poll[panel.name]:
+                        continue
+                    try:
+                        self.refresh(panel)
+                    except Exception:
+                        # the panel keeps being served its last frame
+                        logger.exception(f"failed to refresh panel {panel.name}")
+                    next_poll[panel.name] = (
+                        time.monotonic()
+                        + intervals[panel.name]
+                        + offsets.pop(panel.name, 0.0)
+                    )
+
+                timeout = min(next_poll.values()) - time.monotonic()
+                if timeout > 0:
+                    self._stop.wait(timeout)
+        finally:
+            self._server.shutdown()
+            self._server.server_close()
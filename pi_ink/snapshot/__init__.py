@@ -0,0 +1,3 @@
+from .snapshot_store import Snapshot, SnapshotStore, render_digest
+
+__all__ = ["Snapshot", "SnapshotStore", "render_digest"]
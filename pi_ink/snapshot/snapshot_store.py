@@ -0,0 +1,185 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, Callable, Dict, Optional
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+_VERSION = 1
+
+
+def render_digest(*parts: Any) -> str:
+    """
+    Digests everything a frame is rendered from, so two renders with the same digest produce the same frame.
+
+    Args:
+        *parts (Any): render inputs, json serializable or convertible with str()
+
+    Returns:
+        str: hex digest of the inputs
+    """
+    data = json.dumps(parts, default=str, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _write_durably(fp: Path, write: Callable[[BinaryIO], None]) -> None:
+    # written to a temporary file, synced to disk before it's renamed over fp, like the token cache: a Pi losing
+    # power leaves either the old file or the new one, never a truncated one
+    tmp_fp = fp.with_name(fp.name + ".tmp")
+    with open(tmp_fp, "wb") as f:
+        write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_fp, fp)
+    # the rename itself is only durable once the directory is synced
+    dir_fd = os.open(fp.parent, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    digest: str  # render digest of the frame that was last shown
+    state: Dict[str, Any]  # app state, e.g. the track or the picture history
+    saved_at: float
+    frame_fp: Optional[Path] = None
+
+    def frame(self) -> Optional["Image.Image"]:
+        """
+        Loads the frame that was last shown.
+
+        Returns:
+            Optional[Image.Image]: the frame, None if there is none or it can't be read
+        """
+        if self.frame_fp is None:
+            return None
+
+        # PIL is only needed once a frame is loaded, importing it at startup is slow on a Pi
+        from PIL import Image
+
+        try:
+            with Image.open(self.frame_fp) as img:
+                img.load()
+                return img
+        except OSError as e:
+            logger.warning(f"failed to load snapshot frame {self.frame_fp}: {e}")
+            return None
+
+
+class SnapshotStore:
+    """
+    Keeps a small snapshot per app on disk: the last shown frame, its render digest and the app state needed to pick
+    up where the app left off after a restart or crash.
+
+    Snapshots are written atomically, the frame first under a digest based name, then <name>.json pointing at it. A
+    crash mid-save leaves the previous snapshot intact.
+    """
+
+    _dir: Path
+
+    def __init__(self, directory: str):
+        """
+        Args:
+            directory (str): directory to keep the snapshots in, created if missing
+        """
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+
+    def __json_fp(self, name: str) -> Path:
+        return self._dir / f"{name}.json"
+
+    def load(self, name: str) -> Optional[Snapshot]:
+        """
+        Loads the snapshot of an app.
+
+        Args:
+            name (str): app name
+
+        Returns:
+            Optional[Snapshot]: the snapshot, None if there is none or it is unreadable
+        """
+        fp = self.__json_fp(name)
+        try:
+            doc = json.loads(fp.read_text())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"ignoring unreadable snapshot {fp}: {e}")
+            return None
+
+        if doc.get("version") != _VERSION:
+            logger.info(f"ignoring snapshot {fp} of version {doc.get('version')}")
+            return None
+
+        frame_fp = self._dir / doc["frame"] if doc.get("frame") else None
+        if frame_fp is not None and not frame_fp.is_file():
+            frame_fp = None
+
+        return Snapshot(
+            digest=doc["digest"],
+            state=doc["state"],
+            saved_at=doc["saved_at"],
+            frame_fp=frame_fp,
+        )
+
+    def save(
+        self,
+        name: str,
+        digest: str,
+        state: Dict[str, Any],
+        frame: "Image.Image" = None,
+    ) -> None:
+        """
+        Saves the snapshot of an app, errors are logged and otherwise ignored.
+
+        Args:
+            name (str): app name
+            digest (str): render digest of the frame shown
+            state (Dict[str, Any]): json serializable app state
+            frame (Image.Image, optional): the frame shown. Defaults to None, keeping the frame of the last snapshot.
+        """
+        try:
+            if frame is not None:
+                frame_name = f"{name}-{digest}.png"
+                frame_fp = self._dir / frame_name
+                if not frame_fp.is_file():
+                    if frame.mode not in ["RGB", "P", "L"]:
+                        frame = frame.convert("RGB")
+                    _write_durably(
+                        frame_fp, lambda f: frame.save(f, "PNG", compress_level=1)
+                    )
+            else:
+                previous = self.load(name)
+                frame_name = (
+                    previous.frame_fp.name if previous and previous.frame_fp else None
+                )
+
+            doc = {
+                "version": _VERSION,
+                "digest": digest,
+                "saved_at": time.time(),
+                "frame": frame_name,
+                "state": state,
+            }
+            _write_durably(
+                self.__json_fp(name), lambda f: f.write(json.dumps(doc).encode("utf-8"))
+            )
+
+            # frames of older snapshots are no longer referenced, frames of apps named <name>-... are left alone
+            for old_fp in self._dir.glob(f"{name}-*.png"):
+                if (
+                    old_fp.name != frame_name
+                    and "-" not in old_fp.stem[len(name) + 1 :]
+                ):
+                    old_fp.unlink(missing_ok=True)
+        except (OSError, TypeError, ValueError) as e:
+            logger.error(f"failed to save snapshot of {name}: {e}")
@@ -1,3 +1,5 @@
+from .accounts import SpotifyAccounts
+from .rate_budget import RateBudget
 from .spotify import Spotify
 
-__all__ = ["Spotify"]
+__all__ = ["Spotify", "SpotifyAccounts", "RateBudget"]
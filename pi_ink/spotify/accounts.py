@@ -0,0 +1,165 @@
+import logging
+import threading
+from typing import Callable, Dict, List
+
+import requests
+from requests.adapters import HTTPAdapter
+from spotipy.client import Spotify as SpotifyClient
+from urllib3.util.retry import Retry
+
+from pi_ink.clock import IClock, SystemClock
+from pi_ink.resilience import CircuitBreaker
+from pi_ink.spotify.rate_budget import RateBudget
+from pi_ink.spotify.spotify import Spotify
+
+logger = logging.getLogger(__name__)
+
+
+def shared_session(pool_size: int = 10) -> requests.Session:
+    """
+    Session the clients of several accounts share connections to Spotify through.
+
+    Connection errors and 5xx responses are retried, 429s aren't: they're left to the RateBudget, which pauses all
+    accounts instead of the one that happened to hit the limit.
+
+    Args:
+        pool_size (int, optional): connections kept open per host. Defaults to 10.
+
+    Returns:
+        requests.Session: the session
+    """
+    retry = Retry(
+        total=3,
+        connect=None,
+        read=False,
+        allowed_methods=frozenset(["GET", "POST", "PUT", "DELETE"]),
+        status=3,
+        backoff_factor=0.3,
+        status_forcelist=(500, 502, 503, 504),
+    )
+    adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class SpotifyAccounts:
+    """
+    Authenticated Spotify clients of several accounts, polled from one process. The clients share one connection pool
+    and one RateBudget, so the accounts can't together exceed the app's rate limit, and a 429 pauses all of them until
+    its Retry-After has passed.
+
+    poll_interval() and poll_offset() spread the polls of the accounts over the budget, instead of polling all of them
+    at once and then waiting.
+    """
+
+    _budget: RateBudget
+    _breaker: CircuitBreaker
+    _session: requests.Session
+    _client_factory: Callable[[str, requests.Session], SpotifyClient]
+    _clock: IClock
+    _clients: Dict[str, Spotify]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        budget: RateBudget = None,
+        session: requests.Session = None,
+        client_factory: Callable[[str, requests.Session], SpotifyClient] = None,
+        breaker: CircuitBreaker = None,
+        clock: IClock = None,
+    ):
+        """
+        Args:
+            budget (RateBudget, optional): request budget of all accounts. Defaults to a RateBudget with its defaults.
+            session (requests.Session, optional): session the clients share. Defaults to shared_session().
+            client_factory (Callable[[str, requests.Session], SpotifyClient], optional): creates the spotipy client
+                of a username with the session. Defaults to Spotify.create_client.
+            breaker (CircuitBreaker, optional): circuit of the Spotify API, shared by the accounts since an outage is.
+                Defaults to Spotify.create_breaker().
+            clock (IClock, optional): clock the call rates are measured with. Defaults to SystemClock.
+        """
+        self._clock = clock if clock is not None else SystemClock()
+        self._budget = budget if budget is not None else RateBudget(clock=self._clock)
+        self._session = session if session is not None else shared_session()
+        self._client_factory = client_factory or Spotify.create_client
+        self._breaker = breaker if breaker is not None else Spotify.create_breaker()
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @property
+    def budget(self) -> RateBudget:
+        return self._budget
+
+    @property
+    def usernames(self) -> List[str]:
+        with self._lock:
+            return list(self._clients.keys())
+
+    def get(self, username: str) -> Spotify:
+        """
+        The client of an account, logged in the first time it's asked for.
+
+        Args:
+            username (str): account of the client
+
+        Returns:
+            Spotify: the client
+        """
+        with self._lock:
+            spotify = self._clients.get(username)
+            if spotify is None:
+                spotify = Spotify(
+                    self._client_factory(username, self._session),
+                    username=username,
+                    budget=self._budget,
+                    breaker=self._breaker,
+                    clock=self._clock,
+                )
+                self._clients[username] = spotify
+            return spotify
+
+    def poll_interval(
+        self, min_interval: float, accounts: int = None, calls_per_poll: float = 2.0
+    ) -> float:
+        """
+        Seconds between the polls of each account for all of them to fit the budget.
+
+        Args:
+            min_interval (float): interval the accounts would like to be polled at
+            accounts (int, optional): accounts polled. Defaults to the accounts logged in.
+            calls_per_poll (float, optional): requests a poll makes on average, e.g. the current playback and
+                whether the track is saved. Defaults to 2.
+
+        Returns:
+            float: min_interval, or longer if polling every account that often would exceed the budget
+        """
+        if accounts is None:
+            accounts = len(self.usernames)
+        return max(min_interval, accounts * calls_per_poll / self._budget.rate)
+
+    @staticmethod
+    def poll_offset(index: int, accounts: int, interval: float) -> float:
+        """
+        Seconds the polls of an account are shifted by, spreading the polls of all accounts over the interval.
+
+        Args:
+            index (int): index of the account
+            accounts (int): accounts polled
+            interval (float): seconds between the polls of each account
+        """
+        return interval * index / max(1, accounts)
+
+    def call_rates(self, window: float = 60.0) -> Dict[str, float]:
+        """
+        Requests made per minute by each account over the last window seconds.
+
+        Args:
+            window (float, optional): seconds to average over. Defaults to 60.
+        """
+        with self._lock:
+            clients = dict(self._clients)
+        return {
+            username: spotify.call_rate(window) for username, spotify in clients.items()
+        }
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from datetime import datetime
 from typing import Any, Callable, Dict, List, Optional
 
@@ -13,6 +13,28 @@ class Track:
     played_at: datetime
     is_loved: Optional[bool]
 
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: json serializable fields of the track, the inverse of from_dict()
+        """
+        d = asdict(self)
+        d["played_at"] = self.played_at.isoformat()
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]):
+        """
+        Constructs a track from the fields returned by to_dict().
+
+        Args:
+            d (Dict[str, Any]): fields of the track
+
+        Returns:
+            Track: the track
+        """
+        return cls(**dict(d, played_at=datetime.fromisoformat(d["played_at"])))
+
     @classmethod
     def construct_track_from_last_played(
         cls,
@@ -0,0 +1,109 @@
+import logging
+import threading
+
+from pi_ink.clock import IClock, SystemClock
+from pi_ink.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+# rounding error tolerated in seconds and requests, sleeping less than it may not move the clock forward
+_EPSILON = 1e-6
+
+
+class RateBudget:
+    """
+    Token bucket of Spotify API requests shared by the clients of a process. Spotify rate limits an app, not an
+    account, so the accounts polled from one process spend one budget: requests refill at rate per second up to burst,
+    and a 429 pauses every client until its Retry-After has passed.
+    """
+
+    _rate: float
+    _burst: float
+    _max_wait: float
+    _clock: IClock
+    _lock: threading.Lock
+    _tokens: float
+    _updated: float
+    _blocked_until: float = 0.0
+
+    def __init__(
+        self,
+        rate: float = 2.0,
+        burst: int = 10,
+        max_wait: float = 60.0,
+        clock: IClock = None,
+    ):
+        """
+        Args:
+            rate (float, optional): requests per second on average. Defaults to 2.
+            burst (int, optional): requests that can be made at once after being idle. Defaults to 10.
+            max_wait (float, optional): longest Retry-After in seconds a request waits out before failing instead.
+                Defaults to 60.
+            clock (IClock, optional): clock the budget is refilled and waited with. Defaults to SystemClock.
+        """
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, not {rate}")
+        if burst < 1:
+            raise ValueError(f"burst must be at least 1, not {burst}")
+        self._rate = rate
+        self._burst = float(burst)
+        self._max_wait = max_wait
+        self._clock = clock if clock is not None else SystemClock()
+        self._lock = threading.Lock()
+        self._tokens = self._burst
+        self._updated = self._clock.time()
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @property
+    def max_wait(self) -> float:
+        return self._max_wait
+
+    def __refill(self, now: float) -> None:
+        if now > self._updated:
+            self._tokens = min(
+                self._burst, self._tokens + (now - self._updated) * self._rate
+            )
+            self._updated = now
+
+    def acquire(self) -> None:
+        """
+        Blocks until a request may be made and takes it from the budget.
+        """
+        waited = False
+        while True:
+            with self._lock:
+                now = self._clock.time()
+                self.__refill(now)
+                wait = self._blocked_until - now
+                if wait <= _EPSILON:
+                    if self._tokens >= 1 - _EPSILON:
+                        self._tokens = max(0.0, self._tokens - 1)
+                        break
+                    wait = (1 - self._tokens) / self._rate
+            # sleep outside of the lock, another client may take the request meanwhile so it's checked again after
+            waited = True
+            self._clock.sleep(wait)
+
+        if waited:
+            metrics.inc("spotify.budget_waits")
+
+    def defer(self, seconds: float) -> None:
+        """
+        Pauses all requests for the given time, e.g. the Retry-After of a 429. The budget refills from empty after.
+
+        Args:
+            seconds (float): seconds to pause for
+        """
+        with self._lock:
+            now = self._clock.time()
+            until = now + seconds
+            if until <= self._blocked_until:
+                return
+            self._blocked_until = until
+            self._tokens = 0.0
+            self._updated = until
+        logger.warning(f"spotify rate limited, pausing requests for {seconds}s")
@@ -1,29 +1,97 @@
 import logging
-from typing import List, Optional
+from collections import deque
+from typing import Any, Callable, Deque, List, Optional
 
 import spotipy
 from spotipy.client import Spotify as SpotifyClient
+from spotipy.exceptions import SpotifyException
 
+from pi_ink.clock import IClock, SystemClock
 from pi_ink.config import Config
+from pi_ink.metrics import Metrics
+from pi_ink.resilience import CircuitBreaker, is_outage
 from pi_ink.spotify.models import Track
+from pi_ink.spotify.rate_budget import RateBudget
+from pi_ink.spotify.token_manager import TokenCache, TokenManager
 
 logger = logging.getLogger(__name__)
 conf = Config.instance()
+metrics = Metrics.instance()
+
+_CALL_HISTORY = 1000  # requests kept to measure the call rate over
+_DEFAULT_RETRY_AFTER = 5.0  # seconds, when a 429 doesn't say
+
+
+def _retry_after(e: SpotifyException) -> float:
+    try:
+        return max(0.0, float((e.headers or {}).get("Retry-After")))
+    except (TypeError, ValueError):
+        return _DEFAULT_RETRY_AFTER
 
 
 class Spotify:
     _instance = None
     client: SpotifyClient
+    username: Optional[str] = None
+    _budget: Optional[RateBudget] = None
+    _breaker: Optional[CircuitBreaker] = None
+    _clock: IClock
+    _calls: Deque[float]  # times of the recent requests
+
+    def __init__(
+        self,
+        client: SpotifyClient,
+        username: str = None,
+        budget: RateBudget = None,
+        breaker: CircuitBreaker = None,
+        clock: IClock = None,
+    ):
+        """
+        Args:
+            client (SpotifyClient): authenticated spotipy client
+            username (str, optional): account the client is logged in as, calls are counted per account. Defaults to
+                None.
+            budget (RateBudget, optional): request budget shared with other clients, requests wait for it and a 429
+                pauses it. Defaults to None, leaving retries to spotipy.
+            breaker (CircuitBreaker, optional): circuit the requests go through, failing fast while Spotify or the
+                network is down. Defaults to None.
+            clock (IClock, optional): clock the call rate is measured with. Defaults to SystemClock.
+        """
+        self.client = client
+        self.username = username
+        self._budget = budget
+        self._breaker = breaker
+        self._clock = clock if clock is not None else SystemClock()
+        self._calls = deque(maxlen=_CALL_HISTORY)
 
     @classmethod
     def instance(cls):
         if cls._instance is not None:
             return cls._instance
 
-        cls._instance = cls.__new__(cls)
+        username = conf.get("username")
+        cls._instance = cls(
+            cls.create_client(username),
+            username=username,
+            breaker=cls.create_breaker(),
+        )
+        return cls._instance
+
+    @staticmethod
+    def create_client(username: str, requests_session=True) -> SpotifyClient:
+        """
+        Logs in to Spotify as a user with the app configured in the config.
+
+        Args:
+            username (str): account to log in as, its token is cached per user
+            requests_session (optional): requests.Session the client and its token refreshes share, True for a new
+                session of the client's own. Defaults to True.
+
+        Returns:
+            SpotifyClient: the client
+        """
         client_id = conf.get("client_id")
         client_secret = conf.get("client_secret")
-        username = conf.get("username")
         redirect_uri = conf.get("redirect_uri")
         scope = conf.get("scope")
 
@@ -59,46 +127,98 @@ class Spotify:
 
         logger.info(f"redirect uri: {redirect_uri}")
 
+        # the token is kept in memory and refreshed in the background, cached where spotipy caches it
+        cache = TokenCache(f".cache-{username}")
+        oauth = spotipy.SpotifyOAuth(
+            scope=scope,
+            client_id=client_id,
+            client_secret=client_secret,
+            open_browser=False,
+            redirect_uri=redirect_uri,
+            requests_session=requests_session,
+            cache_handler=cache,
+        )
         sp = spotipy.Spotify(
-            auth_manager=spotipy.SpotifyOAuth(
-                scope=scope,
-                username=username,
-                client_id=client_id,
-                client_secret=client_secret,
-                open_browser=False,
-                redirect_uri=redirect_uri,
-            )
+            auth_manager=TokenManager(oauth, cache).start(),
+            requests_session=requests_session,
         )
 
-        cls._instance.client = sp
         logging.info("spotify client created")
-        return cls._instance
+        return sp
+
+    @staticmethod
+    def create_breaker() -> CircuitBreaker:
+        """
+        Circuit breaker of the Spotify API, opened by connection errors, timeouts and 5xx responses.
+        """
+        return CircuitBreaker("spotify", is_failure=is_outage)
+
+    def call_rate(self, window: float = 60.0) -> float:
+        """
+        Requests made per minute over the last window seconds.
+
+        Args:
+            window (float, optional): seconds to average over. Defaults to 60.
+        """
+        since = self._clock.time() - window
+        calls = sum(1 for t in list(self._calls) if t >= since)
+        return calls * 60.0 / window
+
+    def __call(self, name: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        for attempt in range(2):
+            if self._budget is not None:
+                self._budget.acquire()
+            self._calls.append(self._clock.time())
+            metrics.inc("spotify.calls")
+            if self.username is not None:
+                metrics.inc(f"spotify.calls.{self.username}")
+            try:
+                with metrics.span(f"spotify.{name}"):
+                    if self._breaker is not None:
+                        return self._breaker.call(fn, *args, **kwargs)
+                    return fn(*args, **kwargs)
+            except SpotifyException as e:
+                if e.http_status != 429 or self._budget is None:
+                    raise
+                metrics.inc("spotify.rate_limited")
+                retry_after = _retry_after(e)
+                self._budget.defer(retry_after)
+                if attempt > 0 or retry_after > self._budget.max_wait:
+                    raise
+                # retried once the budget resumes
 
     def get_currently_playing(self) -> Optional[Track]:
-        resp = self.client.current_playback()
+        resp = self.__call("current_playback", self.client.current_playback)
         if resp is None:
             return None
 
         return Track.construct_song_from_currently_playing(self.is_track_saved, resp)
 
-    def get_last_played(self, limit: int = 1) -> Optional[List[Track]]:
+    def get_last_played(
+        self, limit: int = 1, with_loved: bool = True
+    ) -> Optional[List[Track]]:
         """
         Gets the last played track from Spotify API.
 
         Args:
             limit (int, optional): number of tracks to get. Defaults to 1.
+            with_loved (bool, optional): whether to look up if each track is loved, a request per track. is_loved is
+                None otherwise. Defaults to True.
 
         Returns:
             Track: last played track
         """
-        resp = self.client.current_user_recently_played(limit=limit)
+        resp = self.__call(
+            "recently_played", self.client.current_user_recently_played, limit=limit
+        )
         if resp is None:
             return None
 
+        is_loved_fn = self.is_track_saved if with_loved else lambda _: [None]
         tracks = list(
             map(
                 lambda idx: Track.construct_track_from_last_played(
-                    self.is_track_saved, resp, idx
+                    is_loved_fn, resp, idx
                 ),
                 range(len(resp["items"])),
             )
@@ -112,4 +232,9 @@ class Spotify:
             and type(tracks) is not set
         ):
             tracks = [tracks]
-        return self.client.current_user_saved_tracks_contains(tracks)
+        saved = self.__call(
+            "saved_tracks_contains",
+            self.client.current_user_saved_tracks_contains,
+            tracks,
+        )
+        return saved
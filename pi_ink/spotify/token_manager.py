@@ -0,0 +1,222 @@
+import json
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from spotipy.cache_handler import CacheHandler
+from spotipy.oauth2 import SpotifyOAuth
+
+from pi_ink.metrics import Metrics
+
+logger = logging.getLogger(__name__)
+metrics = Metrics.instance()
+
+TokenInfo = Dict[str, Any]
+
+
+class TokenCache(CacheHandler):
+    """
+    Token cache of SpotifyOAuth keeping the token in memory, and writing the cache file atomically and rarely. The
+    access token changes every hour, the refresh token hardly ever, so the file is only written when the refresh token
+    or scope changed, or the file is older than write_interval, sparing the SD card a write per refresh.
+    """
+
+    _fp: Path
+    _write_interval: float
+    _lock: threading.Lock
+    _token: Optional[TokenInfo] = None
+    _loaded: bool = False
+    _written: Optional[TokenInfo] = None  # last token written to the file
+    _written_at: float = 0.0
+
+    def __init__(self, fp: str, write_interval: float = 24 * 3600):
+        """
+        Args:
+            fp (str): cache file, e.g. .cache-<username> like spotipy's
+            write_interval (float, optional): seconds after which a refreshed token is written even if only the
+                access token changed. Defaults to a day.
+        """
+        self._fp = Path(fp)
+        self._write_interval = write_interval
+        self._lock = threading.Lock()
+
+    def get_cached_token(self) -> Optional[TokenInfo]:
+        with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                try:
+                    self._token = json.loads(self._fp.read_text(encoding="utf-8"))
+                    self._written = self._token
+                    self._written_at = self._fp.stat().st_mtime
+                except FileNotFoundError:
+                    logger.info(f"no cached spotify token at {self._fp}")
+                except (OSError, ValueError) as e:
+                    logger.warning(f"ignoring unreadable token cache {self._fp}: {e}")
+            return dict(self._token) if self._token is not None else None
+
+    def save_token_to_cache(self, token_info: TokenInfo) -> None:
+        with self._lock:
+            self._token = dict(token_info)
+            self._loaded = True
+            written = self._written
+            if (
+                written is None
+                or written.get("refresh_token") != token_info.get("refresh_token")
+                or written.get("scope") != token_info.get("scope")
+                or time.time() - self._written_at >= self._write_interval
+            ):
+                self.__write()
+
+    def flush(self) -> None:
+        """
+        Writes the token to the file if it changed since it was last written, e.g. before exiting.
+        """
+        with self._lock:
+            if self._token is not None and self._token != self._written:
+                self.__write()
+
+    def __write(self) -> None:
+        tmp_fp = self._fp.with_name(self._fp.name + ".tmp")
+        try:
+            fd = os.open(tmp_fp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(self._token, f)
+                f.flush()
+                os.fsync(f.fileno())
+            # readers never see a partially written token, a crash leaves the old one
+            os.replace(tmp_fp, self._fp)
+        except OSError as e:
+            logger.warning(f"failed to write spotify token cache {self._fp}: {e}")
+            return
+        self._written = self._token
+        self._written_at = time.time()
+        metrics.inc("spotify.token_cache_writes")
+
+
+class TokenManager:
+    """
+    Auth manager of the spotipy client refreshing the access token ahead of its expiry from a background thread, so
+    polls use the token in memory instead of paying for the refresh round trip when it expires. Only when the
+    background refresh fails until the token expires does a poll refresh it itself, like SpotifyOAuth does.
+    """
+
+    _oauth: SpotifyOAuth
+    _cache: TokenCache
+    _refresh_margin: float
+    _retry_interval: float
+    _lock: threading.Lock
+    _stop: threading.Event
+    _thread: threading.Thread = None
+
+    def __init__(
+        self,
+        oauth: SpotifyOAuth,
+        cache: TokenCache,
+        refresh_margin: float = 300,
+        retry_interval: float = 30,
+    ):
+        """
+        Args:
+            oauth (SpotifyOAuth): oauth manager the token is refreshed with, caching to cache
+            cache (TokenCache): cache the token is kept in
+            refresh_margin (float, optional): seconds before the expiry the token is refreshed at, at most 90% of
+                its lifetime. Defaults to 300.
+            retry_interval (float, optional): seconds before a failed refresh is retried. Defaults to 30.
+        """
+        self._oauth = oauth
+        self._cache = cache
+        self._refresh_margin = refresh_margin
+        self._retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def get_access_token(self, as_dict: bool = False):
+        """
+        The current access token, called by the spotipy client before each request.
+
+        Args:
+            as_dict (bool, optional): return the token info instead of the access token. Defaults to False.
+        """
+        token = self._cache.get_cached_token()
+        if token is None or self._oauth.is_token_expired(token):
+            with self._lock:
+                token = self._cache.get_cached_token()
+                if token is None:
+                    # not logged in yet, asks the user to
+                    self._oauth.get_access_token(as_dict=False)
+                    token = self._cache.get_cached_token()
+                elif self._oauth.is_token_expired(token):
+                    # the background refresh fell behind
+                    metrics.inc("spotify.token_refreshes_inline")
+                    token = self._oauth.refresh_access_token(token["refresh_token"])
+        return token if as_dict else token["access_token"]
+
+    def refresh(self) -> TokenInfo:
+        """
+        Refreshes the access token now.
+
+        Returns:
+            TokenInfo: the new token
+        """
+        with self._lock:
+            token = self._cache.get_cached_token()
+            if token is None:
+                raise RuntimeError("no spotify token to refresh, log in first")
+            with metrics.span("spotify.token_refresh"):
+                return self._oauth.refresh_access_token(token["refresh_token"])
+
+    def __seconds_until_refresh(self) -> Optional[float]:
+        token = self._cache.get_cached_token()
+        if token is None or "expires_at" not in token:
+            return None
+        # short lived tokens are refreshed once a tenth of their lifetime passed, not continuously
+        margin = min(self._refresh_margin, token.get("expires_in", math.inf) * 0.9)
+        return token["expires_at"] - margin - time.time()
+
+    def __run(self):
+        retry_interval = self._retry_interval
+        while not self._stop.is_set():
+            wait = self.__seconds_until_refresh()
+            if wait is None:
+                # not logged in yet, the first request does it
+                self._stop.wait(self._retry_interval)
+                continue
+            if wait > 0:
+                self._stop.wait(wait)
+                continue
+
+            try:
+                self.refresh()
+                logger.info("refreshed spotify access token")
+                retry_interval = self._retry_interval
+            except Exception as e:
+                metrics.inc("spotify.token_refresh_failures")
+                logger.error(
+                    f"failed to refresh spotify token, retrying in {retry_interval}s: {e}"
+                )
+                self._stop.wait(retry_interval)
+                retry_interval = min(retry_interval * 2, self._refresh_margin)
+
+    def start(self) -> "TokenManager":
+        """
+        Starts refreshing the token in the background.
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self.__run, name="spotify-token-refresh", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops refreshing the token and writes it to the cache file if it changed since the last write.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self._cache.flush()